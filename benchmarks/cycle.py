@@ -0,0 +1,229 @@
+"""
+End-to-end cycle benchmark of each scraping backend against the fixture site.
+
+Starts a local `FixtureSite`, then for each backend logs a `StockChecker` in
+through the fixture login form and runs several `get_products` cycles. Each
+backend runs in its own process so its CPU time and peak RSS are measured in
+isolation. Reported per backend:
+
+- cycle wall time (the first cycle, with cold connections and page cache, and
+  the mean of the following ones)
+- WebDriver round trips per cycle
+- HTTP requests the fixture site served per cycle
+- CPU seconds of the bot process and of its browser processes
+- peak RSS of the bot process and of the largest browser process
+
+Browser figures are only complete once its processes have exited, so they are
+read after the driver has quit. Every product page is fetched every cycle
+(`MIN_POLL_INTERVAL=0`) so cycles stay comparable.
+
+With `--workers`, the HTTP backends also run as a coordinator with that many
+worker processes sharing a SQLite work queue, showing how cycle time scales
+with workers. CPU and RSS are then the coordinator's only.
+
+Usage:
+    python benchmarks/cycle.py [--products 100 1000] [--in-stock 0.4]
+        [--latency-ms 50] [--per-page 0] [--cycles 3]
+        [--backends http store-api selenium] [--workers 0 2 4]
+"""
+
+# Standard Library Imports
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urljoin
+from urllib.request import urlopen
+
+BENCHMARKS = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS.parent))
+sys.path.insert(0, str(BENCHMARKS))
+
+# Local Imports
+from fixture_site import REQUESTS_PATH, FixtureSite  # noqa: E402
+
+# "store-api" is the http backend reading variants from the Store API
+BACKENDS = ["http", "store-api", "selenium"]
+
+
+def child_env(
+    site: FixtureSite, backend: str, args, directory: str, workers: int = 0
+) -> dict:
+    """Builds the environment `main.py` reads its settings from for one run."""
+    env = dict(os.environ)
+    env.pop("SITES_CONFIG", None)
+    env.update(
+        {
+            "SCRAPER_BACKEND": "selenium" if backend == "selenium" else "http",
+            "STORE_API": str(backend == "store-api").lower(),
+            "LOGIN_PAGE": site.login_page,
+            "PRODUCT_PAGE": site.listing_page,
+            "EMAIL": "bench@example.com",
+            "PASSWORD": "bench",
+            "COMPANY_NAME": "Fixture",
+            "TELEGRAM_TOKEN": "0:bench",
+            "TELEGRAM_CHAT_ID": "0",
+            "VARIANT_CONCURRENCY": str(args.variant_concurrency),
+            "MAX_REQUESTS_PER_SECOND": "0",
+            "MIN_POLL_INTERVAL": "0",
+            "DRIVER_SPARES": "0",
+            "LEAN_BROWSER": "true",
+            # A fresh cookie jar and state file, so no run resumes another's session
+            "COOKIE_JAR_DIR": directory,
+            "STATE_DB": str(Path(directory) / "state.db"),
+            "ROLE": "coordinator" if workers else "standalone",
+            "WORK_QUEUE": str(Path(directory) / "queue.db"),
+        }
+    )
+    return env
+
+
+def run_cycles(cycles: int) -> dict:
+    """
+    Runs in the child process: logs in and times `cycles` calls to `get_products`.
+
+    Returns:
+        dict: Per-cycle wall times, round trips and requests, plus CPU and RSS.
+    """
+    import main
+    from dom_extraction import RoundTripCounter
+    from drivers import DriverPool
+    from scraper import HttpPool
+
+    logging.getLogger().setLevel(logging.WARNING)
+    pool = HttpPool(main.VARIANT_CONCURRENCY, main.MAX_REQUESTS_PER_SECOND)
+    drivers = DriverPool(spares=0, lean=main.LEAN_BROWSER)
+    # The http backend only borrows a driver when it needs one, so count the
+    # round trips of every driver the pool hands out
+    counters = []
+    acquire = drivers.acquire
+
+    def counted_acquire():
+        driver = acquire()
+        counters.append(RoundTripCounter(driver))
+        return driver
+
+    drivers.acquire = counted_acquire
+    checker = main.StockChecker(main.SITES[0], pool, drivers)
+    requests_url = urljoin(main.SITES[0].login_page, REQUESTS_PATH)
+    result = {"seconds": [], "round_trips": [], "requests": [], "in_stock": 0}
+    try:
+        if not checker.login():
+            raise RuntimeError("Could not log in to the fixture site")
+        for _ in range(cycles):
+            served = int(urlopen(requests_url).read())
+            round_trips = sum(counter.count for counter in counters)
+            start = time.perf_counter()
+            checker.get_products()
+            result["seconds"].append(time.perf_counter() - start)
+            result["round_trips"].append(
+                sum(counter.count for counter in counters) - round_trips
+            )
+            result["requests"].append(int(urlopen(requests_url).read()) - served)
+        result["in_stock"] = checker.stock_count
+    finally:
+        checker.quit()
+        drivers.close()
+        pool.close()
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    browser = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in KB on Linux
+    result["cpu"] = own.ru_utime + own.ru_stime
+    result["browser_cpu"] = browser.ru_utime + browser.ru_stime
+    result["rss_mb"] = own.ru_maxrss / 1024
+    result["browser_rss_mb"] = browser.ru_maxrss / 1024
+    return result
+
+
+def run_backend(site: FixtureSite, backend: str, args, workers: int = 0) -> dict:
+    """
+    Runs one backend in a child process and returns its measurements, with
+    `workers` worker processes taking pages from it.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        env = child_env(site, backend, args, directory, workers)
+        worker_env = {**env, "ROLE": "worker"}
+        pool = [
+            subprocess.Popen(
+                [sys.executable, str(BENCHMARKS.parent / "main.py")],
+                env=worker_env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            for _ in range(workers)
+        ]
+        try:
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", "--cycles", str(args.cycles)],
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+        finally:
+            for worker in pool:
+                worker.terminate()
+                worker.wait()
+    if output.returncode:
+        raise RuntimeError(f"{backend} run failed:\n{output.stderr}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, nargs="+", default=[100])
+    parser.add_argument("--in-stock", type=float, default=0.4)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--per-page", type=int, default=0, help="0: one page")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--variant-concurrency", type=int, default=8)
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[0], help="HTTP backends only"
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_cycles(args.cycles)))
+        return
+    if any(not 10 <= n <= 5000 for n in args.products):
+        parser.error("--products must be between 10 and 5000")
+
+    print(
+        f"{'products':>8} {'backend':<10}{'workers':>8}{'in stock':>9}"
+        f"{'first s':>9}{'next s':>9}"
+        f"{'trips':>7}{'requests':>9}{'CPU s':>8}{'browser':>9}{'RSS MB':>8}"
+        f"{'browser':>9}"
+    )
+    for products in args.products:
+        site = FixtureSite(
+            products, args.in_stock, args.latency_ms / 1000, per_page=args.per_page
+        ).start()
+        try:
+            for backend in args.backends:
+                counts = [0] if backend == "selenium" else args.workers
+                for workers in counts:
+                    r = run_backend(site, backend, args, workers)
+                    seconds = r["seconds"]
+                    later = seconds[1:] or seconds
+                    print(
+                        f"{products:>8} {backend:<10}{workers:>8}{r['in_stock']:>9}"
+                        f"{seconds[0]:>9.2f}{sum(later) / len(later):>9.2f}"
+                        f"{sum(r['round_trips']) / len(seconds):>7.0f}"
+                        f"{sum(r['requests']) / len(seconds):>9.0f}"
+                        f"{r['cpu']:>8.1f}{r['browser_cpu']:>9.1f}"
+                        f"{r['rss_mb']:>8.0f}{r['browser_rss_mb']:>9.0f}"
+                    )
+        finally:
+            site.stop()
+
+
+if __name__ == "__main__":
+    main()
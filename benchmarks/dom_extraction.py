@@ -0,0 +1,131 @@
+"""
+Benchmark of WebDriver round trips and wall time for the product listing and
+variant table extraction.
+
+Compares the old per-element scrape (one `find_element` / `get_attribute` /
+`.text` call per field) against the single `page_source` snapshot parsed
+locally, using the saved fixture pages in `benchmarks/fixtures`.
+
+Usage:
+    python benchmarks/dom_extraction.py [--runs 5]
+"""
+
+# Standard Library Imports
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Third-Party Imports
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.chrome.options import Options
+
+# Local Imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scraper import parse_products, parse_variants  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+class RoundTripCounter:
+    """Counts every command the WebDriver sends to the browser."""
+
+    def __init__(self, driver: webdriver.Chrome):
+        self.count = 0
+        self._execute = driver.execute
+
+        def counting_execute(*args, **kwargs):
+            self.count += 1
+            return self._execute(*args, **kwargs)
+
+        driver.execute = counting_execute
+
+
+def listing_per_element(driver: webdriver.Chrome) -> list:
+    """The pre-snapshot listing scrape: several round trips per product."""
+    listing = []
+    for product in driver.find_elements(By.CSS_SELECTOR, "li.product"):
+        title_element = product.find_element(By.CSS_SELECTOR, "a")
+        listing.append(
+            {
+                "title": title_element.get_attribute("title"),
+                "url": title_element.get_attribute("href"),
+                "classes": product.get_attribute("class").split(),
+            }
+        )
+    return listing
+
+
+def variants_per_element(driver: webdriver.Chrome) -> list:
+    """The pre-snapshot variant scrape: several round trips per variant field."""
+    in_stock_variants = []
+    for variant in driver.find_elements(By.CLASS_NAME, "product-form-row"):
+        stock_status = variant.find_element(By.TAG_NAME, "p")
+        if "in-stock" in stock_status.get_attribute("class"):
+            size = (
+                variant.find_element(By.CLASS_NAME, "pa-size")
+                .find_element(By.TAG_NAME, "dd")
+                .text.strip()
+            )
+            variant.find_element(By.CLASS_NAME, "woocommerce-Price-currencySymbol").text
+            whole_price = variant.find_element(
+                By.CLASS_NAME, "woocommerce-Price-amount"
+            ).text
+            decimal_price = variant.find_element(
+                By.CLASS_NAME, "woocommerce-Price-decimal"
+            ).text
+            in_stock_variants.append((size, whole_price + decimal_price))
+    return in_stock_variants
+
+
+def listing_snapshot(driver: webdriver.Chrome) -> list:
+    """The snapshot listing scrape: one round trip for the whole grid."""
+    return parse_products(driver.page_source)
+
+
+def variants_snapshot(driver: webdriver.Chrome) -> list:
+    """The snapshot variant scrape: one round trip for the whole table."""
+    return parse_variants(driver.page_source)
+
+
+def measure(driver: webdriver.Chrome, counter: RoundTripCounter, extract, runs: int):
+    """Runs an extraction `runs` times and returns (round trips, seconds) per run."""
+    counter.count = 0
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = extract(driver)
+    elapsed = time.perf_counter() - start
+    return counter.count / runs, elapsed / runs, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="runs per extraction")
+    args = parser.parse_args()
+
+    options = Options()
+    options.add_argument("--headless")
+    driver = webdriver.Chrome(options=options)
+    counter = RoundTripCounter(driver)
+
+    cases = [
+        ("listing", "listing.html", listing_per_element, listing_snapshot),
+        ("variants", "product.html", variants_per_element, variants_snapshot),
+    ]
+    try:
+        print(f"{'page':<10}{'mode':<14}{'records':>8}{'round trips':>13}{'ms':>10}")
+        for name, fixture, before, after in cases:
+            driver.get((FIXTURES / fixture).as_uri())
+            for mode, extract in (("per-element", before), ("snapshot", after)):
+                trips, seconds, records = measure(driver, counter, extract, args.runs)
+                print(
+                    f"{name:<10}{mode:<14}{records:>8}{trips:>13.0f}"
+                    f"{seconds * 1000:>10.1f}"
+                )
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    main()
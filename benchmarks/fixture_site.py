@@ -0,0 +1,364 @@
+"""
+Local stand-in for a logged-in WooCommerce shop, for offline benchmarks.
+
+Serves a login form, a product listing and one variant page per product, using
+the same markup as the recorded pages in `benchmarks/fixtures`. The number of
+products, the share that is in stock and the latency of every response are
+configurable, and the stock is generated from a seed so runs are repeatable.
+
+The variations are also served as JSON from the Store API
+(`/wp-json/wc/store/v1/products?type=variation`), 100 per page.
+
+With a page size set, the listing is split into `/shop/page/N/` pages with
+WooCommerce's pagination links, which only link the pages near the current one.
+
+Like the real site, the listing is served without stock classes and product
+pages redirect to the login page until the login form has been submitted.
+
+Usage:
+    python benchmarks/fixture_site.py [--products 500] [--in-stock 0.4]
+        [--latency-ms 50] [--per-page 0] [--port 8765]
+"""
+
+# Standard Library Imports
+import argparse
+import json
+import random
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# The session cookie the login form sets, named like WordPress's own
+SESSION_COOKIE = "wordpress_logged_in_fixture"
+# Answers with the number of requests served so far
+REQUESTS_PATH = "/fixture/requests"
+SIZES = [("20g", 12.5), ("50g", 27), ("100g", 49), ("250g", 110), ("500g", 199)]
+
+PAGE = """<!DOCTYPE html>
+<html lang="en-US">
+<head>
+  <meta charset="UTF-8">
+  <title>{title} – Example Company</title>
+</head>
+<body class="woocommerce{body_class}">
+  <main id="main" class="site-main">
+{content}
+  </main>
+</body>
+</html>
+"""
+
+LOGIN_FORM = """    <form class="woocommerce-form woocommerce-form-login login" method="post">
+      <input type="text" name="username" id="username">
+      <input type="password" name="password" id="password">
+      <button type="submit" name="login" value="Log in">Log in</button>
+    </form>"""
+
+LISTING_ITEM = """      <li class="product type-product post-{id} status-publish{stock} product_cat-tea has-post-title purchasable product-type-variable">
+        <a href="{url}" title="{title}" class="woocommerce-LoopProduct-link woocommerce-loop-product__link">
+          <h2 class="woocommerce-loop-product__title">{title}</h2>
+        </a>
+      </li>"""  # noqa: E501
+
+VARIANT_ROW = """      <div class="product-form-row">
+        <dl class="variation pa-size"><dt>Size</dt><dd>{size}</dd></dl>
+        <span class="woocs_price_USD"><span class="woocommerce-Price-amount amount"><span class="woocommerce-Price-currencySymbol">$</span>{whole}</span><span class="woocommerce-Price-decimal">.{cents:02d}</span></span>
+        <p class="stock {stock}">{label}</p>
+      </div>"""  # noqa: E501
+
+
+class FixtureShop:
+    """The generated catalogue: which products and sizes are in stock."""
+
+    def __init__(
+        self,
+        products: int = 100,
+        in_stock: float = 0.4,
+        seed: int = 1,
+        per_page: int = 0,
+    ):
+        self.per_page = per_page or products
+        self.pages = -(-products // self.per_page)
+        rng = random.Random(seed)
+        self.products = []
+        for i in range(1, products + 1):
+            sizes = []
+            if rng.random() < in_stock:
+                # An in-stock product has at least one size available
+                available = rng.sample(range(len(SIZES)), rng.randint(1, len(SIZES)))
+                sizes = sorted(available)
+            self.products.append({"id": 1000 + i, "title": f"Tea {i}", "sizes": sizes})
+        self._by_slug = {f"tea-{i}": p for i, p in enumerate(self.products, 1)}
+
+    def product(self, slug: str):
+        """Returns the product for a `/product/<slug>/` URL, or None."""
+        return self._by_slug.get(slug)
+
+    def pagination_html(self, base_url: str, page: int) -> str:
+        """Renders the pagination links: the first, last and two around `page`."""
+        if self.pages < 2:
+            return ""
+        shown = {1, self.pages} | set(range(page - 2, page + 3))
+        items = []
+        previous = 0
+        for n in sorted(p for p in shown if 1 <= p <= self.pages):
+            if n > previous + 1:
+                items.append('<li><span class="page-numbers dots">…</span></li>')
+            if n == page:
+                items.append(f'<li><span class="page-numbers current">{n}</span></li>')
+            else:
+                url = f"{base_url}/shop/" if n == 1 else f"{base_url}/shop/page/{n}/"
+                items.append(f'<li><a class="page-numbers" href="{url}">{n}</a></li>')
+            previous = n
+        return (
+            '    <nav class="woocommerce-pagination"><ul class="page-numbers">'
+            + "".join(items)
+            + "</ul></nav>"
+        )
+
+    def listing_html(self, base_url: str, logged_in: bool, page: int = 1) -> str:
+        """Renders a listing page, with stock classes only when logged in."""
+        items = []
+        first = (page - 1) * self.per_page
+        numbered = list(enumerate(self.products, 1))
+        for i, product in numbered[first : first + self.per_page]:
+            stock = ""
+            if logged_in:
+                stock = " instock" if product["sizes"] else " outofstock"
+            items.append(
+                LISTING_ITEM.format(
+                    id=product["id"],
+                    stock=stock,
+                    url=f"{base_url}/product/tea-{i}/",
+                    title=escape(product["title"]),
+                )
+            )
+        content = '    <ul class="products columns-4">\n{}\n    </ul>\n{}'.format(
+            "\n".join(items), self.pagination_html(base_url, page)
+        )
+        body_class = " logged-in" if logged_in else ""
+        return PAGE.format(title="Shop", body_class=body_class, content=content)
+
+    def store_variations(self, base_url: str, page: int, per_page: int) -> tuple:
+        """Returns one page of Store API variations and the number of pages."""
+        items = []
+        for i, product in enumerate(self.products, 1):
+            for index, (size, price) in enumerate(SIZES):
+                items.append(
+                    {
+                        "id": product["id"] * 10 + index,
+                        "parent": product["id"],
+                        "type": "variation",
+                        "permalink": f"{base_url}/product/tea-{i}/"
+                        f"?attribute_pa_size={size}",
+                        "variation": [{"attribute": "Size", "value": size}],
+                        "prices": {
+                            "price": str(round(price * 100)),
+                            "currency_code": "USD",
+                            "currency_symbol": "$",
+                            "currency_minor_unit": 2,
+                        },
+                        "is_in_stock": index in product["sizes"],
+                        "is_purchasable": True,
+                    }
+                )
+        pages = max(1, -(-len(items) // per_page))
+        return items[(page - 1) * per_page : page * per_page], pages
+
+    def product_html(self, product: dict) -> str:
+        """Renders a product page with one variant row per size."""
+        rows = []
+        for index, (size, price) in enumerate(SIZES):
+            in_stock = index in product["sizes"]
+            rows.append(
+                VARIANT_ROW.format(
+                    size=size,
+                    whole=int(price),
+                    cents=round(price % 1 * 100),
+                    stock="in-stock" if in_stock else "out-of-stock",
+                    label="In stock" if in_stock else "Out of stock",
+                )
+            )
+        stock = "instock" if product["sizes"] else "outofstock"
+        content = (
+            f'    <div class="product type-product {stock} product-type-variable">\n'
+            f'      <h1 class="product_title entry-title">{product["title"]}</h1>\n'
+            + "\n".join(rows)
+            + "\n    </div>"
+        )
+        return PAGE.format(
+            title=escape(product["title"]),
+            body_class=" single-product logged-in",
+            content=content,
+        )
+
+
+class FixtureSite:
+    """Serves a `FixtureShop` over HTTP from a background thread."""
+
+    def __init__(
+        self,
+        products: int = 100,
+        in_stock: float = 0.4,
+        latency: float = 0.0,
+        port: int = 0,
+        seed: int = 1,
+        per_page: int = 0,
+    ):
+        self.shop = FixtureShop(products, in_stock, seed, per_page)
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    @property
+    def login_page(self) -> str:
+        return f"{self.base_url}/my-account/"
+
+    @property
+    def listing_page(self) -> str:
+        return f"{self.base_url}/shop/"
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _logged_in(self) -> bool:
+                return SESSION_COOKIE in self.headers.get("Cookie", "")
+
+            def _send(
+                self,
+                status: int,
+                body: str = "",
+                headers: dict = None,
+                content_type: str = "text/html",
+            ):
+                data = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", f"{content_type}; charset=UTF-8")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on a slow response
+                    pass
+
+            def _begin(self) -> None:
+                with site._lock:
+                    site.requests += 1
+                if site.latency:
+                    time.sleep(site.latency)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == REQUESTS_PATH:
+                    # Read by benchmarks, not counted and not delayed
+                    self._send(200, str(site.requests))
+                    return
+                self._begin()
+                if path == "/my-account/":
+                    page = PAGE.format(
+                        title="My account", body_class="", content=LOGIN_FORM
+                    )
+                    self._send(200, page)
+                elif path == "/shop/" or path.startswith("/shop/page/"):
+                    number = path.strip("/").split("/")[-1]
+                    page = int(number) if number.isdigit() else 1
+                    if not 1 <= page <= site.shop.pages:
+                        self._send(404)
+                        return
+                    html = site.shop.listing_html(
+                        site.base_url, self._logged_in(), page
+                    )
+                    self._send(200, html)
+                elif path.startswith("/product/"):
+                    product = site.shop.product(path.strip("/").split("/")[-1])
+                    if product is None:
+                        self._send(404)
+                    elif not self._logged_in():
+                        self._send(302, headers={"Location": site.login_page})
+                    else:
+                        self._send(200, site.shop.product_html(product))
+                elif path == "/wp-json/wc/store/v1/products":
+                    query = parse_qs(urlsplit(self.path).query)
+                    page = int(query.get("page", ["1"])[0])
+                    per_page = min(100, int(query.get("per_page", ["10"])[0]))
+                    items, pages = site.shop.store_variations(
+                        site.base_url, page, per_page
+                    )
+                    self._send(
+                        200,
+                        json.dumps(items),
+                        {"X-WP-TotalPages": str(pages)},
+                        "application/json",
+                    )
+                elif path == "/robots.txt":
+                    self._send(200, "User-agent: *\n")
+                else:
+                    self._send(404)
+
+            def do_POST(self):
+                self._begin()
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                cookie = f"{SESSION_COOKIE}=fixture; Path=/"
+                self._send(
+                    302, headers={"Location": site.listing_page, "Set-Cookie": cookie}
+                )
+
+        return Handler
+
+    def start(self) -> "FixtureSite":
+        """Starts serving in a daemon thread and returns the site."""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving and closes the socket."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=100, help="10 to 5000")
+    parser.add_argument("--in-stock", type=float, default=0.4, help="in-stock share")
+    parser.add_argument("--latency-ms", type=float, default=0, help="per response")
+    parser.add_argument("--per-page", type=int, default=0, help="0: one page")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    if not 10 <= args.products <= 5000:
+        parser.error("--products must be between 10 and 5000")
+
+    site = FixtureSite(
+        args.products,
+        args.in_stock,
+        args.latency_ms / 1000,
+        args.port,
+        per_page=args.per_page,
+    ).start()
+    print(f"Login page:   {site.login_page}")
+    print(f"Product page: {site.listing_page}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        site.stop()
+
+
+if __name__ == "__main__":
+    main()
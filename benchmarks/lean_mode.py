@@ -0,0 +1,85 @@
+"""
+Per-page bytes and load time report for the full and lean Chromium profiles.
+
+Loads each URL with a normal headless Chromium and with lean mode (eager page
+loads, images/fonts/CSS/trackers blocked), then prints what every page cost
+plus the tab's JS heap size. Pages behind the login need a session cookie,
+which can be passed with --cookie (copy it from a logged-in browser).
+
+Usage:
+    python benchmarks/lean_mode.py URL [URL ...] [--cookie NAME=VALUE]
+"""
+
+# Standard Library Imports
+import argparse
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urljoin
+
+# Local Imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from drivers import create_driver, page_load_report  # noqa: E402
+
+
+def browser_memory_mb(driver) -> float:
+    """Returns the JS heap of the current tab in MB, as a rough memory gauge."""
+    heap = driver.execute_script(
+        "return performance.memory ? performance.memory.usedJSHeapSize : 0;"
+    )
+    return heap / 1024 / 1024
+
+
+def run(urls: list, lean: bool, cookies: list) -> list:
+    """Loads every URL in a fresh driver and returns one report per page."""
+    driver = create_driver(lean)
+    try:
+        if cookies:
+            driver.get(urljoin(urls[0], "/robots.txt"))
+            for name, value in cookies:
+                driver.add_cookie({"name": name, "value": value})
+        reports = []
+        for url in urls:
+            start = time.perf_counter()
+            driver.get(url)
+            elapsed = (time.perf_counter() - start) * 1000
+            report = page_load_report(driver)
+            report["get_ms"] = elapsed
+            report["heap_mb"] = browser_memory_mb(driver)
+            reports.append((url, report))
+        return reports
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("urls", nargs="+", help="pages to load")
+    parser.add_argument(
+        "--cookie", action="append", default=[], help="NAME=VALUE cookie to send"
+    )
+    args = parser.parse_args()
+    cookies = [tuple(c.split("=", 1)) for c in args.cookie]
+
+    print(
+        f"{'mode':<6}{'KB':>9}{'requests':>10}{'DCL ms':>9}{'get() ms':>10}"
+        f"{'heap MB':>9}  url"
+    )
+    for mode, lean in (("full", False), ("lean", True)):
+        totals = [0, 0, 0.0]
+        for url, r in run(args.urls, lean, cookies):
+            totals[0] += r["bytes"]
+            totals[1] += r["requests"]
+            totals[2] += r["get_ms"]
+            print(
+                f"{mode:<6}{r['bytes'] / 1024:>9.0f}{r['requests']:>10}{r['ms']:>9}"
+                f"{r['get_ms']:>10.0f}{r['heap_mb']:>9.1f}  {url}"
+            )
+        print(
+            f"{mode:<6}{totals[0] / 1024:>9.0f}{totals[1]:>10}{'':>9}"
+            f"{totals[2]:>10.0f}{'':>9}  TOTAL"
+        )
+
+
+if __name__ == "__main__":
+    main()
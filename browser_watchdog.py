@@ -0,0 +1,217 @@
+"""
+Browser resource watchdog.
+
+Headless Chromium grows over long runs: its memory creeps up, renderer
+processes pile up file handles, and commands get slower. Between cycles the
+watchdog measures the browser's whole process tree (chromedriver, the browser
+and its renderer, GPU and utility children) and how long a command takes, and
+says when the browser should be swapped for a fresh one. The swap happens
+between cycles with the session cookies carried over, so it costs no login and
+never interrupts a scrape.
+
+Memory is the proportional set size (PSS) where the kernel reports it, so
+pages the Chromium processes share are only counted once. The measurements
+read `/proc`, so they are only available on Linux; elsewhere only the latency
+check runs.
+"""
+
+# Standard Library Imports
+import os
+import statistics
+import time
+from collections import deque
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _children() -> dict:
+    """
+    Maps every process to its child processes.
+
+    Returns:
+        dict: Parent PID to a list of child PIDs.
+    """
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            # Exited while we were looking
+            continue
+        # The command name may contain spaces and brackets; the fields after it
+        # are the state and then the parent PID
+        ppid = int(stat[stat.rindex(b")") + 2 :].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def _memory(pid: int) -> int:
+    """
+    Reads a process's memory use.
+
+    Args:
+        pid (int): The process ID.
+
+    Returns:
+        int: Its PSS in bytes, or its RSS on kernels without `smaps_rollup`.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+
+def browser_usage(driver) -> dict:
+    """
+    Measures the memory and open files of a driver's process tree.
+
+    Args:
+        driver (webdriver.Chrome): The driver to measure.
+
+    Returns:
+        dict: `memory` in bytes, open `files` and the number of `processes`,
+            or None if they can't be read on this system.
+    """
+    process = getattr(getattr(driver, "service", None), "process", None)
+    if process is None or not os.path.isdir("/proc"):
+        return None
+    children = _children()
+    pending = [process.pid]
+    usage = {"memory": 0, "files": 0, "processes": 0}
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            usage["memory"] += _memory(pid)
+            usage["files"] += len(os.listdir(f"/proc/{pid}/fd"))
+        except OSError:
+            continue
+        usage["processes"] += 1
+    return usage
+
+
+def command_latency(driver, samples: int = 3) -> float:
+    """
+    Times a trivial WebDriver command, keeping the fastest of a few tries so a
+    single hiccup doesn't count.
+
+    Args:
+        driver (webdriver.Chrome): The driver to time.
+        samples (int): How many commands to time.
+
+    Returns:
+        float: Seconds for one round trip to the browser.
+
+    Raises:
+        WebDriverException: If the browser doesn't answer.
+    """
+    fastest = float("inf")
+    for _ in range(samples):
+        start = time.perf_counter()
+        driver.execute_script("return 1;")
+        fastest = min(fastest, time.perf_counter() - start)
+    return fastest
+
+
+def close_stray_tabs(driver) -> int:
+    """
+    Closes every tab but the first, e.g. ones a failed scrape left open.
+
+    Args:
+        driver (webdriver.Chrome): The driver to clean up.
+
+    Returns:
+        int: The number of tabs closed.
+    """
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+    return len(handles) - 1
+
+
+class BrowserWatchdog:
+    """Decides when a long-running browser has grown enough to be replaced."""
+
+    def __init__(
+        self,
+        max_memory_mb: float = 0,
+        max_files: int = 0,
+        max_latency_drift: float = 0,
+        window: int = 5,
+        min_drift: float = 0.05,
+    ):
+        """
+        Sets the limits. A limit of 0 turns its check off.
+
+        Args:
+            max_memory_mb (float): The most memory the process tree may use.
+            max_files (int): The most files its processes may have open.
+            max_latency_drift (float): How many times slower than when the
+                browser was new its commands may get.
+            window (int): Cycles whose latency is taken as the baseline, and
+                whose median is compared with it.
+            min_drift (float): Seconds a slowdown must add, however large it is
+                as a factor, so sub-millisecond noise never counts.
+        """
+        self.max_memory = max_memory_mb * 1024 * 1024
+        self.max_files = max_files
+        self.max_latency_drift = max_latency_drift
+        self.window = window
+        self.min_drift = min_drift
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Starts over for a fresh browser.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.baseline = None
+        self.latencies = deque(maxlen=self.window)
+
+    def check(self, usage: dict, latency: float) -> str:
+        """
+        Records one cycle's measurements and checks them against the limits.
+
+        Args:
+            usage (dict): From `browser_usage`, or None if unknown.
+            latency (float): From `command_latency`.
+
+        Returns:
+            str: Why the browser should be replaced ("memory", "files" or
+                "latency"), or None if it's fine.
+        """
+        if usage is not None:
+            if self.max_memory and usage["memory"] > self.max_memory:
+                return "memory"
+            if self.max_files and usage["files"] > self.max_files:
+                return "files"
+
+        self.latencies.append(latency)
+        if len(self.latencies) < self.window:
+            return None
+        recent = statistics.median(self.latencies)
+        if self.baseline is None:
+            self.baseline = recent
+            return None
+        if (
+            self.max_latency_drift
+            and recent > self.baseline * self.max_latency_drift
+            and recent - self.baseline > self.min_drift
+        ):
+            return "latency"
+        return None
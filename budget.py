@@ -0,0 +1,72 @@
+"""
+Per-cycle latency budgets.
+
+A cycle gets a deadline when it starts (by default the poll interval, so it
+ends before the next one is due). Every page load or wait inside it is given
+the smaller of its own timeout and the time left, and a page that doesn't make
+it is skipped and checked again next cycle, so one slow page never stalls the
+rest of the catalogue.
+"""
+
+# Standard Library Imports
+import time
+
+
+class BudgetExceededError(Exception):
+    """Raised when a page can't be loaded within its share of the cycle budget."""
+
+
+class CycleBudget:
+    """The deadline of one cycle and the timeout of each page load within it."""
+
+    def __init__(self, seconds: float = None, page_timeout: float = 10):
+        """
+        Starts the budget.
+
+        Args:
+            seconds (float): Time the cycle may take, or None for no deadline.
+            page_timeout (float): The most any single page load or wait may take.
+        """
+        self.deadline = None if seconds is None else time.monotonic() + seconds
+        self.page_timeout = page_timeout
+
+    def remaining(self):
+        """
+        Works out how much of the cycle is left.
+
+        Args:
+            None
+
+        Returns:
+            float: Seconds left (never negative), or None without a deadline.
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def timeout(self, limit: float = None) -> float:
+        """
+        Works out how long the next page load or wait may take.
+
+        Args:
+            limit (float): The stage's own timeout, `page_timeout` by default.
+
+        Returns:
+            float: The smaller of the limit and the time left; 0 once the budget
+                is spent.
+        """
+        limit = self.page_timeout if limit is None else limit
+        remaining = self.remaining()
+        return limit if remaining is None else min(limit, remaining)
+
+    def exhausted(self) -> bool:
+        """
+        Checks if the cycle is out of time.
+
+        Args:
+            None
+
+        Returns:
+            bool: True once the deadline has passed.
+        """
+        return self.remaining() == 0
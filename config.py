@@ -0,0 +1,123 @@
+"""
+Site configuration.
+
+A single site is configured through the `.env` file. To monitor several stores
+(or several accounts on one store) from one process, point `SITES_CONFIG` at a
+TOML file with one `[[sites]]` table per site; see `sites.toml.example`.
+"""
+
+# Standard Library Imports
+import tomllib
+from os import getenv
+
+# Local Imports
+from filters import ProductFilter
+
+
+class SiteConfig:
+    """
+    Represents the credentials, pages and alert targets of one monitored site.
+
+    The filter rules are checked when the site is configured, so a bad pattern
+    stops the bot at startup instead of failing each time the site starts.
+
+    Raises:
+        ValueError: If a filter setting is unknown or a regex doesn't compile.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        login_page: str,
+        email: str,
+        password: str,
+        product_pages: list,
+        excluded_products: list,
+        chat_ids: list,
+        crawl_categories: bool = False,
+        store_api: bool = False,
+        filters: dict = None,
+    ):
+        self.name = name
+        self.login_page = login_page
+        self.email = email
+        self.password = password
+        self.product_pages = product_pages
+        self.excluded_products = excluded_products
+        self.chat_ids = chat_ids
+        self.crawl_categories = crawl_categories
+        self.store_api = store_api
+        # Product and variant rules, see `filters.ProductFilter`
+        self.filters = filters or {}
+        try:
+            ProductFilter.from_config(self.filters, excluded_products)
+        except ValueError as e:
+            raise ValueError(f"{name}: {e}") from e
+
+
+def load_sites(path: str, default_chat_id: str, defaults: dict = None) -> list:
+    """
+    Loads the sites to monitor from a TOML file.
+
+    Each `[[sites]]` table needs `name`, `login_page`, `email`, `product_pages`
+    and either `password` or `password_env` (the name of an environment variable
+    holding the password, so it can stay out of the file). `excluded_products`,
+    `chat_ids`, `crawl_categories`, `store_api` and a `[sites.filters]` table
+    are optional; `chat_ids` defaults to `default_chat_id` and the others to
+    `defaults`.
+
+    Args:
+        path (str): The path to the TOML file.
+        default_chat_id (str): The chat to alert for sites without `chat_ids`.
+        defaults (dict): Values of `crawl_categories`, `store_api` and
+            `filters` for sites that don't set them.
+
+    Returns:
+        list: A list of `SiteConfig` objects.
+
+    Raises:
+        ValueError: If the file defines no sites, a site is missing a field or
+            has invalid filter rules.
+    """
+    defaults = defaults or {}
+    with open(path, "rb") as f:
+        data = tomllib.load(f)
+
+    sites = []
+    for i, entry in enumerate(data.get("sites", [])):
+        name = entry.get("name", f"site #{i + 1}")
+        password = entry.get("password")
+        if password is None and "password_env" in entry:
+            password = getenv(entry["password_env"])
+
+        product_pages = entry.get("product_pages", [])
+        if isinstance(product_pages, str):
+            product_pages = [product_pages]
+
+        required = [entry.get("login_page"), entry.get("email"), password]
+        if not all(required) or not product_pages:
+            raise ValueError(f"Missing settings for {name} in {path}.")
+
+        sites.append(
+            SiteConfig(
+                name=name,
+                login_page=entry["login_page"],
+                email=entry["email"],
+                password=password,
+                product_pages=product_pages,
+                excluded_products=entry.get("excluded_products", []),
+                chat_ids=[str(c) for c in entry.get("chat_ids", [default_chat_id])],
+                crawl_categories=entry.get(
+                    "crawl_categories", defaults.get("crawl_categories", False)
+                ),
+                store_api=entry.get("store_api", defaults.get("store_api", False)),
+                filters=entry.get("filters", defaults.get("filters")),
+            )
+        )
+
+    if not sites:
+        raise ValueError(f"No [[sites]] defined in {path}.")
+    names = [site.name for site in sites]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Site names must be unique in {path}.")
+    return sites
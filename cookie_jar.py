@@ -0,0 +1,139 @@
+"""
+Encrypted on-disk storage of a site's authenticated cookies.
+
+Restoring the cookies of the last login on startup lets a restarted bot skip the
+Selenium login (form, reCAPTCHA and cookie wait) while the session is still
+valid. The jar is encrypted with Fernet using a key derived from a secret, so
+the session cookie never sits on disk in plain text.
+"""
+
+# Standard Library Imports
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+# Third-Party Imports
+from cryptography.fernet import Fernet, InvalidToken
+
+# Local Imports
+from scraper import LOGGED_IN_COOKIE_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+def _derive_key(secret: str, salt: str) -> bytes:
+    """
+    Derives a Fernet key from a secret.
+
+    Args:
+        secret (str): The secret to derive the key from.
+        salt (str): A per-jar salt, so jars of different sites use different keys.
+
+    Returns:
+        bytes: A url-safe base64-encoded 32-byte key.
+    """
+    key = hashlib.pbkdf2_hmac("sha256", secret.encode(), salt.encode(), 200_000)
+    return base64.urlsafe_b64encode(key)
+
+
+class CookieJar:
+    """Saves and restores a site's session cookies, encrypted at rest."""
+
+    def __init__(self, directory: str, site_name: str, secret: str):
+        slug = re.sub(r"[^a-z0-9]+", "-", site_name.lower()).strip("-")
+        self.path = os.path.join(directory, f"cookies-{slug}.bin")
+        self.fernet = Fernet(_derive_key(secret, f"stock-checker:{site_name}"))
+
+    def encrypt(self, cookies: list) -> bytes:
+        """
+        Encrypts cookies with the jar's key, e.g. to share them with workers.
+
+        Args:
+            cookies (list): Cookies as returned by `driver.get_cookies()`.
+
+        Returns:
+            bytes: The Fernet token.
+        """
+        return self.fernet.encrypt(json.dumps(cookies).encode())
+
+    def decrypt(self, token: bytes):
+        """
+        Reverses `encrypt`.
+
+        Args:
+            token (bytes): A token from `encrypt`.
+
+        Returns:
+            list: The cookies, or None if the token was encrypted with a
+                different key or is corrupt.
+        """
+        try:
+            return json.loads(self.fernet.decrypt(token))
+        except (InvalidToken, ValueError):
+            return None
+
+    def save(self, cookies: list) -> None:
+        """
+        Encrypts and writes the cookies to disk.
+
+        The file is written next to the old one and renamed over it, so a crash
+        mid-write never leaves a truncated jar behind.
+
+        Args:
+            cookies (list): Cookies as returned by `driver.get_cookies()`.
+
+        Returns:
+            None
+        """
+        token = self.encrypt(cookies)
+        tmp_path = self.path + ".tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(token)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved session cookies to {self.path}")
+
+    def load(self) -> list:
+        """
+        Reads the cookies back if the session cookie has not expired.
+
+        Args:
+            None
+
+        Returns:
+            list: The unexpired cookies, or an empty list if there is no usable jar.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                cookies = self.decrypt(f.read())
+        except FileNotFoundError:
+            return []
+        if cookies is None:
+            logger.warning(f"Ignoring unreadable cookie jar {self.path}")
+            return []
+
+        now = time.time()
+        cookies = [c for c in cookies if c.get("expiry", now + 1) > now]
+        if not any(c["name"].startswith(LOGGED_IN_COOKIE_PREFIX) for c in cookies):
+            logger.info("Saved session cookie has expired")
+            return []
+        return cookies
+
+    def clear(self) -> None:
+        """
+        Deletes the jar, e.g. after the site rejected its cookies.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
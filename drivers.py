@@ -0,0 +1,401 @@
+"""
+Chromium WebDriver creation and pooling.
+
+Launching Chromium takes seconds, so `DriverPool` keeps warm spare browsers ready
+in the background. A broken driver is swapped for a spare and its session
+cookies are carried over, instead of rebuilding everything and logging in again.
+The pool also caps how many drivers are in use at once, so the number of sites
+doesn't decide how many browsers run.
+
+In lean mode, pages stop loading at DOMContentLoaded and images, fonts,
+stylesheets and third-party trackers are blocked over CDP, since none of them
+are needed to read the product classes or variant rows.
+"""
+
+# Standard Library Imports
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Third-Party Imports
+from selenium import webdriver
+from selenium.common.exceptions import JavascriptException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+logger = logging.getLogger(__name__)
+
+# Define a custom user-agent string to mimic a real browser and avoid detection
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0.0.0 Safari/537.36"
+)
+
+# Requests dropped in lean mode. reCAPTCHA (google.com / gstatic.com scripts)
+# is not matched, and blocking is lifted during login anyway.
+_BLOCKED_EXTENSIONS = [
+    "png",
+    "jpg",
+    "jpeg",
+    "gif",
+    "webp",
+    "avif",
+    "svg",
+    "ico",
+    "woff",
+    "woff2",
+    "ttf",
+    "otf",
+    "eot",
+    "css",
+    "mp4",
+    "webm",
+]
+_BLOCKED_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "pinterest.com",
+    "tiktok.com",
+]
+BLOCKED_URL_PATTERNS = (
+    [f"*.{ext}" for ext in _BLOCKED_EXTENSIONS]
+    # WordPress appends ?ver=... to most assets
+    + [f"*.{ext}?*" for ext in _BLOCKED_EXTENSIONS]
+    + [f"*://*.{domain}/*" for domain in _BLOCKED_DOMAINS]
+)
+
+# Sums what the current page transferred, from the Performance API
+PAGE_LOAD_REPORT_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+return {
+    bytes: resources.reduce((sum, r) => sum + r.transferSize,
+                            nav ? nav.transferSize : 0),
+    requests: resources.length + 1,
+    ms: nav ? Math.round(nav.domContentLoadedEventEnd - nav.startTime) : 0,
+};
+"""
+
+# Resolves as soon as `selector` matches, from DOM mutation events instead of
+# polling. With `untilParsed`, a fully parsed page without a match also counts
+# as ready, since the element is server-rendered and won't appear later.
+WAIT_FOR_SELECTOR_SCRIPT = """
+const [selector, timeoutMs, untilParsed, done] = arguments;
+const ready = () => document.querySelector(selector) !== null
+    || (untilParsed && location.href !== 'about:blank'
+        && document.readyState !== 'loading');
+if (ready()) return done(true);
+let finished = false;
+const finish = (result) => {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    done(result);
+};
+const observer = new MutationObserver(() => { if (ready()) finish(true); });
+observer.observe(document, {childList: true, subtree: true});
+document.addEventListener('readystatechange', () => { if (ready()) finish(true); });
+const timer = setTimeout(() => finish(ready()), timeoutMs);
+"""
+
+
+def create_driver(lean: bool = False) -> webdriver.Chrome:
+    """
+    Launches a headless Chrome WebDriver.
+
+    Args:
+        lean (bool): Load pages eagerly and block non-essential resources.
+
+    Returns:
+        webdriver.Chrome: The new driver.
+    """
+    # Set up Chrome options to configure the WebDriver's behavior
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument(f"user-agent={USER_AGENT}")
+    if lean:
+        # Return from `get()` at DOMContentLoaded instead of the load event
+        options.page_load_strategy = "eager"
+
+    # Create a new Chrome WebDriver with the modified options
+    driver = webdriver.Chrome(options=options)
+    if lean:
+        set_resource_blocking(driver, True)
+    return driver
+
+
+def set_resource_blocking(driver: webdriver.Chrome, enabled: bool) -> None:
+    """
+    Turns lean-mode request blocking on or off for the current tab.
+
+    Args:
+        driver (webdriver.Chrome): The driver whose current tab to configure.
+        enabled (bool): Block `BLOCKED_URL_PATTERNS` if True, allow all if False.
+
+    Returns:
+        None
+    """
+    driver.execute_cdp_cmd("Network.enable", {})
+    patterns = BLOCKED_URL_PATTERNS if enabled else []
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+def page_load_report(driver: webdriver.Chrome) -> dict:
+    """
+    Measures what loading the current page cost.
+
+    Args:
+        driver (webdriver.Chrome): The driver to measure.
+
+    Returns:
+        dict: `bytes` transferred, `requests` made and `ms` to DOMContentLoaded.
+    """
+    return driver.execute_script(PAGE_LOAD_REPORT_SCRIPT)
+
+
+# How ChromeDriver reports a script whose document navigated away mid-wait
+_NAVIGATION_ERRORS = (
+    "document unloaded",
+    "Execution context was destroyed",
+    "Cannot find context",
+)
+
+
+def wait_for_selector(
+    driver: webdriver.Chrome, selector: str, timeout: float, until_parsed=False
+) -> bool:
+    """
+    Waits for an element in the current tab without polling.
+
+    The wait runs in the page, so it returns as soon as the element is added
+    rather than on the next poll. If the tab navigates while waiting (e.g. it
+    was still on `about:blank`), the wait restarts on the new document. Other
+    script errors, such as an invalid selector, won't clear by waiting and are
+    raised at once.
+
+    Args:
+        driver (webdriver.Chrome): The driver whose current tab to watch.
+        selector (str): A CSS selector; a comma-separated list matches any.
+        timeout (float): The most seconds to wait; 0 only checks once.
+        until_parsed (bool): Also return once the page is parsed without it.
+
+    Returns:
+        bool: True if the page became ready, False if the wait timed out.
+
+    Raises:
+        JavascriptException: If the wait script failed other than by the tab
+            navigating.
+    """
+    deadline = time.monotonic() + timeout
+    driver.set_script_timeout(timeout + 5)
+    while True:
+        remaining = max(0.0, deadline - time.monotonic())
+        try:
+            return driver.execute_async_script(
+                WAIT_FOR_SELECTOR_SCRIPT, selector, remaining * 1000, until_parsed
+            )
+        except JavascriptException as e:
+            if not any(error in (e.msg or "") for error in _NAVIGATION_ERRORS):
+                raise
+            # The document was replaced while waiting
+            if time.monotonic() >= deadline:
+                return False
+
+
+def is_driver_alive(driver: webdriver.Chrome) -> bool:
+    """
+    Checks that the browser still answers commands, with a single round trip.
+
+    Args:
+        driver (webdriver.Chrome): The driver to check.
+
+    Returns:
+        bool: True if the browser responded, False otherwise.
+    """
+    try:
+        driver.execute_script("return 1;")
+        return True
+    except WebDriverException:
+        return False
+
+
+def quit_driver(driver: webdriver.Chrome) -> None:
+    """
+    Quits a driver, ignoring errors from a browser that already died.
+
+    Args:
+        driver (webdriver.Chrome): The driver to quit.
+
+    Returns:
+        None
+    """
+    try:
+        driver.quit()
+    except WebDriverException:
+        logger.warning("Webdriver was already gone while quitting")
+
+
+class DriverPool:
+    """
+    Hands out Chromium drivers, keeping `spares` warm ones launched in advance
+    and at most `max_drivers` in use at once.
+    """
+
+    def __init__(self, spares: int = 1, lean: bool = False, max_drivers: int = 0):
+        """
+        Args:
+            spares (int): Warm drivers kept ready, on top of the ones in use.
+            lean (bool): Whether drivers block resources they don't need.
+            max_drivers (int): Drivers in use at once; `acquire` waits for a
+                release beyond that. 0 means no limit.
+        """
+        self.spares = max(0, spares)
+        self.lean = lean
+        self.max_drivers = max(0, max_drivers)
+        self._slots = threading.BoundedSemaphore(max_drivers) if max_drivers else None
+        self._ready = queue.Queue()
+        self._pending = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._launcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="driver")
+        self._refill()
+
+    def _launch_spare(self) -> None:
+        """
+        Launches one spare driver and adds it to the ready queue.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        try:
+            driver = create_driver(self.lean)
+        except Exception:
+            logger.exception("Failed to launch a spare Webdriver")
+            driver = None
+        with self._lock:
+            self._pending -= 1
+            if driver is not None and not self._closed:
+                self._ready.put(driver)
+                driver = None
+        if driver is not None:
+            # The pool was closed while this one was starting
+            quit_driver(driver)
+
+    def _refill(self) -> None:
+        """
+        Starts launching spares in the background until `spares` are ready.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self._closed:
+                return
+            missing = self.spares - self._ready.qsize() - self._pending
+            self._pending += max(0, missing)
+        for _ in range(missing):
+            self._launcher.submit(self._launch_spare)
+
+    def acquire(self) -> webdriver.Chrome:
+        """
+        Returns a ready driver, launching one if no healthy spare is waiting.
+
+        Waits for another caller to release a driver while `max_drivers` are in
+        use.
+
+        Args:
+            None
+
+        Returns:
+            webdriver.Chrome: A running driver, owned by the caller until released.
+
+        Raises:
+            RuntimeError: If the pool is closed while waiting.
+        """
+        if self._slots is not None:
+            while not self._slots.acquire(timeout=1):
+                if self._closed:
+                    raise RuntimeError("The driver pool was closed")
+        try:
+            return self._take()
+        except BaseException:
+            if self._slots is not None:
+                self._slots.release()
+            raise
+
+    def _take(self) -> webdriver.Chrome:
+        """
+        Takes a healthy spare, or launches a driver if none is waiting.
+
+        Args:
+            None
+
+        Returns:
+            webdriver.Chrome: A running driver.
+        """
+        driver = None
+        while driver is None:
+            try:
+                spare = self._ready.get_nowait()
+            except queue.Empty:
+                break
+            if is_driver_alive(spare):
+                driver = spare
+            else:
+                quit_driver(spare)
+        self._refill()
+        if driver is None:
+            logger.info("No warm Webdriver available, launching one")
+            driver = create_driver(self.lean)
+        return driver
+
+    def release(self, driver: webdriver.Chrome) -> None:
+        """
+        Shuts down a driver that is no longer needed.
+
+        Drivers are not returned to the pool because they hold another
+        site's cookies and page state, but the slot it held is freed.
+
+        Args:
+            driver (webdriver.Chrome): The driver to release.
+
+        Returns:
+            None
+        """
+        try:
+            quit_driver(driver)
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def close(self) -> None:
+        """
+        Stops launching spares and quits every spare driver.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._closed = True
+        self._launcher.shutdown(wait=False, cancel_futures=True)
+        while True:
+            try:
+                quit_driver(self._ready.get_nowait())
+            except queue.Empty:
+                break
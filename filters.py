@@ -0,0 +1,178 @@
+"""
+Product filtering rules.
+
+A site's rules decide which products are checked at all and which of their
+variants count. Product rules (title patterns, categories, tags and a price
+ceiling) only need what the listing page already shows, so products nobody
+wants are dropped before their variant page is ever fetched. Size and price
+rules are then applied to the variants read from each page.
+
+The rules are set per site in the `[sites.filters]` table of the TOML config,
+or in `PRODUCT_FILTERS` in `constants.py`; see `sites.toml.example`.
+"""
+
+# Standard Library Imports
+import re
+
+# WooCommerce adds these classes to every `li.product` for its terms
+CATEGORY_PREFIX = "product_cat-"
+TAG_PREFIX = "product_tag-"
+
+
+def _compile(patterns: list):
+    """
+    Compiles several regular expressions into one case-insensitive pattern.
+
+    Args:
+        patterns (list): The expressions; any of them may match.
+
+    Returns:
+        re.Pattern: The combined pattern, or None if there are none.
+    """
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+def _terms(classes: list, prefix: str) -> set:
+    """
+    Reads the category or tag slugs from a product's classes.
+
+    Args:
+        classes (list): The classes of the `li.product` element.
+        prefix (str): `CATEGORY_PREFIX` or `TAG_PREFIX`.
+
+    Returns:
+        set: The slugs, e.g. {"green-tea"}.
+    """
+    return {name[len(prefix) :] for name in classes if name.startswith(prefix)}
+
+
+class ProductFilter:
+    """Compiled product and variant rules of one site."""
+
+    def __init__(
+        self,
+        include: list = (),
+        exclude: list = (),
+        excluded_titles: list = (),
+        categories: list = (),
+        exclude_categories: list = (),
+        tags: list = (),
+        exclude_tags: list = (),
+        sizes: list = (),
+        max_price: float = None,
+    ):
+        """
+        Compiles the rules. Empty rules let everything through.
+
+        Args:
+            include (list): Title regexes; a product must match one of them.
+            exclude (list): Title regexes; products matching any are dropped.
+            excluded_titles (list): Exact titles to drop (`EXCLUDED_PRODUCTS`).
+            categories (list): Category slugs; a product must be in one of them.
+            exclude_categories (list): Category slugs whose products are dropped.
+            tags (list): Tag slugs; a product must have one of them.
+            exclude_tags (list): Tag slugs whose products are dropped.
+            sizes (list): Variant sizes to keep (case-insensitive).
+            max_price (float): Keep only variants at or below this price.
+        """
+        self.include = _compile(include)
+        self.exclude = _compile(exclude)
+        self.excluded_titles = frozenset(excluded_titles)
+        self.categories = frozenset(categories)
+        self.exclude_categories = frozenset(exclude_categories)
+        self.tags = frozenset(tags)
+        self.exclude_tags = frozenset(exclude_tags)
+        self.sizes = frozenset(size.strip().casefold() for size in sizes)
+        self.max_cents = None if max_price is None else round(max_price * 100)
+
+    @classmethod
+    def from_config(cls, rules: dict, excluded_titles: list = ()) -> "ProductFilter":
+        """
+        Builds the filter from a site's `filters` settings.
+
+        Args:
+            rules (dict): The settings, keyed like the constructor arguments.
+            excluded_titles (list): The site's `excluded_products`.
+
+        Returns:
+            ProductFilter: The compiled filter.
+
+        Raises:
+            ValueError: If a setting is unknown or a regex doesn't compile.
+        """
+        rules = dict(rules or {})
+        unknown = rules.keys() - {
+            "include",
+            "exclude",
+            "categories",
+            "exclude_categories",
+            "tags",
+            "exclude_tags",
+            "sizes",
+            "max_price",
+        }
+        if unknown:
+            raise ValueError(f"Unknown filter settings: {', '.join(sorted(unknown))}")
+        try:
+            return cls(excluded_titles=excluded_titles, **rules)
+        except re.error as e:
+            raise ValueError(f"Invalid filter pattern: {e}") from e
+
+    def wants(self, record: dict) -> bool:
+        """
+        Checks a product from the listing page against the product rules.
+
+        A listed price above `max_price` drops the product too, since none of
+        its variants could be cheap enough.
+
+        Args:
+            record (dict): A product record as returned by `parse_products`.
+
+        Returns:
+            bool: True if the product should be checked.
+        """
+        title = record["title"]
+        if title in self.excluded_titles:
+            return False
+        if self.include and not self.include.search(title):
+            return False
+        if self.exclude and self.exclude.search(title):
+            return False
+        classes = record["classes"]
+        if self.categories or self.exclude_categories:
+            categories = _terms(classes, CATEGORY_PREFIX)
+            if self.categories and not categories & self.categories:
+                return False
+            if categories & self.exclude_categories:
+                return False
+        if self.tags or self.exclude_tags:
+            tags = _terms(classes, TAG_PREFIX)
+            if self.tags and not tags & self.tags:
+                return False
+            if tags & self.exclude_tags:
+                return False
+        price = record.get("price")
+        if self.max_cents is not None and price is not None:
+            return price <= self.max_cents
+        return True
+
+    def select_variants(self, variants: list) -> list:
+        """
+        Keeps the variants that match the size and price rules.
+
+        Args:
+            variants (list): A product's in-stock `Variant`s.
+
+        Returns:
+            list: The matching variants, in order.
+        """
+        if not self.sizes and self.max_cents is None:
+            return variants
+        return [
+            v
+            for v in variants
+            if (not self.sizes or v.size.strip().casefold() in self.sizes)
+            and (self.max_cents is None or v.price.cents <= self.max_cents)
+        ]
@@ -0,0 +1,423 @@
+"""
+Append-only stock history.
+
+Every restock, sellout and price change is appended to a compact binary log, so
+the history of how long products stay in stock, when restocks happen and how
+prices move survives past the alert. Only changes are stored: a cycle that sees
+the same stock as the last one writes nothing, so the log is run-length encoded
+by construction and a year of 10-second polling stays small.
+
+The history is a directory with two files:
+
+- `records.bin`: fixed-size 16-byte records (time, variant, price, kind) in time
+  order. Readers memory-map it and binary search on time, so a query only
+  unpacks the records in its time range.
+- `variants.jsonl`: one line per variant (site, URL, title, size, currency),
+  numbered by line, so records refer to variants by a 4-byte number.
+
+Query it from the command line:
+
+    python history.py restocks [--by-hour]
+    python history.py durations
+    python history.py prices
+
+Each takes `--dir`, `--site`, `--product` (a URL or title substring) and
+`--since` / `--until` (YYYY-MM-DD).
+"""
+
+# Standard Library Imports
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+import weakref
+from bisect import bisect_left
+from datetime import datetime
+
+# Local Imports
+from models import Price
+from state import PRICE_CHANGED, RESTOCKED, SOLD_OUT
+
+# Seconds since the epoch, variant number, price in cents, kind, padding
+RECORD = struct.Struct("<IIiB3x")
+KINDS = [SOLD_OUT, RESTOCKED, PRICE_CHANGED]
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+RECORDS_FILE = "records.bin"
+VARIANTS_FILE = "variants.jsonl"
+
+
+def _truncate_partial(path: str, size: int) -> None:
+    """
+    Cuts a torn write (from a crash mid-append) off the end of a file.
+
+    Args:
+        path (str): The file.
+        size (int): The length of the file's last complete entry boundary.
+
+    Returns:
+        None
+    """
+    if os.path.exists(path) and os.path.getsize(path) != size:
+        with open(path, "r+b") as f:
+            f.truncate(size)
+
+
+def _load_variants(path: str) -> tuple:
+    """
+    Reads the variant table.
+
+    Args:
+        path (str): The `variants.jsonl` file.
+
+    Returns:
+        tuple: The list of variant dicts, numbered by position, and the length
+            of the file up to its last complete line.
+    """
+    variants = []
+    complete = 0
+    if not os.path.exists(path):
+        return variants, complete
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            complete += len(line)
+            variants.append(json.loads(line))
+    return variants, complete
+
+
+class HistoryStore:
+    """Appends stock changes to the history directory."""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        records_path = os.path.join(directory, RECORDS_FILE)
+        variants_path = os.path.join(directory, VARIANTS_FILE)
+
+        variants, complete = _load_variants(variants_path)
+        _truncate_partial(variants_path, complete)
+        self._ids = {
+            (v["site"], v["url"], v["size"]): i for i, v in enumerate(variants)
+        }
+
+        size = os.path.getsize(records_path) if os.path.exists(records_path) else 0
+        _truncate_partial(records_path, size - size % RECORD.size)
+        self.last_time = 0
+        if size >= RECORD.size:
+            with open(records_path, "rb") as f:
+                f.seek(size - size % RECORD.size - RECORD.size)
+                self.last_time = RECORD.unpack(f.read(RECORD.size))[0]
+
+        self._variants = open(variants_path, "a", encoding="utf-8")
+        self._records = open(records_path, "ab")
+
+    def _variant_id(self, site: str, change) -> int:
+        """
+        Numbers a variant, adding it to the variant table the first time.
+
+        Args:
+            site (str): The site name.
+            change (StockChange): A change to the variant.
+
+        Returns:
+            int: The variant number.
+        """
+        key = (site, change.url, change.size)
+        variant_id = self._ids.get(key)
+        if variant_id is None:
+            variant_id = self._ids[key] = len(self._ids)
+            entry = {
+                "site": site,
+                "url": change.url,
+                "size": change.size,
+                "title": change.title,
+                "currency": change.price.currency,
+                "symbol": change.price.symbol,
+            }
+            self._variants.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            # Written before any record that refers to it
+            self._variants.flush()
+        return variant_id
+
+    def record(self, site: str, changes: list, timestamp: float = None) -> None:
+        """
+        Appends the changes of one product. Call `flush` at the end of a cycle.
+
+        Args:
+            site (str): The site name.
+            changes (list): `StockChange` objects from `StockState.update_product`.
+            timestamp (float): When they were seen; now by default.
+
+        Returns:
+            None
+        """
+        if not changes:
+            return
+        # Records must stay in time order for the readers' binary search, even
+        # if the clock steps back
+        seconds = max(int(time.time() if timestamp is None else timestamp), 0)
+        self.last_time = max(self.last_time, seconds)
+        for change in changes:
+            self._records.write(
+                RECORD.pack(
+                    self.last_time,
+                    self._variant_id(site, change),
+                    change.price.cents,
+                    KIND_CODES[change.kind],
+                )
+            )
+
+    def flush(self) -> None:
+        """
+        Writes the appended records to disk.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._records.flush()
+
+    def close(self) -> None:
+        """
+        Flushes and closes the history files.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._records.close()
+        self._variants.close()
+
+
+class HistoryReader:
+    """Memory-mapped, time-indexed reads of a history directory."""
+
+    def __init__(self, directory: str):
+        self.variants, _ = _load_variants(os.path.join(directory, VARIANTS_FILE))
+        self._file = open(os.path.join(directory, RECORDS_FILE), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self.count = size // RECORD.size
+        self._map = None
+        if self.count:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Iterators still reading the mapping, stopped on `close`
+        self._iterators = weakref.WeakSet()
+
+    def _time(self, index: int) -> int:
+        """Reads the time of one record straight from the mapping."""
+        return struct.unpack_from("<I", self._map, index * RECORD.size)[0]
+
+    def select(self, site: str = None, product: str = None) -> set:
+        """
+        Finds the variants of matching products.
+
+        Args:
+            site (str): Only this site.
+            product (str): A substring of the product URL or title
+                (case-insensitive).
+
+        Returns:
+            set: The matching variant numbers.
+        """
+        needle = product.casefold() if product else None
+        return {
+            i
+            for i, v in enumerate(self.variants)
+            if (site is None or v["site"] == site)
+            and (
+                needle is None
+                or needle in v["url"].casefold()
+                or needle in v["title"].casefold()
+            )
+        }
+
+    def records(self, variant_ids: set = None, since: int = None, until: int = None):
+        """
+        Yields the records in a time range, found by binary search on time.
+
+        Args:
+            variant_ids (set): Only these variants; all by default.
+            since (int): Epoch seconds to start from (inclusive).
+            until (int): Epoch seconds to stop at (exclusive).
+
+        Returns:
+            iterator: (time, variant number, cents, kind) tuples.
+        """
+        iterator = self._iter_records(variant_ids, since, until)
+        self._iterators.add(iterator)
+        return iterator
+
+    def _iter_records(self, variant_ids: set, since: int, until: int):
+        """Yields the records for `records`."""
+        if not self.count:
+            return
+        start = (
+            0
+            if since is None
+            else bisect_left(range(self.count), since, key=self._time)
+        )
+        end = (
+            self.count
+            if until is None
+            else bisect_left(range(self.count), until, key=self._time)
+        )
+        # A view rather than a slice, which would copy the range; records are
+        # unpacked as they are read, so only the pages in use are loaded
+        whole = memoryview(self._map)
+        view = whole[start * RECORD.size : end * RECORD.size]
+        unpacker = RECORD.iter_unpack(view)
+        try:
+            for seconds, variant_id, cents, code in unpacker:
+                if variant_ids is None or variant_id in variant_ids:
+                    yield seconds, variant_id, cents, KINDS[code]
+        finally:
+            # The mapping can't be closed while a view of it is exported
+            del unpacker
+            view.release()
+            whole.release()
+
+    def price(self, variant_id: int, cents: int) -> Price:
+        """
+        Builds a `Price` in the variant's currency.
+
+        Args:
+            variant_id (int): The variant number.
+            cents (int): The amount.
+
+        Returns:
+            Price: The price.
+        """
+        v = self.variants[variant_id]
+        return Price(cents, v.get("currency", ""), v.get("symbol", ""))
+
+    def close(self) -> None:
+        """
+        Unmaps and closes the records file, stopping unfinished `records`.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        for iterator in list(self._iterators):
+            iterator.close()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+def in_stock_runs(reader: HistoryReader, records) -> list:
+    """
+    Pairs each restock with the sellout that ended it.
+
+    Args:
+        reader (HistoryReader): The history the records come from.
+        records (iterable): Records from `HistoryReader.records`.
+
+    Returns:
+        list: (variant number, start, end) tuples; `end` is None while the
+            variant is still in stock.
+    """
+    started = {}
+    runs = []
+    for seconds, variant_id, _, kind in records:
+        if kind == RESTOCKED:
+            started.setdefault(variant_id, seconds)
+        elif kind == SOLD_OUT and variant_id in started:
+            runs.append((variant_id, started.pop(variant_id), seconds))
+    runs.extend((variant_id, start, None) for variant_id, start in started.items())
+    return runs
+
+
+def _format_time(seconds: int) -> str:
+    """Formats epoch seconds as local date and time."""
+    return datetime.fromtimestamp(seconds).strftime("%Y-%m-%d %H:%M")
+
+
+def _format_duration(seconds: float) -> str:
+    """Formats a duration as hours and minutes."""
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}h{rest // 60:02d}m"
+
+
+def _label(reader: HistoryReader, variant_id: int) -> str:
+    """Names a variant by its product title and size."""
+    v = reader.variants[variant_id]
+    return f"{v['title']} ({v['size']})"
+
+
+def _epoch(day: str):
+    """Converts a YYYY-MM-DD date to local epoch seconds, passing None through."""
+    return None if day is None else int(datetime.fromisoformat(day).timestamp())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("query", choices=["restocks", "durations", "prices"])
+    parser.add_argument("--dir", default=os.getenv("HISTORY_DIR", "/tmp/stock_history"))
+    parser.add_argument("--site")
+    parser.add_argument("--product", help="URL or title substring")
+    parser.add_argument("--since", help="YYYY-MM-DD")
+    parser.add_argument("--until", help="YYYY-MM-DD")
+    parser.add_argument("--by-hour", action="store_true", help="restocks per hour")
+    args = parser.parse_args()
+    if not os.path.exists(os.path.join(args.dir, RECORDS_FILE)):
+        parser.error(f"No history in {args.dir}")
+
+    reader = HistoryReader(args.dir)
+    try:
+        variant_ids = None
+        if args.site or args.product:
+            variant_ids = reader.select(args.site, args.product)
+        records = reader.records(variant_ids, _epoch(args.since), _epoch(args.until))
+
+        if args.query == "restocks":
+            restocks = [r for r in records if r[3] == RESTOCKED]
+            if args.by_hour:
+                hours = [0] * 24
+                for seconds, *_ in restocks:
+                    hours[datetime.fromtimestamp(seconds).hour] += 1
+                peak = max(max(hours), 1)
+                for hour, count in enumerate(hours):
+                    print(f"{hour:02d}:00 {count:>6} {'#' * (count * 50 // peak)}")
+            else:
+                for seconds, variant_id, cents, _ in restocks:
+                    print(
+                        f"{_format_time(seconds)}  {_label(reader, variant_id)}  "
+                        f"{reader.price(variant_id, cents)}"
+                    )
+
+        elif args.query == "durations":
+            now = time.time()
+            per_variant = {}
+            for variant_id, start, end in in_stock_runs(reader, records):
+                per_variant.setdefault(variant_id, []).append((end or now) - start)
+            for variant_id, durations in sorted(
+                per_variant.items(), key=lambda item: _label(reader, item[0])
+            ):
+                print(
+                    f"{_label(reader, variant_id)}: {len(durations)} runs, "
+                    f"mean {_format_duration(sum(durations) / len(durations))}, "
+                    f"longest {_format_duration(max(durations))}"
+                )
+
+        else:
+            for seconds, variant_id, cents, kind in records:
+                if kind != SOLD_OUT:
+                    print(
+                        f"{_format_time(seconds)}  {_label(reader, variant_id)}  "
+                        f"{reader.price(variant_id, cents)}"
+                    )
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,75 @@
 # Standard Library Imports
 import asyncio
 import logging
+import os
+import socket
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, contextmanager
+from functools import partial
 from os import getenv
+from urllib.parse import urljoin
 
 # Third-Party Imports
 from telegram import Bot
+from telegram.request import HTTPXRequest
 from dotenv import load_dotenv
-from selenium import webdriver
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.remote.webelement import WebElement
 
 # Local Imports
+from browser_watchdog import (
+    BrowserWatchdog,
+    browser_usage,
+    close_stray_tabs,
+    command_latency,
+)
+from budget import BudgetExceededError, CycleBudget
+from config import SiteConfig, load_sites
+import constants
 from constants import EXCLUDED_PRODUCTS
+from cookie_jar import CookieJar
+from drivers import (
+    USER_AGENT,
+    DriverPool,
+    is_driver_alive,
+    page_load_report,
+    set_resource_blocking,
+    wait_for_selector,
+)
+from filters import ProductFilter
+from history import HistoryStore
+from scheduler import PollScheduler, ProductSchedule
+import metrics
+from metrics import timed
+from models import Product, StockStatus
+from notifier import NotificationQueue
+from state import PRICE_CHANGED, RESTOCKED, SOLD_OUT, StockState
+from store_api import (
+    StoreApiTemporaryError,
+    StoreApiUnavailableError,
+    product_url_key,
+)
+from subscriptions import SubscriptionIndex, Watch, load_subscriptions
+from scraper import (
+    HttpPool,
+    HttpScraper,
+    LoginFailedError,
+    RateLimitedError,
+    SessionExpiredError,
+    is_logged_out_listing,
+    is_logged_out_page,
+    parse_listing,
+    parse_products,
+    parse_variants,
+    product_key,
+)
+from work_queue import LISTING, VARIANTS, decode_result, open_work_queue, process_unit
 
 
 # Load environment variables from the .env file
@@ -30,20 +81,127 @@ PRODUCT_PAGE = getenv("PRODUCT_PAGE")
 TELEGRAM_TOKEN = getenv("TELEGRAM_TOKEN")
 TELEGRAM_CHAT_ID = getenv("TELEGRAM_CHAT_ID")
 COMPANY_NAME = getenv("COMPANY_NAME")
+# Optional TOML file listing several sites; replaces the single-site settings above
+SITES_CONFIG = getenv("SITES_CONFIG")
+# Product and variant rules from constants.py, used by sites without their own
+PRODUCT_FILTERS = getattr(constants, "PRODUCT_FILTERS", {})
+# "http" fetches pages with the logged-in cookies, "selenium" renders them
+SCRAPER_BACKEND = getenv("SCRAPER_BACKEND", "http")
+# Follow category tiles on the listing pages, and the most listing pages
+# (pagination and categories) crawled per cycle
+CRAWL_CATEGORIES = getenv("CRAWL_CATEGORIES", "false").lower() == "true"
+MAX_LISTING_PAGES = int(getenv("MAX_LISTING_PAGES", "50"))
+# Read variants from the WooCommerce Store API instead of each product page
+STORE_API = getenv("STORE_API", "false").lower() == "true"
+# Number of product pages fetched at once, and the per-host request rate cap
+VARIANT_CONCURRENCY = int(getenv("VARIANT_CONCURRENCY", "8"))
+MAX_REQUESTS_PER_SECOND = float(getenv("MAX_REQUESTS_PER_SECOND", "5"))
+# Pages per site whose validators and parsed results are kept; the least
+# recently fetched are evicted past this
+PAGE_CACHE_SIZE = int(getenv("PAGE_CACHE_SIZE", "10000"))
+# Seconds between cycles. Hot sites and products are polled down to the minimum,
+# errors back off and quiet products are refreshed up to the maximum
+POLL_INTERVAL = float(getenv("POLL_INTERVAL", "60"))
+MIN_POLL_INTERVAL = float(getenv("MIN_POLL_INTERVAL", "10"))
+MAX_POLL_INTERVAL = float(getenv("MAX_POLL_INTERVAL", "600"))
+POLL_JITTER = float(getenv("POLL_JITTER", "0.1"))
+# Latency budget: a cycle gets CYCLE_BUDGET seconds (0: the current poll
+# interval) and each page load or wait at most PAGE_TIMEOUT of them. Pages that
+# don't make it are skipped and checked next cycle
+CYCLE_BUDGET = float(getenv("CYCLE_BUDGET", "0"))
+PAGE_TIMEOUT = float(getenv("PAGE_TIMEOUT", "10"))
+# The most seconds each step of the browser login may wait
+LOGIN_TIMEOUT = float(getenv("LOGIN_TIMEOUT", "10"))
+# Number of warm Chromium instances kept ready to replace a broken one
+DRIVER_SPARES = int(getenv("DRIVER_SPARES", "1"))
+# Most Chromium instances in use at once. The "http" backend only borrows one
+# to log in or fall back, so sites share them; "selenium" keeps one per site
+MAX_DRIVERS = int(getenv("MAX_DRIVERS", "2"))
+# Replace the browser between cycles once its processes use more than
+# BROWSER_MAX_MEMORY_MB or keep more than BROWSER_MAX_OPEN_FILES files open, or
+# its commands get BROWSER_MAX_LATENCY_DRIFT times slower than when it was new.
+# 0 turns a check off
+BROWSER_MAX_MEMORY_MB = float(getenv("BROWSER_MAX_MEMORY_MB", "1500"))
+BROWSER_MAX_OPEN_FILES = int(getenv("BROWSER_MAX_OPEN_FILES", "4096"))
+BROWSER_MAX_LATENCY_DRIFT = float(getenv("BROWSER_MAX_LATENCY_DRIFT", "3"))
+# Block images, fonts, CSS and trackers and stop loading at DOMContentLoaded
+LEAN_BROWSER = getenv("LEAN_BROWSER", "true").lower() == "true"
+# Where the encrypted session cookies are kept between restarts. The key is
+# derived from COOKIE_JAR_KEY if set, otherwise from the site's password
+COOKIE_JAR_DIR = getenv("COOKIE_JAR_DIR", "/tmp")
+COOKIE_JAR_KEY = getenv("COOKIE_JAR_KEY")
+# Prometheus metrics: serve /metrics on this port and/or write a textfile.
+# Only local clients can connect unless METRICS_ADDR binds another interface
+METRICS_PORT = getenv("METRICS_PORT")
+METRICS_ADDR = getenv("METRICS_ADDR", "127.0.0.1")
+METRICS_TEXTFILE = getenv("METRICS_TEXTFILE")
+# SQLite file holding the last seen stock, used to alert only on changes
+STATE_DB = getenv("STATE_DB", "/tmp/stock_checker.db")
+# Directory of the append-only log of every stock change, queried with
+# `python history.py`. Set it empty to keep no history
+HISTORY_DIR = getenv("HISTORY_DIR", "/tmp/stock_history")
+# Optional TOML file of subscribers, each alerted only on the products, sizes
+# and prices they watch (the sites' own chats still get every change)
+SUBSCRIPTIONS = getenv("SUBSCRIPTIONS")
+# "standalone" fetches every page itself. A "coordinator" logs in, alerts and
+# splits each cycle's pages into units of WORK_UNIT_SIZE pages on WORK_QUEUE (a
+# SQLite file, or a redis:// URL for workers on other hosts), which "worker"
+# processes claim for WORK_LEASE seconds at a time
+ROLE = getenv("ROLE", "standalone")
+WORK_QUEUE = getenv("WORK_QUEUE", "/tmp/stock_checker_queue.db")
+WORK_UNIT_SIZE = int(getenv("WORK_UNIT_SIZE", "10"))
+WORK_LEASE = float(getenv("WORK_LEASE", "60"))
+# Seconds between checks of the work queue while waiting
+WORK_POLL_INTERVAL = 0.05
+
+if ROLE not in ("standalone", "coordinator", "worker"):
+    raise ValueError("ROLE must be 'standalone', 'coordinator' or 'worker'.")
+
+# Check if all required environment variables are set. Workers send no alerts
+if ROLE != "worker" and not all([TELEGRAM_TOKEN, TELEGRAM_CHAT_ID]):
+    raise ValueError("Missing environment variables. Check your .env file.")
 
-# Check if all required environment variables are set
-if not all(
-    [
-        LOGIN_PAGE,
-        EMAIL,
-        PASSWORD,
-        PRODUCT_PAGE,
-        TELEGRAM_TOKEN,
+if SITES_CONFIG:
+    SITES = load_sites(
+        SITES_CONFIG,
         TELEGRAM_CHAT_ID,
-        COMPANY_NAME,
+        {
+            "crawl_categories": CRAWL_CATEGORIES,
+            "store_api": STORE_API,
+            "filters": PRODUCT_FILTERS,
+        },
+    )
+else:
+    if not all([LOGIN_PAGE, EMAIL, PASSWORD, PRODUCT_PAGE, COMPANY_NAME]):
+        raise ValueError("Missing environment variables. Check your .env file.")
+    SITES = [
+        SiteConfig(
+            name=COMPANY_NAME,
+            login_page=LOGIN_PAGE,
+            email=EMAIL,
+            password=PASSWORD,
+            # Several listing or category pages can be given, comma separated
+            product_pages=[page.strip() for page in PRODUCT_PAGE.split(",")],
+            excluded_products=EXCLUDED_PRODUCTS,
+            chat_ids=[TELEGRAM_CHAT_ID],
+            crawl_categories=CRAWL_CATEGORIES,
+            store_api=STORE_API,
+            filters=PRODUCT_FILTERS,
+        )
     ]
-):
-    raise ValueError("Missing environment variables. Check your .env file.")
+
+WATCHES = load_subscriptions(SUBSCRIPTIONS) if SUBSCRIPTIONS else []
+
+if SCRAPER_BACKEND not in ("http", "selenium"):
+    raise ValueError("SCRAPER_BACKEND must be either 'http' or 'selenium'.")
+if ROLE != "standalone" and SCRAPER_BACKEND != "http":
+    raise ValueError("Workers fetch pages over HTTP; set SCRAPER_BACKEND=http.")
+
+# Any of these on the login page means it loads reCAPTCHA
+RECAPTCHA_MARKUP = ".g-recaptcha, script[src*='recaptcha'], iframe[title='reCAPTCHA']"
+# A product page is ready to read once one of these is in it; the login form
+# means the session was lost
+VARIANT_PAGE_READY = ".product-form-row, form.variations_form, [name='login']"
 
 
 # Set up logging for the bot
@@ -56,40 +214,107 @@ logging.basicConfig(
 )
 
 
-class Product:
-    """Represents a product with a title, status, URL, and its product variants."""
+class SiteLogger(logging.LoggerAdapter):
+    """Prefixes log messages with the site name so interleaved sites stay readable."""
 
-    def __init__(self, title: str, status: str, url: str, variants: list):
-        self.title = title
-        self.status = status
-        self.url = url
-        self.variants = variants
+    def process(self, msg, kwargs):
+        return f"[{self.extra['site']}] {msg}", kwargs
 
 
 class StockChecker:
     """
     A class to handle the login and scraping process. It interacts with the website
     using Selenium, logs in with provided credentials, and scrapes product stock data.
+
+    With the "http" backend, Selenium is only used to log in; its session cookies
+    are handed to an `HttpScraper` which fetches and parses the pages without a
+    browser. If the cookies stop working the Selenium path is used instead. A
+    driver is only borrowed from the pool for those, and given back after.
     """
 
-    def __init__(self):
+    def __init__(self, site: SiteConfig, pool: HttpPool, drivers: DriverPool):
         """Set up the webdriver"""
-        # Define a custom user-agent string to mimic a real browser and avoid detection
-        user_agent = (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/124.0.0.0 Safari/537.36"
+        self.site = site
+        self.site_name = site.name
+        self.logger = SiteLogger(logger, {"site": site.name})
+
+        # The "selenium" backend keeps a warm Chrome WebDriver from the pool,
+        # and watches how it ages; "http" borrows one when needed (`_browser`)
+        self.drivers = drivers
+        self.driver = None
+        self.watchdog = BrowserWatchdog(
+            BROWSER_MAX_MEMORY_MB, BROWSER_MAX_OPEN_FILES, BROWSER_MAX_LATENCY_DRIFT
+        )
+        # Which products are checked, and which of their variants count
+        self.rules = ProductFilter.from_config(site.filters, site.excluded_products)
+        # When each in-stock product's variant page is next due
+        self.schedule = ProductSchedule(MIN_POLL_INTERVAL, MAX_POLL_INTERVAL)
+        # Cookies of the last successful login, used to restore a replaced driver
+        self.session_cookies = []
+        self.cookie_jar = CookieJar(
+            COOKIE_JAR_DIR, site.name, COOKIE_JAR_KEY or site.password
         )
-        # Set up Chrome options to configure the WebDriver's behavior
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument(f"user-agent={user_agent}")
-
-        # Create a new Chrome WebDriver with the modified options
-        self.driver = webdriver.Chrome(options=options)
 
-        self.products = []
+        # Browserless scraper, only used with the "http" backend
+        self.http = None
+        if SCRAPER_BACKEND == "http":
+            self.http = HttpScraper(
+                USER_AGENT, site.login_page, pool, site.name, PAGE_CACHE_SIZE
+            )
+        # Turned off for good if the site turns out not to serve the Store API
+        self.store_api = site.store_api and self.http is not None
+        # Shared queue the coordinator hands its pages to workers through,
+        # cleared of units a previous run left behind
+        self.queue = None
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{site.name}"
+        self.published_cookies = None
+        if ROLE == "coordinator":
+            self.queue = open_work_queue(WORK_QUEUE, WORK_LEASE)
+            self.queue.purge(site.name)
+
+        # In-stock variants of each product from the last cycle, reused for
+        # products whose variant page is not due
+        self.variants = {}
         self.stock_count = 0
+        # Transfer size and load time of each page the browser loaded this cycle
+        self.page_loads = []
+        # Deadline of the current cycle. Product pages skipped for running over
+        # it, and whether every listing page was crawled, are kept for the
+        # caller and the next cycle
+        self.budget = CycleBudget(page_timeout=PAGE_TIMEOUT)
+        self.skipped = set()
+        self.crawl_complete = True
+
+        # Last, so nothing above can fail while a pool slot is held
+        if SCRAPER_BACKEND == "selenium":
+            self.driver = drivers.acquire()
+
+    @contextmanager
+    def _browser(self, restore: bool = True):
+        """
+        Holds a driver for a browser task such as a login.
+
+        A driver the checker already holds is used as is. Otherwise one is
+        borrowed from the pool, waiting while all of them are in use, and
+        released when the task is done.
+
+        Args:
+            restore (bool): Load the session cookies into a borrowed driver.
+
+        Yields:
+            webdriver.Chrome: The driver, also available as `self.driver`.
+        """
+        if self.driver is not None:
+            yield self.driver
+            return
+        self.driver = self.drivers.acquire()
+        try:
+            if restore:
+                self._restore_cookies()
+            yield self.driver
+        finally:
+            self.drivers.release(self.driver)
+            self.driver = None
 
     def _scroll_into_view(self, element: WebElement) -> None:
         """
@@ -108,8 +333,8 @@ class StockChecker:
         Handles the reCAPTCHA challenge if it appears on the login page.
 
         If the reCAPTCHA is present, the function bypasses it by interacting with the
-        reCAPTCHA checkbox. If it's not present, the function logs that reCAPTCHA
-        was not found.
+        reCAPTCHA checkbox. If the page has no reCAPTCHA markup at all, it returns
+        straight away instead of waiting for an iframe that will never load.
 
         Args:
             None
@@ -117,25 +342,27 @@ class StockChecker:
         Returns:
             None
         """
+        if not self.driver.find_elements(By.CSS_SELECTOR, RECAPTCHA_MARKUP):
+            self.logger.info("reCAPTCHA not found")
+            return
         try:
-            # Wait for the iframe to be present and switch to it
-            iframe = WebDriverWait(self.driver, 3).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "iframe[title='reCAPTCHA']")
-                )
-            )
+            # Wait for the iframe to be added and switch to it
+            iframe_selector = "iframe[title='reCAPTCHA']"
+            if not wait_for_selector(self.driver, iframe_selector, LOGIN_TIMEOUT):
+                raise TimeoutException("reCAPTCHA iframe did not load")
+            iframe = self.driver.find_element(By.CSS_SELECTOR, iframe_selector)
             self.driver.switch_to.frame(iframe)
             # Wait for the reCAPTCHA checkbox to be clickable and click it
-            recaptcha_checkbox = WebDriverWait(self.driver, 3).until(
+            recaptcha_checkbox = WebDriverWait(self.driver, LOGIN_TIMEOUT).until(
                 EC.element_to_be_clickable((By.CLASS_NAME, "recaptcha-checkbox-border"))
             )
             self._scroll_into_view(recaptcha_checkbox)
             recaptcha_checkbox.click()
-            logger.info("reCAPTCHA bypassed")
+            self.logger.info("reCAPTCHA bypassed")
 
         except TimeoutException:
             # reCAPTCHA not present; skipping
-            logger.info("reCAPTCHA not found")
+            self.logger.info("reCAPTCHA not found")
 
         self.driver.switch_to.default_content()
 
@@ -155,6 +382,7 @@ class StockChecker:
         self._scroll_into_view(field_input)
         field_input.send_keys(value)
 
+    @timed("login")
     def login(self) -> bool:
         """
         Logs into the target website by submitting the login form with the
@@ -168,13 +396,36 @@ class StockChecker:
         Returns:
             bool: True if login is successful, False otherwise.
         """
-        logger.info("Starting login process")
+        self.logger.info("Starting login process")
+        with self._browser(restore=False):
+            if LEAN_BROWSER:
+                # reCAPTCHA needs its images and styles to work
+                set_resource_blocking(self.driver, False)
+            try:
+                success = self._login()
+                result = "success" if success else "failure"
+                metrics.LOGINS.labels(self.site_name, result).inc()
+                return success
+            finally:
+                if LEAN_BROWSER:
+                    set_resource_blocking(self.driver, True)
+
+    def _login(self) -> bool:
+        """
+        Fills in and submits the login form (see `login`).
+
+        Args:
+            None
+
+        Returns:
+            bool: True if login is successful, False otherwise.
+        """
         # Open the login page
-        self.driver.get(LOGIN_PAGE)
+        self.driver.get(self.site.login_page)
         # Input the email
-        self._fill_input_field("username", EMAIL)
+        self._fill_input_field("username", self.site.email)
         # Input Password
-        self._fill_input_field("password", PASSWORD)
+        self._fill_input_field("password", self.site.password)
 
         self._handle_recaptcha()
 
@@ -187,27 +438,87 @@ class StockChecker:
         # and ensure that the the login session cookie is set before navigating
         # to the product page.
         try:
-            # Wait until the session cookie is present
-            WebDriverWait(self.driver, 10).until(lambda driver: self.is_logged_in())
-            logger.info("Login successful. Session cookie found.")
-            self.driver.get(
-                PRODUCT_PAGE
-            )  # Once logged in, navigate to the product page
+            # The form goes stale once the POST has navigated away, which also
+            # catches a rejected password without waiting out the timeout
+            WebDriverWait(self.driver, LOGIN_TIMEOUT, poll_frequency=0.2).until(
+                EC.any_of(
+                    EC.staleness_of(login_button), lambda driver: self.is_logged_in()
+                )
+            )
+            if not self.is_logged_in():
+                raise TimeoutException("Login form submitted without a session")
+            self.logger.info("Login successful. Session cookie found.")
+            self.session_cookies = self.driver.get_cookies()
+            self.cookie_jar.save(self.session_cookies)
+            if self.http is not None:
+                # Hand the authenticated cookies to the HTTP session; the
+                # driver goes back to the pool, so there's nothing to load
+                self.http.load_cookies(self.driver.get_cookies())
+            else:
+                # Once logged in, navigate to the product page
+                self.driver.get(self.site.product_pages[0])
             return True
         except TimeoutException:
-            logger.error("Login failed: Session cookie not found.")
+            self.logger.error("Login failed: Session cookie not found.")
             return False
 
+    @timed("start_session")
+    def start_session(self) -> bool:
+        """
+        Starts the session, reusing the saved cookies when they still work.
+
+        The cookie jar from a previous run is loaded and checked with a single
+        request for the product page. Only if it is missing, expired or rejected
+        does the full browser login run.
+
+        Args:
+            None
+
+        Returns:
+            bool: True if the bot is logged in, False if login failed.
+        """
+        cookies = self.cookie_jar.load()
+        if cookies:
+            self.session_cookies = cookies
+            if self.http is not None:
+                self.http.load_cookies(cookies)
+                try:
+                    self.http.get_product_listing(self.site.product_pages[0])
+                    valid = True
+                except SessionExpiredError:
+                    valid = False
+            else:
+                self._restore_cookies()
+                self.driver.get(self.site.product_pages[0])
+                valid = not is_logged_out_listing(self._get_listing_selenium())
+
+            if valid:
+                self.logger.info("Resumed session from saved cookies")
+                metrics.SESSION_RESUMES.labels(self.site_name).inc()
+                return True
+            self.logger.info("Saved cookies were rejected")
+            self.cookie_jar.clear()
+            self.session_cookies = []
+            if self.driver is not None:
+                self.driver.delete_all_cookies()
+
+        return self.login()
+
     def is_logged_in(self) -> bool:
         """
         Checks if the bot is logged in by looking for the WordPress session cookie.
 
+        Between browser tasks of the "http" backend no driver is held, so the
+        HTTP session's cookies are checked instead.
+
         Args:
             None
 
         Returns:
             bool: True if logged in (session cookie found), False otherwise.
         """
+        if self.driver is None:
+            return self.http.has_session_cookie()
         # Reference: https://developer.wordpress.org/advanced-administration/wordpress/cookies/
         cookies = self.driver.get_cookies()
         for c in cookies:
@@ -215,6 +526,93 @@ class StockChecker:
                 return True
         return False
 
+    @timed("selenium_variant_page")
+    def _scrape_variants(self) -> list:
+        """
+        Scrapes the in-stock variants from the product page in the current window.
+
+        The variant table is read from a single `page_source` snapshot and parsed
+        locally, instead of one WebDriver round trip per variant field. Readiness
+        comes from DOM events in the page rather than polling, and the wait is
+        capped by the cycle's budget.
+
+        Args:
+            None
+
+        Returns:
+            list: A list of tuples containing the size and price of in-stock variants.
+
+        Raises:
+            BudgetExceededError: If the page isn't ready within its timeout.
+        """
+        # Wait until the product variants are loaded, or the page turns out
+        # to be the login form, so a logout doesn't cost the full timeout
+        timeout = self.budget.timeout()
+        if not wait_for_selector(self.driver, VARIANT_PAGE_READY, timeout, True):
+            raise BudgetExceededError(f"Timed out loading {self.driver.current_url}")
+        self._record_page_load()
+        html = self.driver.page_source
+        self._check_logged_in(html)
+        return parse_variants(html)
+
+    def _check_logged_in(self, html: str) -> None:
+        """
+        Checks that the page in the current window was served to a member.
+
+        Args:
+            html (str): The page HTML, already read from the browser.
+
+        Returns:
+            None
+
+        Raises:
+            SessionExpiredError: If the browser was sent to the login page or
+                the page was served to a logged-out visitor.
+        """
+        url = self.driver.current_url
+        if url.rstrip("/") == self.site.login_page.rstrip("/"):
+            raise SessionExpiredError(f"Redirected to the login page from {url}")
+        if is_logged_out_page(html):
+            raise SessionExpiredError(f"Served logged out at {url}")
+
+    def _reauthenticate(self) -> None:
+        """
+        Logs in again after a logout in the middle of a cycle, so the pages not
+        fetched yet can be fetched with the new session.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        Raises:
+            LoginFailedError: If the login fails.
+        """
+        self.logger.info("Logged out mid-cycle, logging in again")
+        metrics.RELOGINS.labels(self.site_name).inc()
+        if not self.login():
+            raise LoginFailedError("Could not log in again after a logout")
+        if self.queue is not None:
+            self._publish_session()
+
+    def _record_page_load(self) -> None:
+        """
+        Adds the current page's transfer size and load time to this cycle's report.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        report = page_load_report(self.driver)
+        self.page_loads.append(report)
+        self.logger.debug(
+            f"Loaded {self.driver.current_url}: {report['bytes'] / 1024:.0f} KB, "
+            f"{report['requests']} requests, {report['ms']} ms"
+        )
+
     def get_in_stock_variants(self, url: str) -> list:
         """
         Scrapes the product page for in-stock variants of a product.
@@ -228,62 +626,413 @@ class StockChecker:
         Returns:
             list: A list of tuples containing the size and price of in-stock variants.
         """
+        return self.get_in_stock_variants_many([url])[url]
+
+    @timed("selenium_open_tabs")
+    def _open_tabs(self, urls: list) -> list:
+        """
+        Opens every URL in its own tab, without waiting for them to load.
+
+        Args:
+            urls (list): The URLs to open.
+
+        Returns:
+            list: (url, window handle) pairs, in order.
+        """
+        known_handles = set(self.driver.window_handles)
+        tabs = []
+        for url in urls:
+            self.driver.execute_script("window.open('about:blank', '_blank');")
+            new_handles = set(self.driver.window_handles) - known_handles
+            handle = new_handles.pop()
+            known_handles.add(handle)
+            tabs.append((url, handle))
+            # Request blocking is per tab, so set it up before navigating.
+            # Navigating from script returns at once, so the tabs load in
+            # parallel
+            self.driver.switch_to.window(handle)
+            if LEAN_BROWSER:
+                set_resource_blocking(self.driver, True)
+            self.driver.execute_script("window.location.href = arguments[0];", url)
+        return tabs
+
+    def _close_tabs(self, tabs: list, window: str) -> None:
+        """
+        Closes the tabs opened by `_open_tabs` and returns to `window`.
+
+        Args:
+            tabs (list): (url, window handle) pairs.
+            window (str): The handle of the window to switch back to.
+
+        Returns:
+            None
+        """
+        for _, handle in tabs:
+            if handle in self.driver.window_handles:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+        self.driver.switch_to.window(window)
+
+    @timed("selenium_variants")
+    def iter_in_stock_variants(self, urls: list):
+        """
+        Scrapes several product pages for their in-stock variants, yielding each
+        product as soon as its tab has been read.
+
+        Up to `VARIANT_CONCURRENCY` tabs are opened at once so the browser loads
+        the pages in parallel, then each tab is scraped and closed in turn. If a
+        tab shows that the session was lost, the browser logs in once and the
+        products not scraped yet are loaded again. Tabs that aren't ready within
+        the cycle's budget, or that fail with a WebDriver error, are skipped,
+        and no more tabs are opened once the budget is spent.
+
+        Args:
+            urls (list): The URLs of the product pages.
+
+        Yields:
+            tuple: The URL and its list of (size, price) tuples.
+
+        Raises:
+            SessionExpiredError: If the session is lost again after logging in.
+        """
         # Store the current window so we can return to it later
         product_window = self.driver.current_window_handle
-        # Open the product page in a new tab
-        self.driver.execute_script(f"window.open('{url}', '_blank');")
-        # Switch to the new window
-        self.driver.switch_to.window(self.driver.window_handles[1])
-        # Wait until the product varaints are loaded
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "product-form-row"))
-        )
-        # Locate all product variants
-        variants = self.driver.find_elements(By.CLASS_NAME, "product-form-row")
-        in_stock_variants = []
-
-        # Iterate through each variant
-        for variant in variants:
-            # Check if the variant is in stock
-            stock_status = variant.find_element(
-                By.TAG_NAME, "p"
-            )  # Locate the stock status element
-
-            if "in-stock" in stock_status.get_attribute("class"):
-                # Extract size
-                size = (
-                    variant.find_element(By.CLASS_NAME, "pa-size")
-                    .find_element(By.TAG_NAME, "dd")
-                    .text.strip()
+        batch_size = max(1, VARIANT_CONCURRENCY)
+        pending = list(urls)
+        renewed = False
+
+        while pending:
+            expired = []
+            for i in range(0, len(pending), batch_size):
+                batch = pending[i : i + batch_size]
+                if expired:
+                    expired.extend(batch)
+                    continue
+                if self.budget.exhausted():
+                    break
+                tabs = self._open_tabs(batch)
+                try:
+                    for url, handle in tabs:
+                        if not expired:
+                            try:
+                                self.driver.switch_to.window(handle)
+                                variants = self._scrape_variants()
+                            except BudgetExceededError:
+                                # Left for the next cycle
+                                continue
+                            except SessionExpiredError:
+                                if renewed:
+                                    raise
+                            except WebDriverException as e:
+                                # e.g. a crashed tab; the others are still read
+                                self.logger.warning(f"Skipping {url}: {e.msg}")
+                                continue
+                            else:
+                                yield url, variants
+                                continue
+                        # Once one tab is logged out, the rest are too
+                        expired.append(url)
+                finally:
+                    # Close every tab from the batch, even if one of them timed out
+                    self._close_tabs(tabs, product_window)
+            if expired:
+                self._reauthenticate()
+                renewed = True
+            pending = expired
+
+    def get_in_stock_variants_many(self, urls: list) -> dict:
+        """
+        Scrapes several product pages for their in-stock variants.
+
+        Args:
+            urls (list): The URLs of the product pages.
+
+        Returns:
+            dict: Maps each URL to its list of (size, price) tuples.
+        """
+        return dict(self.iter_in_stock_variants(urls))
+
+    def _get_listing_selenium(self) -> list:
+        """
+        Reads the product listing from the page currently loaded in the browser.
+
+        The whole product grid is pulled in one `page_source` round trip and
+        parsed locally.
+
+        Args:
+            None
+
+        Returns:
+            list: A list of dicts with the `title`, `url` and `classes` of each product.
+        """
+        return parse_products(self.driver.page_source)
+
+    def _load_page(self, url: str) -> str:
+        """
+        Loads a page in the current window within the cycle's budget.
+
+        Args:
+            url (str): The URL to load.
+
+        Returns:
+            str: The page HTML.
+
+        Raises:
+            BudgetExceededError: If the budget is spent or the page load timed out.
+        """
+        timeout = self.budget.timeout()
+        if timeout <= 0:
+            raise BudgetExceededError(f"Cycle budget spent before loading {url}")
+        self.driver.set_page_load_timeout(timeout)
+        try:
+            self.driver.get(url)
+        except TimeoutException as e:
+            raise BudgetExceededError(f"Timed out loading {url}") from e
+        finally:
+            # Logins and recovery keep Selenium's default page load timeout
+            self.driver.set_page_load_timeout(300)
+        self._record_page_load()
+        return self.driver.page_source
+
+    def _iter_listings_selenium(self, urls: list):
+        """
+        Loads listing pages in the browser one after the other.
+
+        Logs in again once if a page shows that the session was lost. Pages that
+        don't load within the cycle's budget are skipped.
+
+        Args:
+            urls (list): The URLs of the listing pages.
+
+        Yields:
+            tuple: The URL and its parsed listing, see `parse_listing`.
+
+        Raises:
+            SessionExpiredError: If the session is lost again after logging in.
+        """
+        renewed = False
+        for url in urls:
+            try:
+                # Loading the page fresh also picks up the latest stock
+                html = self._load_page(url)
+                try:
+                    self._check_logged_in(html)
+                except SessionExpiredError:
+                    if renewed:
+                        raise
+                    self._reauthenticate()
+                    renewed = True
+                    html = self._load_page(url)
+                    self._check_logged_in(html)
+            except BudgetExceededError:
+                # `_discover` reports the skipped pages
+                continue
+            yield url, parse_listing(html, url)
+
+    def _discover(self, iter_listings):
+        """
+        First pipeline stage: crawls the listing pages and yields their products.
+
+        Starts from the site's product pages, then follows their pagination
+        (and category tiles, if enabled) in rounds. Every page found in a round
+        is fetched concurrently in the next one, so a paginated catalogue takes
+        about two page fetches however many pages it has. At most
+        `MAX_LISTING_PAGES` pages are fetched per cycle. If any page is left out
+        (over that cap or the cycle's budget), `self.crawl_complete` is cleared,
+        since the products it lists are then unknown.
+
+        Args:
+            iter_listings (callable): Maps a list of listing URLs to an iterator
+                of (url, listing) pairs, in completion order.
+
+        Yields:
+            dict: A product record with `title`, `url` and `classes`.
+        """
+        pending = list(dict.fromkeys(self.site.product_pages))
+        seen = set(pending)
+        fetched = 0
+        while pending:
+            batch = pending[: MAX_LISTING_PAGES - fetched]
+            if len(batch) < len(pending):
+                self.crawl_complete = False
+                self.logger.warning(
+                    f"Skipping {len(pending) - len(batch)} listing pages over "
+                    f"MAX_LISTING_PAGES ({MAX_LISTING_PAGES})"
+                )
+            fetched += len(batch)
+            pending = []
+            loaded = 0
+            for url, listing in iter_listings(batch):
+                loaded += 1
+                yield from listing["products"]
+                links = listing["pages"]
+                if self.site.crawl_categories:
+                    links = links + listing["categories"]
+                for link in links:
+                    if link not in seen:
+                        seen.add(link)
+                        pending.append(link)
+            if loaded < len(batch):
+                self.crawl_complete = False
+                self.logger.warning(
+                    f"Skipped {len(batch) - loaded} listing pages over the cycle budget"
                 )
-                # Extract price (USD)
-                # us_price = variant.find_element(By.CLASS_NAME, "woocs_price_USD")
-                currency_symbol = variant.find_element(
-                    By.CLASS_NAME, "woocommerce-Price-currencySymbol"
-                ).text
-                whole_price = variant.find_element(
-                    By.CLASS_NAME, "woocommerce-Price-amount"
-                ).text
-                decimal_price = variant.find_element(
-                    By.CLASS_NAME, "woocommerce-Price-decimal"
-                ).text
+        self.logger.info(f"Crawled {fetched} listing pages")
+
+    def _filter(self, records):
+        """
+        Second pipeline stage: drops filtered out products and repeated products.
+
+        Products are checked against `self.rules` using only the listing data,
+        so the ones nobody wants never get their variant page fetched. A product
+        listed on several pages or in several categories is only checked once,
+        matched by its WooCommerce post ID or its URL.
+
+        Args:
+            records (iterable): Product records from `_discover`.
+
+        Yields:
+            dict: The product records to check.
+        """
+        seen = set()
+        listed = filtered = 0
+        for record in records:
+            key = product_key(record)
+            if key in seen or record["url"] in seen:
+                continue
+            seen.update((key, record["url"]))
+            listed += 1
+            if not self.rules.wants(record):
+                filtered += 1
+                continue
+            yield record
+        if filtered:
+            self.logger.info(f"Filtered out {filtered} of {listed} products")
+
+    def _fetch_variants(self, records, iter_variants, previous: dict):
+        """
+        Third pipeline stage: turns product records into `Product` objects.
+
+        Out of stock products, and in-stock products whose variant page is not
+        due in `self.schedule`, are yielded straight away (the latter with last
+        cycle's variants). The due variant pages are then fetched concurrently
+        and each product is yielded as soon as its page is parsed.
+
+        Products whose page was skipped for the cycle's budget are not yielded;
+        they are added to `self.skipped`, keep their last known variants, stay
+        due and are fetched first next cycle. Products on skipped listing pages
+        keep their last known variants too.
+
+        Args:
+            records (iterable): Product records from `_filter`.
+            iter_variants (callable): Maps a list of product URLs to an iterator
+                of (url, variants) pairs, in completion order.
+            previous (dict): Maps product URLs to last cycle's variants.
+
+        Yields:
+            Product: Each product, in the order its variants became known.
+        """
+        now = time.monotonic()
+        retry_first = self.skipped
+        self.skipped = set()
+        listed = set()
+        in_stock_urls = set()
+        due = {}
+        for record in records:
+            url = record["url"]
+            listed.add(url)
+            if "instock" not in record["classes"]:
+                yield self._product(record, [])
+                continue
+            in_stock_urls.add(url)
+            if url not in previous or self.schedule.is_due(url, now):
+                due[url] = record
+            else:
+                yield self._product(record, previous[url])
+        if not self.crawl_complete:
+            # Not listed this cycle, but not known to be gone either
+            in_stock_urls.update(url for url in previous if url not in listed)
+            for url in previous.keys() - listed:
+                self.variants[url] = previous[url]
+        self.schedule.retain(in_stock_urls)
+
+        # Pages skipped last cycle go first, so a slow tail isn't always the
+        # part that misses the deadline
+        urls = sorted(due, key=lambda url: url not in retry_first)
+        fetched = set()
+        for url, variants in iter_variants(urls):
+            fetched.add(url)
+            # Sizes and prices nobody wants don't count as in stock
+            variants = self.rules.select_variants(variants)
+            self.schedule.record(url, variants != previous.get(url), now)
+            yield self._product(due[url], variants)
+        self.logger.info(
+            f"Fetched {len(fetched)} of {len(in_stock_urls)} in-stock products"
+        )
+        skipped = [url for url in urls if url not in fetched]
+        if skipped:
+            self.logger.warning(
+                f"Skipped {len(skipped)} product pages over the cycle budget; "
+                "checking them next cycle"
+            )
+            self.skipped.update(skipped)
+            for url in skipped:
+                if url in previous:
+                    self.variants[url] = previous[url]
 
-                price = whole_price + decimal_price
+    def _iter_store_api_variants(self, urls: list):
+        """
+        Looks up the in-stock variants of products in the Store API catalogue.
 
-                # Append the variant details as a tuple
-                in_stock_variants.append((size, price))
+        The whole catalogue's variations take a few paged JSON requests, so one
+        fetch replaces every product page. Products the Store API doesn't list
+        are fetched from their pages as before. A site without the Store API is
+        not asked again; one that fails for now is asked again next cycle.
 
-        # Close the current window and switch back to the product window
-        self.driver.close()
-        self.driver.switch_to.window(product_window)
-        return in_stock_variants
+        Args:
+            urls (list): The URLs of the product pages.
 
-    def get_products(self) -> None:
+        Yields:
+            tuple: The URL and its list of `Variant`.
         """
-        Scrapes the product data from the product page and updates the list of products.
+        if not urls:
+            return
+        site_url = self.site.product_pages[0]
+        try:
+            try:
+                catalogue = self.http.fetch_store_variants(site_url)
+            except SessionExpiredError:
+                self._reauthenticate()
+                catalogue = self.http.fetch_store_variants(site_url)
+        except StoreApiUnavailableError as e:
+            self.logger.warning(f"Store API unavailable ({e}), using product pages")
+            self.store_api = False
+            catalogue = {}
+        except (BudgetExceededError, StoreApiTemporaryError) as e:
+            # Only slow or failing this time; try the Store API again next cycle
+            self.logger.warning(f"Store API failed ({e}), using product pages")
+            catalogue = {}
+
+        missing = []
+        for url in urls:
+            variants = catalogue.get(product_url_key(url))
+            if variants is None:
+                missing.append(url)
+            else:
+                yield url, variants
+        if catalogue:
+            self.logger.info(
+                f"Store API covered {len(urls) - len(missing)} of {len(urls)} products"
+            )
+        if self.queue is not None:
+            yield from self._iter_queued(VARIANTS, missing, self._reauthenticate)
+        else:
+            yield from self.http.iter_in_stock_variants(missing, self._reauthenticate)
 
-        It goes through all product elements, checks stock status, and appends the
-        relevant product data to the `self.products` list.
+    def _publish_session(self) -> None:
+        """
+        Shares the HTTP session's cookies with the workers, encrypted with the
+        cookie jar's key, if they changed since they were last shared.
 
         Args:
             None
@@ -291,66 +1040,381 @@ class StockChecker:
         Returns:
             None
         """
-        logger.info("Scraping product data")
-        # Keep track of the number of in stock items
+        cookies = self.http.export_cookies()
+        if cookies != self.published_cookies:
+            self.queue.publish_session(self.site_name, self.cookie_jar.encrypt(cookies))
+            self.published_cookies = cookies
+
+    def _iter_queued(self, kind: str, urls: list, reauth=None):
+        """
+        Fetches pages through the work queue, yielding each as its unit's
+        results come in.
+
+        The URLs are split into units of `WORK_UNIT_SIZE` pages for the workers
+        to claim. While it waits, the coordinator claims and fetches units
+        itself, so a cycle still finishes with no worker running. Units that
+        are still out when the budget runs out, or were given up on, are
+        cancelled and their pages left out like any skipped page.
+
+        Args:
+            kind (str): `LISTING` or `VARIANTS`.
+            urls (list): The URLs of the pages.
+            reauth (callable): Logs in again after a logout on a unit the
+                coordinator fetches itself.
+
+        Yields:
+            tuple: The URL and its listing or variants, in completion order.
+        """
+        if not urls:
+            return
+        self._publish_session()
+        batches = [
+            urls[i : i + WORK_UNIT_SIZE] for i in range(0, len(urls), WORK_UNIT_SIZE)
+        ]
+        pending = set(self.queue.submit(self.site_name, kind, batches))
+        try:
+            while pending:
+                done, failed = self.queue.collect(self.site_name, pending)
+                if failed:
+                    self.logger.warning(f"Gave up on {len(failed)} work units")
+                pending.difference_update(failed, done)
+                for results in done.values():
+                    for url, result in results.items():
+                        yield url, decode_result(kind, result)
+                if not pending or self.budget.exhausted():
+                    break
+                unit = self.queue.claim(self.worker_id, [self.site_name])
+                if unit is None:
+                    time.sleep(WORK_POLL_INTERVAL)
+                    continue
+                try:
+                    results = process_unit(self.http, unit, reauth)
+                except BaseException:
+                    self.queue.release(unit, self.worker_id)
+                    raise
+                self.queue.complete(unit, results)
+        finally:
+            if pending:
+                self.queue.cancel(self.site_name, pending)
+
+    def _product(self, record: dict, variants: list) -> Product:
+        """
+        Builds a `Product` and records its variants for the next cycle.
+
+        Args:
+            record (dict): The product record from the listing.
+            variants (list): The product's in-stock (size, price) tuples.
+
+        Returns:
+            Product: The product.
+        """
+        # Product is only in stock if it has at least one variant
+        status = StockStatus.OUT_OF_STOCK
+        if variants:
+            status = StockStatus.IN_STOCK
+            self.stock_count += 1
+            self.variants[record["url"]] = variants
+        return Product(
+            record["title"], status, record["url"], variants, record.get("id")
+        )
+
+    @timed("get_products")
+    def iter_products(self, budget: CycleBudget = None):
+        """
+        Scrapes the product pages, yielding each product as soon as it is known.
+
+        The scrape is a pipeline of generators (discover → filter → fetch
+        variants), so the caller can diff and alert on the first products while
+        the remaining variant pages are still loading. Every page is checked
+        for a logout; the first one triggers a single login and the pages not
+        fetched yet are fetched again, so the cycle carries on. With the "http"
+        backend the pages are fetched without the browser, falling back to
+        Selenium if the session is still rejected after logging in; products
+        already yielded are then yielded again, which the stock diff treats as
+        unchanged.
+
+        Every page load and wait is capped by `budget`. Pages that don't make it
+        are skipped rather than failing or stalling the cycle; see `unchecked`.
+
+        Args:
+            budget (CycleBudget): The cycle's deadline. No deadline by default.
+
+        Yields:
+            Product: Every product on the listing pages.
+
+        Raises:
+            LoginFailedError: If logging in again after a logout fails.
+        """
+        self.logger.info("Scraping product data")
+        self.budget = budget or CycleBudget(page_timeout=PAGE_TIMEOUT)
+        self.crawl_complete = True
+        if self.http is not None:
+            self.http.budget = self.budget
+        try:
+            yield from self._scrape()
+        finally:
+            # Requests outside a cycle, e.g. resuming the session, get no deadline
+            self.budget = CycleBudget(page_timeout=PAGE_TIMEOUT)
+            if self.http is not None:
+                self.http.budget = self.budget
+
+    def _scrape(self):
+        """
+        Runs the scrape pipeline for `iter_products`, over HTTP if enabled and
+        with the browser otherwise or as a fallback.
+
+        Args:
+            None
+
+        Yields:
+            Product: Every product on the listing pages.
+        """
+        previous = self.variants
+        self.variants = {}
         self.stock_count = 0
-        # Clear old data from last update
-        self.products.clear()
 
-        product_elements = self.driver.find_elements(By.CSS_SELECTOR, "li.product")
+        if self.http is not None:
+            try:
+                # Workers that see a logout hold off until one login renews
+                # the session, then the pages they missed are fetched again
+                iter_listings = partial(
+                    self.http.iter_listings, reauth=self._reauthenticate
+                )
+                iter_variants = partial(
+                    self.http.iter_in_stock_variants, reauth=self._reauthenticate
+                )
+                if self.queue is not None:
+                    iter_listings = partial(
+                        self._iter_queued, LISTING, reauth=self._reauthenticate
+                    )
+                    iter_variants = partial(
+                        self._iter_queued, VARIANTS, reauth=self._reauthenticate
+                    )
+                records = self._filter(self._discover(iter_listings))
+                if self.store_api:
+                    iter_variants = self._iter_store_api_variants
+                yield from self._fetch_variants(records, iter_variants, previous)
+                self.logger.info(f"{self.stock_count} products in stock")
+                stats = self.http.cache.pop_stats()
+                for outcome, count in stats.items():
+                    metrics.PAGE_CACHE.labels(self.site_name, outcome).inc(count)
+                self.logger.info(
+                    f"Page cache: {stats['not_modified']} not modified, "
+                    f"{stats['hash_hits']} unchanged, {stats['misses']} parsed"
+                )
+                return
+            except SessionExpiredError as e:
+                self.logger.warning(
+                    f"HTTP session rejected ({e}). Falling back to Selenium"
+                )
+                previous = {**previous, **self.variants}
+                self.variants = {}
+                self.stock_count = 0
+                self.crawl_complete = True
+
+        self.page_loads = []
+        with self._browser():
+            if self.http is not None:
+                # The browser may still hold a valid session; resync for next time
+                self.http.load_cookies(self.driver.get_cookies())
+            records = self._filter(self._discover(self._iter_listings_selenium))
+            yield from self._fetch_variants(
+                records, self.iter_in_stock_variants, previous
+            )
+        self.logger.info(f"{self.stock_count} products in stock")
+        if self.page_loads:
+            total_kb = sum(r["bytes"] for r in self.page_loads) / 1024
+            slowest = max(r["ms"] for r in self.page_loads)
+            self.logger.info(
+                f"Browser loaded {len(self.page_loads)} pages: {total_kb:.0f} KB, "
+                f"slowest {slowest} ms"
+            )
 
-        for product in product_elements:
-            # Extract product title and url
-            title_element = product.find_element(By.CSS_SELECTOR, "a")
-            title = title_element.get_attribute("title")
-            url = title_element.get_attribute("href")
+    def unchecked(self):
+        """
+        Lists the products the last cycle couldn't check within its budget.
 
-            if title in EXCLUDED_PRODUCTS:
-                continue
+        Args:
+            None
 
-            # Check stock status
-            status = "Out of Stock"
-            variants = []
-            if "instock" in product.get_attribute("class"):
-                variants = self.get_in_stock_variants(url)
-                # Product is only in stock if it has at least one variant
-                if len(variants) >= 1:
-                    status = "In Stock"
-                    self.stock_count += 1
+        Returns:
+            set: The URLs of the skipped product pages, or None if listing pages
+                were skipped, in which case it isn't known which products are
+                missing from the cycle.
+        """
+        return set(self.skipped) if self.crawl_complete else None
 
-            # Add product to the product list
-            self.products.append(Product(title, status, url, variants))
+    def get_products(self) -> list:
+        """
+        Scrapes the product pages in one go (see `iter_products`).
 
-        logger.info(f"{self.stock_count} products in stock")
+        Args:
+            None
 
-    def format_message(self) -> str:
+        Returns:
+            list: Every `Product` on the listing pages.
         """
-        Formats the stock data into a message to be sent via Telegram.
+        return list(self.iter_products())
 
-        It creates a human-readable message that includes information about
-        products that are in stock, including their sizes, prices, and URLs.
+    def change_header(self) -> str:
+        """
+        Formats the heading of a stock update message.
 
         Args:
             None
 
         Returns:
-            str: The formatted message to be sent.
+            str: The site name and the time of the check.
         """
         formatted_time = time.strftime("%a, %d %b %I:%M %p", time.localtime())
-        message = COMPANY_NAME + " Stock Check\n\n"
-        message += f"🕜 Last Checked: {formatted_time}\n\n"
+        return f"{self.site.name} Stock Update\n\n🕜 Last Checked: {formatted_time}"
+
+    def format_changes(self, changes: list) -> str:
+        """
+        Formats stock changes into the body of a Telegram message.
+
+        Changes are grouped per product so each product is listed once with
+        its restocked, sold out and repriced sizes. The heading comes from
+        `change_header`, so consecutive alerts can share it.
+
+        Args:
+            changes (list): The `StockChange` objects to report.
+
+        Returns:
+            str: The formatted message body.
+        """
+        labels = {
+            RESTOCKED: "✅ Back in Stock",
+            SOLD_OUT: "❌ Sold Out",
+            PRICE_CHANGED: "💲 Price Changed",
+        }
+        by_product = {}
+        for change in changes:
+            by_product.setdefault(change.url, []).append(change)
+
+        blocks = []
+        for url, product_changes in by_product.items():
+            lines = [f"🍵 Name: {product_changes[0].title}"]
+            for kind in (RESTOCKED, PRICE_CHANGED, SOLD_OUT):
+                sizes = [c for c in product_changes if c.kind == kind]
+                if not sizes:
+                    continue
+                lines.append(labels[kind])
+                for c in sizes:
+                    if c.kind == PRICE_CHANGED:
+                        lines.append(f"➡️ {c.size}: {c.old_price} → {c.price}")
+                    else:
+                        lines.append(f"➡️ {c.size}: {c.price}")
+            lines.append(f"🔗 Link: {url}")
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
+
+    def _restore_cookies(self) -> None:
+        """
+        Loads the cookies of the last successful login into the current driver.
 
-        for product in self.products:
+        Cookies can only be set for the domain that is loaded, so a tiny page on
+        the site is opened first rather than the full login page.
 
-            if product.status == "In Stock":
-                message += f"🍵 Name: {product.title}\n✅ Status: {product.status}\n"
+        Args:
+            None
 
-                for size, price in product.variants:
-                    message += f"➡️ {size}: {price}\n"
+        Returns:
+            None
+        """
+        if not self.session_cookies:
+            return
+        self.driver.get(urljoin(self.site.login_page, "/robots.txt"))
+        for cookie in self.session_cookies:
+            self.driver.add_cookie(cookie)
+
+    @timed("recover")
+    def recover(self) -> bool:
+        """
+        Recovers after an error in the main loop without a full restart.
 
-                message += f"🔗 Link: {product.url}\n\n"
-        logger.info(f"Formatted Message Created")
-        return message
+        A driver that still answers is kept as is. An unresponsive one is swapped
+        for a warm driver from the pool, with the session cookies carried over,
+        so a login is only needed if the session itself was lost. With the
+        "http" backend no driver is held, so only the session is checked.
+
+        Args:
+            None
+
+        Returns:
+            bool: True if the bot is logged in afterwards, False if login failed.
+        """
+        if self.driver is not None and is_driver_alive(self.driver):
+            self.logger.info("Webdriver is healthy, keeping it")
+            # Drop any tabs a failed variant scrape left behind
+            stray = close_stray_tabs(self.driver)
+            if stray:
+                metrics.STRAY_TABS.labels(self.site_name).inc(stray)
+        elif self.driver is not None:
+            self.logger.warning("Webdriver is unresponsive, replacing it")
+            self.drivers.release(self.driver)
+            self.driver = None
+            self.driver = self.drivers.acquire()
+            self._restore_cookies()
+
+        if self.is_logged_in():
+            return True
+        self.logger.info("Session was lost, logging in")
+        metrics.RELOGINS.labels(self.site_name).inc()
+        return self.login()
+
+    def check_browser(self) -> None:
+        """
+        Checks the browser between cycles and replaces it once it has grown.
+
+        Tabs a cycle left open are closed first. Then the memory and open
+        files of the browser's processes and the latency of a command are
+        measured, and if the watchdog finds one over its limit the browser is
+        swapped for a warm one from the pool. The session cookies are carried
+        over, so no login is needed. Nothing is checked while no driver is held,
+        as with the "http" backend.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self.driver is None:
+            return
+        stray = close_stray_tabs(self.driver)
+        if stray:
+            self.logger.warning(f"Closed {stray} tabs left open by the last cycle")
+            metrics.STRAY_TABS.labels(self.site_name).inc(stray)
+        usage = browser_usage(self.driver)
+        latency = command_latency(self.driver)
+        metrics.BROWSER_LATENCY.labels(self.site_name).set(latency)
+        if usage is not None:
+            metrics.BROWSER_MEMORY.labels(self.site_name).set(usage["memory"])
+            metrics.BROWSER_OPEN_FILES.labels(self.site_name).set(usage["files"])
+        reason = self.watchdog.check(usage, latency)
+        if reason is None:
+            return
+
+        if usage is None:
+            self.logger.info(
+                f"Recycling the browser ({reason}: {latency * 1000:.0f} ms per command)"
+            )
+        else:
+            self.logger.info(
+                f"Recycling the browser ({reason}: {usage['memory'] / 2**20:.0f} MB "
+                f"in {usage['processes']} processes, {usage['files']} open files, "
+                f"{latency * 1000:.0f} ms per command)"
+            )
+        metrics.BROWSER_RECYCLES.labels(self.site_name, reason).inc()
+        # The freshest cookies, in case the session was renewed since the login
+        if self.is_logged_in():
+            self.session_cookies = self.driver.get_cookies()
+        self.drivers.release(self.driver)
+        self.driver = None
+        self.driver = self.drivers.acquire()
+        self._restore_cookies()
+        self.watchdog.reset()
 
     def quit(self) -> None:
         """
@@ -365,97 +1429,580 @@ class StockChecker:
         Returns:
             None
         """
-        logger.info("Closing Webdriver")
-        self.driver.quit()
+        self.logger.info("Closing Webdriver")
+        if self.http is not None:
+            self.http.close()
+        if self.queue is not None:
+            self.queue.close()
+        if self.driver is not None:
+            self.drivers.release(self.driver)
+            self.driver = None
+
+
+class AsyncStockChecker:
+    """
+    Async API over a `StockChecker`.
+
+    Every Selenium and HTTP call runs on the checker's own worker thread, so a
+    slow page never blocks the event loop (and with it Telegram delivery or the
+    other sites), while the WebDriver is still only used from one thread.
+    """
+
+    def __init__(self, checker: StockChecker, executor: ThreadPoolExecutor):
+        self.checker = checker
+        self.executor = executor
+        self.site = checker.site
+        self.logger = checker.logger
+
+    @classmethod
+    async def create(
+        cls, site: SiteConfig, pool: HttpPool, drivers: DriverPool
+    ) -> "AsyncStockChecker":
+        """
+        Creates a stock checker on its own worker thread.
+
+        Args:
+            site (SiteConfig): The site to check.
+            pool (HttpPool): The shared HTTP connections and worker threads.
+            drivers (DriverPool): The shared pool of warm Webdrivers.
+
+        Returns:
+            AsyncStockChecker: The new checker.
+        """
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=site.name)
+        loop = asyncio.get_running_loop()
+        try:
+            checker = await loop.run_in_executor(
+                executor, StockChecker, site, pool, drivers
+            )
+        except BaseException:
+            executor.shutdown(wait=False)
+            raise
+        return cls(checker, executor)
+
+    async def _run(self, func, *args):
+        """
+        Runs a blocking `StockChecker` method on the worker thread.
+
+        Args:
+            func (callable): The method to run.
+            *args: Arguments for the method.
+
+        Returns:
+            The method's return value.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def start_session(self) -> bool:
+        """See `StockChecker.start_session`."""
+        return await self._run(self.checker.start_session)
+
+    async def login(self) -> bool:
+        """See `StockChecker.login`."""
+        return await self._run(self.checker.login)
+
+    async def is_logged_in(self) -> bool:
+        """See `StockChecker.is_logged_in`."""
+        return await self._run(self.checker.is_logged_in)
+
+    async def iter_products(self, budget: CycleBudget = None):
+        """
+        Scrapes the product pages (see `StockChecker.iter_products`), yielding
+        each product as soon as it is known.
+
+        Every step of the scrape runs on the worker thread; only the finished
+        `Product` objects cross over to the event loop.
+
+        Args:
+            budget (CycleBudget): The cycle's deadline. No deadline by default.
+
+        Yields:
+            Product: Every product on the listing pages.
+        """
+        products = self.checker.iter_products(budget)
+        try:
+            while True:
+                product = await self._run(next, products, None)
+                if product is None:
+                    return
+                yield product
+        finally:
+            # Close tabs and stop fetches on the worker thread if we stop early
+            await self._run(products.close)
+
+    async def check_browser(self) -> None:
+        """See `StockChecker.check_browser`."""
+        await self._run(self.checker.check_browser)
+
+    async def recover(self) -> bool:
+        """See `StockChecker.recover`."""
+        return await self._run(self.checker.recover)
+
+    def unchecked(self):
+        """See `StockChecker.unchecked`."""
+        return self.checker.unchecked()
+
+    def change_header(self) -> str:
+        """See `StockChecker.change_header`."""
+        return self.checker.change_header()
+
+    def format_changes(self, changes: list) -> str:
+        """See `StockChecker.format_changes`."""
+        return self.checker.format_changes(changes)
+
+    async def quit(self) -> None:
+        """
+        Closes the checker and stops its worker thread.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        try:
+            await self._run(self.checker.quit)
+        finally:
+            self.executor.shutdown(wait=False)
 
 
 class TelegramBot:
-    """A simple wrapper for interacting with the Telegram Bot API to send messages."""
+    """
+    A simple wrapper for interacting with the Telegram Bot API to send messages.
+
+    Alerts go through a background `NotificationQueue`, so scraping never waits
+    on Telegram, and every send reuses one pooled HTTP connection.
+    """
 
     def __init__(self):
-        self.bot = Bot(token=TELEGRAM_TOKEN)
+        request = HTTPXRequest(connection_pool_size=4)
+        self.bot = Bot(token=TELEGRAM_TOKEN, request=request)
+        self.queue = NotificationQueue(self._send)
+
+    async def _send(self, chat_id: str, text: str) -> None:
+        """
+        Sends a single message, letting Telegram errors propagate to the queue.
+
+        Args:
+            chat_id (str): The chat to message.
+            text (str): The message content to send.
+
+        Returns:
+            None
+        """
+        start = time.perf_counter()
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text)
+        except Exception as e:
+            metrics.TELEGRAM_FAILURES.labels(type(e).__name__).inc()
+            raise
+        metrics.TELEGRAM_SECONDS.observe(time.perf_counter() - start)
 
-    async def send_message(self, message: str) -> None:
+    def start(self) -> None:
         """
-        Sends a message to the specified Telegram chat.
+        Starts delivering queued messages in the background.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.queue.start()
+
+    def notify(self, message: str, chat_ids: list = None, header: str = None) -> None:
+        """
+        Queues a message for the specified Telegram chats without waiting.
 
         Args:
             message (str): The message content to send.
+            chat_ids (list): The chats to message. Defaults to `TELEGRAM_CHAT_ID`.
+            header (str): A heading shown once for consecutive queued messages
+                that share it.
+
+        Returns:
+            None
+        """
+        for chat_id in chat_ids or [TELEGRAM_CHAT_ID]:
+            self.queue.put(chat_id, message, header)
+
+    async def close(self) -> None:
+        """
+        Delivers what is still queued, then closes the HTTP connections.
+
+        Args:
+            None
 
         Returns:
             None
         """
-        await self.bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
+        await self.queue.close()
+        await self.bot.shutdown()
 
 
-async def handle_login_failure(bot: TelegramBot, checker: StockChecker) -> None:
+def handle_login_failure(bot: TelegramBot, checker: AsyncStockChecker) -> None:
     """
-    Sends a failure alert and shuts down the bot gracefully after login failure.
+    Sends a failure alert after a login failure.
+
+    The caller stops monitoring the site, since retrying continuously would
+    get the account rate limited.
 
     Args:
         bot (TelegramBot): The Telegram bot used to send messages.
-        checker (StockChecker): The stock checker instance to quit.
+        checker (AsyncStockChecker): The stock checker whose login failed.
 
     Returns:
         None
     """
-    await bot.send_message("⚠️ Login failed. Manual intervention required.")
-    logger.info("The Bot was not able to log in. Shutting down.")
-    checker.quit()
-    # Exit early, since login failed we don't want to try continuously
-    # and get rate limited.
-    sys.exit(1)
+    bot.notify(
+        f"⚠️ {checker.site.name}: Login failed. Manual intervention required.",
+        checker.site.chat_ids,
+    )
+    checker.logger.info("The Bot was not able to log in. Stopping this site.")
+
+
+async def start_checker(
+    site: SiteConfig,
+    bot: TelegramBot,
+    pool: HttpPool,
+    drivers: DriverPool,
+    scheduler: PollScheduler,
+):
+    """
+    Creates the stock checker for a site and logs it in.
 
+    A browser that fails to launch or a site that is down at startup is tried
+    again on the scheduler's error backoff, so one site failing to start never
+    takes down the others. Settings are validated when the sites are loaded,
+    so these retries never wait on a configuration error.
 
-async def main():
-    """Main loop that runs the stock checker bot.
+    Args:
+        site (SiteConfig): The site to monitor.
+        bot (TelegramBot): The Telegram bot used to send messages.
+        pool (HttpPool): The shared HTTP connections and worker threads.
+        drivers (DriverPool): The shared pool of warm Webdrivers.
+        scheduler (PollScheduler): The site's schedule, for the backoff.
 
-    Logs into the website, checks stock periodically, and sends
-    Telegram alerts for in-stock products. Handles re-login if
-    logged out. Runs until manually stopped.
+    Returns:
+        AsyncStockChecker: The logged-in checker, or None if the login failed.
     """
-    logger.info("The Bot has started")
-    checker = StockChecker()
-    bot = TelegramBot()
+    while True:
+        attempt_started = time.monotonic()
+        checker = None
+        try:
+            checker = await AsyncStockChecker.create(site, pool, drivers)
+            if await checker.start_session():
+                return checker
+        except Exception:
+            logger.exception(f"{site.name}: Failed to start, retrying")
+            metrics.ERRORS.labels(site.name, "error").inc()
+            scheduler.record_error()
+            if checker is not None:
+                try:
+                    await checker.quit()
+                except Exception:
+                    logger.exception(f"{site.name}: Failed to close the checker")
+            await asyncio.sleep(scheduler.next_delay(attempt_started))
+            continue
+        try:
+            handle_login_failure(bot, checker)
+        finally:
+            await checker.quit()
+        return None
+
+
+async def monitor_site(
+    site: SiteConfig,
+    bot: TelegramBot,
+    state: StockState,
+    history: HistoryStore,
+    pool: HttpPool,
+    drivers: DriverPool,
+) -> bool:
+    """
+    Monitors one site until it is stopped or its login fails.
 
-    if not checker.login():
-        await handle_login_failure(bot, checker)
+    Logs into the website, checks stock on an adaptive schedule, and sends
+    Telegram alerts for stock changes to the chats watching them. Handles
+    re-login if logged out. All scraping goes through `AsyncStockChecker`, so it
+    never blocks the event loop and the other sites keep running meanwhile.
+
+    Args:
+        site (SiteConfig): The site to monitor.
+        bot (TelegramBot): The Telegram bot used to send messages.
+        state (StockState): The shared stock snapshot.
+        history (HistoryStore): The shared change log, or None to keep none.
+        pool (HttpPool): The shared HTTP connections and worker threads.
+        drivers (DriverPool): The shared pool of warm Webdrivers.
+
+    Returns:
+        bool: False, once monitoring stopped because the login failed; it
+            never returns otherwise.
+    """
+    scheduler = PollScheduler(
+        POLL_INTERVAL, MIN_POLL_INTERVAL, MAX_POLL_INTERVAL, POLL_JITTER
+    )
+    # The site's own chats get every change, subscribers what they watch
+    subscribers = SubscriptionIndex(
+        [Watch(chat_id) for chat_id in site.chat_ids]
+        + [watch for watch in WATCHES if watch.covers_site(site.name)]
+    )
+    checker = await start_checker(site, bot, pool, drivers, scheduler)
+    if checker is None:
+        return False
+    checker.logger.info("Monitoring started")
+    checker.logger.info(f"Routing alerts through {subscribers.watch_count} watches")
 
     try:
         while True:
+            cycle_started = time.monotonic()
             try:
+                # The cycle should be done before the next one is due
+                budget = CycleBudget(
+                    CYCLE_BUDGET or scheduler.current_interval(), PAGE_TIMEOUT
+                )
                 # Confirm the bot is logged in because it gets auto logged out
                 # by the site after 24 hours
-                if checker.is_logged_in() is False:
-                    logger.info("Bot was logged out, logging in")
-                    # Try to re-login. If it fails, then exit and don't try again
-                    if not checker.login():
-                        await handle_login_failure(bot, checker)
-                # Scrape product data
-                checker.get_products()
-                # Only message the user if at least one item is in stock
-                if checker.stock_count > 0:
-                    message = checker.format_message()
-                    await bot.send_message(message)
-
+                if await checker.is_logged_in() is False:
+                    checker.logger.info("Bot was logged out, logging in")
+                    metrics.RELOGINS.labels(site.name).inc()
+                    # Try to re-login. If it fails, then stop and don't try again
+                    if not await checker.login():
+                        handle_login_failure(bot, checker)
+                        return False
+                # Diff and alert on every product as soon as it is scraped,
+                # so a big restock isn't held back by the rest of the catalogue
+                urls = set()
+                changes = []
+                in_stock = 0
+                try:
+                    async with aclosing(checker.iter_products(budget)) as products:
+                        async for product in products:
+                            urls.add(product.url)
+                            in_stock += product.status is StockStatus.IN_STOCK
+                            # Only message the user when something changed
+                            product_changes = state.update_product(site.name, product)
+                            if history is not None:
+                                history.record(site.name, product_changes)
+                            routes = subscribers.route(product_changes)
+                            for chat_changes, chat_ids in routes:
+                                bot.notify(
+                                    checker.format_changes(chat_changes),
+                                    chat_ids,
+                                    header=checker.change_header(),
+                                )
+                            changes.extend(product_changes)
+                    # Products skipped for the budget keep their snapshot, and
+                    # nothing is pruned if a listing page was skipped
+                    unchecked = checker.unchecked()
+                    if unchecked is not None:
+                        delisted = state.prune(site.name, urls | unchecked)
+                        if history is not None:
+                            # Not alerted, but their in-stock runs end here
+                            history.record(site.name, delisted)
+                finally:
+                    # Keep what was already alerted on, even if the cycle failed
+                    state.commit()
+                    if history is not None:
+                        history.flush()
+                checker.logger.info(f"{len(changes)} stock changes since last check")
+                metrics.PRODUCTS_IN_STOCK.labels(site.name).set(in_stock)
+                for change in changes:
+                    metrics.STOCK_CHANGES.labels(site.name, change.kind).inc()
+                metrics.CYCLES.labels(site.name).inc()
+                scheduler.record_success(
+                    sum(c.kind == RESTOCKED for c in changes),
+                    sum(c.kind == SOLD_OUT for c in changes),
+                )
+                # Between cycles, so a browser swap never interrupts a scrape
+                await checker.check_browser()
+
+            except LoginFailedError:
+                # Logged out mid-cycle and the login failed; don't keep retrying
+                handle_login_failure(bot, checker)
+                return False
+            except RateLimitedError as e:
+                # The session is fine, the site just wants us to slow down
+                checker.logger.warning(f"Rate limited: {e}")
+                metrics.ERRORS.labels(site.name, "rate_limited").inc()
+                scheduler.record_error(e.retry_after)
             except Exception as e:
-                logger.exception("Error in main loop. Restarting to self-heal in 60s")
-                checker.quit()
-                checker = StockChecker()
-                checker.login()
-            finally:
-                await asyncio.sleep(60)  # Delay between scrapes
-                checker.driver.refresh()  # Refresh the page to update the stock data
+                checker.logger.exception("Error in main loop. Recovering to self-heal")
+                metrics.ERRORS.labels(site.name, "error").inc()
+                scheduler.record_error()
+                if not await checker.recover():
+                    handle_login_failure(bot, checker)
+                    return False
 
-    except KeyboardInterrupt:
+            try:
+                if METRICS_TEXTFILE:
+                    metrics.write_metrics_textfile(METRICS_TEXTFILE)
+                # Delay between scrapes
+                delay = scheduler.next_delay(cycle_started)
+            except Exception:
+                checker.logger.exception("Failed to schedule the next check")
+                delay = MAX_POLL_INTERVAL
+            checker.logger.info(f"Next check in {delay:.0f}s")
+            await asyncio.sleep(delay)
+    finally:
+        await checker.quit()
+
+
+async def main():
+    """Main loop that runs the stock checker bot.
+
+    Monitors every configured site concurrently, sharing one HTTP connection
+    pool and stock snapshot between them. Runs until manually stopped, or
+    until every site has stopped after a failed login.
+    """
+    logger.info(f"The Bot has started, monitoring {len(SITES)} site(s)")
+    if ROLE == "coordinator":
+        logger.info(f"Handing pages to workers through {WORK_QUEUE}")
+    if METRICS_PORT:
+        metrics.start_metrics_server(int(METRICS_PORT), METRICS_ADDR)
+        logger.info(f"Serving metrics on {METRICS_ADDR}:{METRICS_PORT}")
+    bot = TelegramBot()
+    bot.start()
+    state = StockState(STATE_DB)
+    history = HistoryStore(HISTORY_DIR) if HISTORY_DIR else None
+    pool = HttpPool(VARIANT_CONCURRENCY, MAX_REQUESTS_PER_SECOND)
+    # Each site keeps a driver with the "selenium" backend, so never fewer
+    max_drivers = MAX_DRIVERS
+    if SCRAPER_BACKEND == "selenium":
+        max_drivers = max(MAX_DRIVERS, len(SITES))
+    drivers = DriverPool(DRIVER_SPARES, LEAN_BROWSER, max_drivers)
+
+    try:
+        # Every site runs until it stops by itself, so the shared pool, state
+        # and history are only closed once none of them is using them
+        results = await asyncio.gather(
+            *(
+                monitor_site(site, bot, state, history, pool, drivers)
+                for site in SITES
+            ),
+            return_exceptions=True,
+        )
+        for site, result in zip(SITES, results):
+            if isinstance(result, BaseException):
+                logger.error(f"{site.name}: Monitoring crashed", exc_info=result)
+        # monitor_site only returns once its login has failed (or it crashed),
+        # so every site has stopped here. Exit with an error rather than
+        # retrying continuously and getting rate limited
+        logger.info("The Bot was not able to log in. Shutting down.")
+        sys.exit(1)
+
+    except (KeyboardInterrupt, asyncio.CancelledError):
         logger.info("Process interrupted by Keyboard. Shutting down")
     except Exception as e:
         logger.exception(f"Unhandled exception in main loop: {e}")
     finally:
-        checker.quit()
+        drivers.close()
+        pool.close()
+        state.close()
+        if history is not None:
+            history.close()
         logger.info("Shutting down")
-        await bot.send_message("Bot has shut down")
+        bot.notify("Bot has shut down")
+        await bot.close()
+
+
+def run_worker():
+    """Worker loop of the coordinator/worker mode.
+
+    Claims work units from `WORK_QUEUE`, fetches their pages over HTTP with the
+    session the coordinator published and reports the results, until stopped.
+    Needs no browser, so several can run on one host or on others. A worker
+    whose pages come back logged out hands the unit back and leaves the site
+    alone until the coordinator has logged in again; one that is rate limited
+    leaves the site alone for the longer of Retry-After and its error backoff.
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Worker {worker_id} started, taking work from {WORK_QUEUE}")
+    queue = open_work_queue(WORK_QUEUE, WORK_LEASE)
+    pool = HttpPool(VARIANT_CONCURRENCY, MAX_REQUESTS_PER_SECOND)
+    scrapers = {}
+    jars = {}
+    for site in SITES:
+        scrapers[site.name] = HttpScraper(
+            USER_AGENT, site.login_page, pool, site.name, PAGE_CACHE_SIZE
+        )
+        scrapers[site.name].budget = CycleBudget(page_timeout=PAGE_TIMEOUT)
+        jars[site.name] = CookieJar(
+            COOKIE_JAR_DIR, site.name, COOKIE_JAR_KEY or site.password
+        )
+    # Session version each scraper holds, and the last one the site rejected
+    loaded = dict.fromkeys(scrapers, 0)
+    rejected = dict.fromkeys(scrapers, 0)
+    # Backoff of sites that rate limit this worker, and when to try them again
+    schedulers = {
+        name: PollScheduler(
+            POLL_INTERVAL, MIN_POLL_INTERVAL, MAX_POLL_INTERVAL, POLL_JITTER
+        )
+        for name in scrapers
+    }
+    paused_until = dict.fromkeys(scrapers, 0)
+
+    try:
+        while True:
+            sessions = {name: queue.session(name) for name in scrapers}
+            now = time.monotonic()
+            ready = [
+                name
+                for name, (version, _) in sessions.items()
+                if version and version != rejected[name] and paused_until[name] <= now
+            ]
+            unit = queue.claim(worker_id, ready) if ready else None
+            if unit is None:
+                time.sleep(WORK_POLL_INTERVAL)
+                continue
+
+            version, token = sessions[unit.site]
+            scraper = scrapers[unit.site]
+            if loaded[unit.site] != version:
+                cookies = jars[unit.site].decrypt(token)
+                if cookies is None:
+                    logger.error(
+                        f"[{unit.site}] Can't decrypt the published session; "
+                        "COOKIE_JAR_KEY must match the coordinator's"
+                    )
+                    rejected[unit.site] = version
+                    queue.release(unit, worker_id)
+                    continue
+                scraper.load_cookies(cookies)
+                loaded[unit.site] = version
+
+            try:
+                results = process_unit(scraper, unit)
+            except SessionExpiredError as e:
+                logger.warning(f"[{unit.site}] Session rejected ({e}), waiting")
+                rejected[unit.site] = version
+                queue.release(unit, worker_id)
+            except RateLimitedError as e:
+                queue.release(unit, worker_id)
+                scheduler = schedulers[unit.site]
+                scheduler.record_error(e.retry_after)
+                delay = scheduler.next_delay(time.monotonic())
+                paused_until[unit.site] = time.monotonic() + delay
+                logger.warning(f"[{unit.site}] {e}; pausing for {delay:.0f}s")
+            except Exception as e:
+                logger.exception(f"[{unit.site}] Work unit {unit.id} failed: {e}")
+                queue.release(unit, worker_id, count_attempt=True)
+            else:
+                queue.complete(unit, results)
+                schedulers[unit.site].record_success(0, 0)
+
+    except KeyboardInterrupt:
+        logger.info("Worker interrupted by Keyboard. Shutting down")
+    finally:
+        for scraper in scrapers.values():
+            scraper.close()
+        pool.close()
+        queue.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if ROLE == "worker":
+        run_worker()
+    else:
+        asyncio.run(main())
@@ -0,0 +1,189 @@
+"""
+Prometheus metrics for the bot.
+
+Exposes stage latencies, stock levels, logins and errors per site, either over a
+local HTTP `/metrics` endpoint (`METRICS_PORT`) or as a textfile for the node
+exporter's textfile collector (`METRICS_TEXTFILE`).
+"""
+
+# Standard Library Imports
+import functools
+import inspect
+import time
+
+# Third-Party Imports
+from prometheus_client import (
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    start_http_server,
+    write_to_textfile,
+)
+
+# Stages range from a ~50ms cached HTTP fetch to a ~15s browser login
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "stock_checker_stage_seconds",
+    "Time spent in each stage of a cycle.",
+    ["site", "stage"],
+    buckets=STAGE_BUCKETS,
+)
+STAGE_FAILURES = Counter(
+    "stock_checker_stage_failures_total",
+    "Stages that raised an exception.",
+    ["site", "stage"],
+)
+CYCLES = Counter(
+    "stock_checker_cycles_total",
+    "Completed stock check cycles.",
+    ["site"],
+)
+ERRORS = Counter(
+    "stock_checker_errors_total",
+    "Cycles that failed, by kind (rate_limited or error).",
+    ["site", "kind"],
+)
+LOGINS = Counter(
+    "stock_checker_logins_total",
+    "Browser logins, by result (success or failure).",
+    ["site", "result"],
+)
+RELOGINS = Counter(
+    "stock_checker_relogins_total",
+    "Logins needed after the bot was logged out or lost its session.",
+    ["site"],
+)
+SESSION_RESUMES = Counter(
+    "stock_checker_session_resumes_total",
+    "Startups that reused the saved cookies instead of logging in.",
+    ["site"],
+)
+PRODUCTS_IN_STOCK = Gauge(
+    "stock_checker_products_in_stock",
+    "Products with at least one in-stock variant in the last cycle.",
+    ["site"],
+)
+STOCK_CHANGES = Counter(
+    "stock_checker_stock_changes_total",
+    "Variant changes alerted on, by kind.",
+    ["site", "kind"],
+)
+PAGE_CACHE = Counter(
+    "stock_checker_page_cache_total",
+    "HTTP page cache outcomes (not_modified, hash_hits, misses).",
+    ["site", "outcome"],
+)
+BROWSER_MEMORY = Gauge(
+    "stock_checker_browser_memory_bytes",
+    "Memory (PSS) of the browser's process tree, measured between cycles.",
+    ["site"],
+)
+BROWSER_OPEN_FILES = Gauge(
+    "stock_checker_browser_open_files",
+    "Files open in the browser's process tree, measured between cycles.",
+    ["site"],
+)
+BROWSER_LATENCY = Gauge(
+    "stock_checker_browser_latency_seconds",
+    "Round trip time of a trivial WebDriver command, measured between cycles.",
+    ["site"],
+)
+BROWSER_RECYCLES = Counter(
+    "stock_checker_browser_recycles_total",
+    "Browsers replaced between cycles, by reason (memory, files, latency).",
+    ["site", "reason"],
+)
+STRAY_TABS = Counter(
+    "stock_checker_stray_tabs_total",
+    "Tabs left open by a cycle and closed by the watchdog.",
+    ["site"],
+)
+TELEGRAM_SECONDS = Histogram(
+    "stock_checker_telegram_send_seconds",
+    "Time to deliver one Telegram message.",
+    buckets=STAGE_BUCKETS,
+)
+TELEGRAM_FAILURES = Counter(
+    "stock_checker_telegram_failures_total",
+    "Telegram send attempts that failed, by error type.",
+    ["error"],
+)
+
+
+def timed(stage: str):
+    """
+    Decorates a method so its duration is recorded in `STAGE_SECONDS`.
+
+    The site label is read from the instance's `site_name` attribute. For a
+    generator method the time until the generator is exhausted (or closed) is
+    recorded, so a streaming stage is timed end to end.
+
+    Args:
+        stage (str): The stage label, e.g. "login" or "get_products".
+
+    Returns:
+        callable: The decorator.
+    """
+
+    def decorator(method):
+        if inspect.isgeneratorfunction(method):
+
+            @functools.wraps(method)
+            def generator_wrapper(self, *args, **kwargs):
+                site = getattr(self, "site_name", "")
+                start = time.perf_counter()
+                try:
+                    yield from method(self, *args, **kwargs)
+                except Exception:
+                    STAGE_FAILURES.labels(site, stage).inc()
+                    raise
+                finally:
+                    elapsed = time.perf_counter() - start
+                    STAGE_SECONDS.labels(site, stage).observe(elapsed)
+
+            return generator_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            site = getattr(self, "site_name", "")
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            except Exception:
+                STAGE_FAILURES.labels(site, stage).inc()
+                raise
+            finally:
+                STAGE_SECONDS.labels(site, stage).observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def start_metrics_server(port: int, addr: str = "127.0.0.1") -> None:
+    """
+    Serves `/metrics` on a local port from a background thread.
+
+    Args:
+        port (int): The port to listen on.
+        addr (str): The address to bind; only this host can connect by default.
+
+    Returns:
+        None
+    """
+    start_http_server(port, addr=addr)
+
+
+def write_metrics_textfile(path: str) -> None:
+    """
+    Writes every metric to a file for the node exporter textfile collector.
+
+    Args:
+        path (str): The `.prom` file to write (atomically replaced).
+
+    Returns:
+        None
+    """
+    write_to_textfile(path, REGISTRY)
@@ -0,0 +1,89 @@
+"""
+Product data model.
+
+Products, variants and prices are compact records: `Variant` and `Price` are
+named tuples and `Product` uses `__slots__`, so large catalogues take little
+memory, and prices are integer cents so stock snapshots are compared on numbers
+rather than on the text scraped from the page.
+"""
+
+# Standard Library Imports
+import re
+from enum import Enum
+from typing import NamedTuple
+
+
+class StockStatus(Enum):
+    """Whether a product has at least one variant in stock."""
+
+    IN_STOCK = "In Stock"
+    OUT_OF_STOCK = "Out of Stock"
+
+
+class Price(NamedTuple):
+    """A price in integer cents, with the currency it was shown in."""
+
+    cents: int
+    # ISO code when the page gives one (e.g. "USD"), otherwise empty
+    currency: str = ""
+    # The symbol shown on the page (e.g. "$")
+    symbol: str = ""
+
+    def __str__(self) -> str:
+        amount = f"{self.cents // 100:,}.{self.cents % 100:02d}"
+        if self.symbol:
+            return f"{self.symbol}{amount}"
+        return f"{amount} {self.currency}".strip()
+
+
+class Variant(NamedTuple):
+    """An in-stock size of a product and its price."""
+
+    size: str
+    price: Price
+
+
+class Product:
+    """Represents a product with a title, status, URL, and its product variants."""
+
+    __slots__ = ("id", "title", "status", "url", "variants")
+
+    def __init__(
+        self,
+        title: str,
+        status: StockStatus,
+        url: str,
+        variants: tuple,
+        id: int = None,
+    ):
+        self.id = id
+        self.title = title
+        self.status = status
+        self.url = url
+        self.variants = tuple(variants)
+
+
+def parse_price(text: str, currency: str = "", symbol: str = "") -> Price:
+    """
+    Parses a price as shown on the page into integer cents.
+
+    Thousands separators are dropped; a `.` or `,` followed by one or two
+    digits at the end is read as the decimal separator, so "$1,234.50",
+    "1.234,50 €" and "12" all parse.
+
+    Args:
+        text (str): The price text, e.g. "$12.50".
+        currency (str): The ISO currency code, if known.
+        symbol (str): The currency symbol shown with the price.
+
+    Returns:
+        Price: The parsed price.
+    """
+    digits = re.sub(r"[^\d.,]", "", text)
+    match = re.search(r"[.,](\d{1,2})$", digits)
+    cents = 0
+    if match:
+        cents = int(match.group(1).ljust(2, "0"))
+        digits = digits[: match.start()]
+    whole = re.sub(r"\D", "", digits) or "0"
+    return Price(int(whole) * 100 + cents, currency, symbol)
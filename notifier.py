@@ -0,0 +1,281 @@
+"""
+Background delivery of Telegram alerts.
+
+Scrapers only enqueue messages; a single background task delivers them. Pending
+messages for the same chat are merged into as few Telegram messages as the 4096
+UTF-16 unit limit allows, flood control (`RetryAfter`) is honoured, and the queue
+is bounded so a Telegram outage can't grow memory without limit.
+"""
+
+# Standard Library Imports
+import asyncio
+import logging
+from collections import deque
+from datetime import timedelta
+
+# Third-Party Imports
+from telegram.error import (
+    BadRequest,
+    Forbidden,
+    NetworkError,
+    RetryAfter,
+    TelegramError,
+)
+
+logger = logging.getLogger(__name__)
+
+# Telegram rejects messages longer than this, counted in UTF-16 code units
+MAX_MESSAGE_LENGTH = 4096
+
+
+def message_length(text: str) -> int:
+    """
+    Measures a message the way Telegram does, in UTF-16 code units.
+
+    Characters outside the Basic Multilingual Plane, such as most emoji, count
+    twice.
+
+    Args:
+        text (str): The message text.
+
+    Returns:
+        int: The length in UTF-16 code units.
+    """
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _cut(line: str, limit: int) -> int:
+    """
+    Finds where to cut a line so the head fits the limit.
+
+    Args:
+        line (str): The line to cut.
+        limit (int): The maximum length of the head, in UTF-16 code units.
+
+    Returns:
+        int: The index to cut at, never inside a character and at least 1.
+    """
+    units = 0
+    for index, char in enumerate(line):
+        units += 2 if ord(char) > 0xFFFF else 1
+        if units > limit:
+            return max(index, 1)
+    return len(line)
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> list:
+    """
+    Splits a message into chunks Telegram will accept.
+
+    Splits between product blocks (blank lines) where possible, then between
+    lines, and only cuts inside a line that is longer than the limit by itself.
+    Lengths are measured with `message_length`.
+
+    Args:
+        text (str): The message to split.
+        limit (int): The maximum chunk length, in UTF-16 code units.
+
+    Returns:
+        list: The message chunks, in order.
+    """
+    chunks = []
+    current = ""
+
+    def add(piece: str, separator: str) -> None:
+        nonlocal current
+        candidate = current + separator + piece if current else piece
+        if message_length(candidate) <= limit:
+            current = candidate
+        else:
+            chunks.append(current)
+            current = piece
+
+    for block in text.split("\n\n"):
+        if message_length(block) <= limit:
+            add(block, "\n\n")
+            continue
+        separator = "\n\n"
+        for line in block.split("\n"):
+            while message_length(line) > limit:
+                if current:
+                    chunks.append(current)
+                    current = ""
+                cut = _cut(line, limit)
+                chunks.append(line[:cut])
+                line = line[cut:]
+            add(line, separator)
+            separator = "\n"
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class NotificationQueue:
+    """Queues messages per chat and delivers them from one background task."""
+
+    # Attempts for a chunk that fails with a network error before it is dropped
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, send, max_pending: int = 100):
+        """
+        Args:
+            send (coroutine function): Sends one message, called as
+                `await send(chat_id, text)`.
+            max_pending (int): Messages kept per chat before the oldest is dropped.
+        """
+        self.send = send
+        self.max_pending = max_pending
+        self._pending = {}
+        self._wakeup = asyncio.Event()
+        self._worker = None
+        self._delivering = False
+
+    def put(self, chat_id: str, message: str, header: str = None) -> None:
+        """
+        Queues a message for a chat without waiting for delivery.
+
+        Args:
+            chat_id (str): The chat to message.
+            message (str): The message content.
+            header (str): A heading for the message. When queued messages are
+                merged, consecutive ones with the same heading show it once.
+
+        Returns:
+            None
+        """
+        queue = self._pending.setdefault(chat_id, deque(maxlen=self.max_pending))
+        if len(queue) == queue.maxlen:
+            logger.warning(f"Notification queue for {chat_id} full, dropping oldest")
+        queue.append((header, message))
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """
+        Starts the background delivery task.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def _deliver(self, chat_id: str, chunks: deque) -> None:
+        """
+        Sends the chunks for one chat, retrying flood control and network errors.
+
+        Args:
+            chat_id (str): The chat to message.
+            chunks (deque): The message chunks, consumed as they are sent.
+
+        Returns:
+            None
+        """
+        attempts = 0
+        while chunks:
+            try:
+                await self.send(chat_id, chunks[0])
+                chunks.popleft()
+                attempts = 0
+            except RetryAfter as e:
+                delay = e.retry_after
+                if isinstance(delay, timedelta):
+                    delay = delay.total_seconds()
+                logger.warning(f"Telegram flood control, retrying in {delay}s")
+                await asyncio.sleep(delay)
+            except (BadRequest, Forbidden) as e:
+                # BadRequest subclasses NetworkError, but a malformed message,
+                # bad chat ID or blocked bot won't succeed on a retry
+                logger.error(f"Dropping Telegram message to {chat_id}: {e}")
+                chunks.popleft()
+                attempts = 0
+            except NetworkError as e:
+                attempts += 1
+                if attempts >= self.MAX_ATTEMPTS:
+                    logger.error(f"Dropping Telegram message to {chat_id}: {e}")
+                    chunks.popleft()
+                    attempts = 0
+                else:
+                    await asyncio.sleep(2**attempts)
+            except TelegramError as e:
+                # Any other API error; retrying won't help
+                logger.error(f"Dropping Telegram message to {chat_id}: {e}")
+                chunks.popleft()
+
+    @staticmethod
+    def _merge(messages) -> str:
+        """
+        Joins queued messages into one text, repeating a heading only when it
+        changes from the previous message.
+
+        Args:
+            messages (iterable): The (header, message) pairs, in order.
+
+        Returns:
+            str: The merged text.
+        """
+        parts = []
+        last_header = None
+        for header, message in messages:
+            if header and header != last_header:
+                parts.append(header)
+            last_header = header
+            parts.append(message)
+        return "\n\n".join(parts)
+
+    async def _run(self) -> None:
+        """
+        Delivers queued messages until cancelled.
+
+        An unexpected error only drops the batch of the chat it happened in;
+        the task keeps delivering the others and later messages.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            self._delivering = True
+            try:
+                for chat_id in list(self._pending):
+                    queue = self._pending.pop(chat_id)
+                    try:
+                        # Coalesce everything pending for this chat
+                        text = self._merge(queue)
+                        await self._deliver(chat_id, deque(split_message(text)))
+                    except Exception:
+                        # Losing this batch is better than every later alert
+                        logger.exception(f"Failed to deliver messages to {chat_id}")
+            finally:
+                self._delivering = False
+
+    async def close(self, timeout: float = 10) -> None:
+        """
+        Waits briefly for pending messages to go out, then stops the task.
+
+        Args:
+            timeout (float): Seconds to wait for the queue to drain.
+
+        Returns:
+            None
+        """
+        if self._worker is None:
+            return
+        try:
+            async with asyncio.timeout(timeout):
+                while self._pending or self._delivering:
+                    await asyncio.sleep(0.1)
+        except TimeoutError:
+            logger.warning("Gave up delivering queued Telegram messages")
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
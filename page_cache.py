@@ -0,0 +1,152 @@
+"""
+Cache of page validators, content hashes and parsed results.
+
+Lets the HTTP backend send conditional requests (ETag / Last-Modified) and skip
+parsing entirely when the server answers 304 or the body hashes the same as
+last time, so a quiet catalogue costs a few cheap requests per cycle.
+
+The cache keeps the most recently used pages up to a fixed count, so pages that
+drop out of the listing are evicted in time instead of piling up.
+"""
+
+# Standard Library Imports
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Pages kept per cache; well above a large catalogue's product and listing pages
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+class CachedPage:
+    """Represents the validators, body hash and parsed result of a fetched page."""
+
+    def __init__(self, etag: str, last_modified: str, digest: str, parsed):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.parsed = parsed
+
+
+class PageCache:
+    """
+    A thread-safe, in-memory LRU cache of `CachedPage` entries keyed by URL.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            max_entries (int): Pages kept before the least recently used one
+                is evicted.
+        """
+        self.max_entries = max(1, max_entries)
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"not_modified": 0, "hash_hits": 0, "misses": 0}
+
+    @staticmethod
+    def digest(content: bytes) -> str:
+        """
+        Hashes a response body.
+
+        Args:
+            content (bytes): The raw response body.
+
+        Returns:
+            str: The hex digest of the body.
+        """
+        return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+    def get(self, url: str) -> CachedPage:
+        """
+        Looks up the cached page for a URL.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            CachedPage: The cached page, or None if the URL was never fetched.
+        """
+        with self._lock:
+            page = self._pages.get(url)
+            if page is not None:
+                self._pages.move_to_end(url)
+            return page
+
+    def conditional_headers(self, url: str) -> dict:
+        """
+        Builds the conditional request headers for a URL.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            dict: `If-None-Match` / `If-Modified-Since` headers for known validators.
+        """
+        page = self.get(url)
+        headers = {}
+        if page is not None:
+            if page.etag:
+                headers["If-None-Match"] = page.etag
+            if page.last_modified:
+                headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def store(self, url: str, page: CachedPage) -> None:
+        """
+        Stores the cached page for a URL, evicting the least recently used
+        page once the cache is full.
+
+        Args:
+            url (str): The page URL.
+            page (CachedPage): The page to cache.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._pages[url] = page
+            self._pages.move_to_end(url)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+    def discard(self, url: str) -> None:
+        """
+        Removes a URL from the cache.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._pages.pop(url, None)
+
+    def record(self, outcome: str) -> None:
+        """
+        Counts a cache outcome ("not_modified", "hash_hits" or "misses").
+
+        Args:
+            outcome (str): The stats key to increment.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def pop_stats(self) -> dict:
+        """
+        Returns the outcome counts since the last call and resets them.
+
+        Args:
+            None
+
+        Returns:
+            dict: The number of 304s, hash hits and misses.
+        """
+        with self._lock:
+            stats = self.stats
+            self.stats = dict.fromkeys(stats, 0)
+            return stats
@@ -0,0 +1,177 @@
+"""
+Adaptive polling.
+
+`PollScheduler` decides how long a site waits between cycles: it runs at a fixed
+rate (the scrape time counts towards the interval), adds jitter, backs off on
+errors and rate limiting, and polls faster when a restock is likely.
+
+`ProductSchedule` decides which in-stock products get their variant page
+fetched in a cycle, so recently changed products are re-checked every cycle
+while products that never change are only refreshed every few minutes.
+"""
+
+# Standard Library Imports
+import random
+import time
+
+# Errors past this many no longer double the backoff, which is capped at the
+# max interval long before; it keeps `2 ** errors` from overflowing a float
+MAX_BACKOFF_EXPONENT = 16
+
+
+class PollScheduler:
+    """Computes the delay before the next cycle of one site."""
+
+    # A recent restock or sellout keeps the site "hot" for this long
+    HOT_WINDOW = 15 * 60
+    # Restocks needed before the time-of-day history is trusted
+    MIN_HISTORY = 5
+
+    def __init__(
+        self,
+        interval: float,
+        min_interval: float,
+        max_interval: float,
+        jitter: float = 0.1,
+    ):
+        self.interval = interval
+        self.min_interval = min(min_interval, interval)
+        self.max_interval = max(max_interval, interval)
+        self.jitter = jitter
+        self.errors = 0
+        self.retry_after = 0
+        self.last_change = None
+        # Number of restocks seen in each hour of the day
+        self.restocks_by_hour = [0] * 24
+
+    def record_success(self, restocks: int, sellouts: int) -> None:
+        """
+        Records a successful cycle and the stock changes it found.
+
+        Args:
+            restocks (int): The number of variants that came back in stock.
+            sellouts (int): The number of variants that sold out.
+
+        Returns:
+            None
+        """
+        self.errors = 0
+        self.retry_after = 0
+        if restocks or sellouts:
+            self.last_change = time.time()
+        if restocks:
+            self.restocks_by_hour[time.localtime().tm_hour] += restocks
+
+    def record_error(self, retry_after: float = 0) -> None:
+        """
+        Records a failed or rate-limited cycle.
+
+        Args:
+            retry_after (float): Seconds the server asked us to wait, if any.
+
+        Returns:
+            None
+        """
+        self.errors += 1
+        self.retry_after = retry_after
+
+    def current_interval(self) -> float:
+        """
+        Works out the interval for the next cycle, before jitter.
+
+        Args:
+            None
+
+        Returns:
+            float: The interval in seconds.
+        """
+        if self.errors:
+            # Exponential backoff, never shorter than the server asked for
+            exponent = min(self.errors, MAX_BACKOFF_EXPONENT)
+            backoff = min(self.max_interval, self.interval * 2**exponent)
+            return max(backoff, self.retry_after)
+
+        now = time.time()
+        if self.last_change is not None and now - self.last_change < self.HOT_WINDOW:
+            return self.min_interval
+
+        total = sum(self.restocks_by_hour)
+        if total >= self.MIN_HISTORY:
+            # How much more likely a restock is this hour than in an average hour
+            ratio = self.restocks_by_hour[time.localtime(now).tm_hour] * 24 / total
+            if ratio > 1:
+                return max(self.min_interval, self.interval / ratio)
+        return self.interval
+
+    def next_delay(self, cycle_started: float) -> float:
+        """
+        Works out how long to sleep before the next cycle.
+
+        Args:
+            cycle_started (float): `time.monotonic()` when the cycle started.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        interval = self.current_interval()
+        interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        elapsed = time.monotonic() - cycle_started
+        return max(0.0, interval - elapsed)
+
+
+class ProductSchedule:
+    """Tracks when each in-stock product's variant page is next due."""
+
+    def __init__(self, min_interval: float, max_interval: float):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        # url -> (current interval, next due time)
+        self._products = {}
+
+    def is_due(self, url: str, now: float) -> bool:
+        """
+        Checks if a product's variant page should be fetched this cycle.
+
+        Args:
+            url (str): The product URL.
+            now (float): The current `time.monotonic()`.
+
+        Returns:
+            bool: True if the page is due (or was never fetched).
+        """
+        entry = self._products.get(url)
+        return entry is None or now >= entry[1]
+
+    def record(self, url: str, changed: bool, now: float) -> None:
+        """
+        Records a fetch of a product's variant page.
+
+        A change resets the product to the shortest interval; every unchanged
+        fetch doubles it, up to `max_interval`.
+
+        Args:
+            url (str): The product URL.
+            changed (bool): Whether the variants differed from the last fetch.
+            now (float): The current `time.monotonic()`.
+
+        Returns:
+            None
+        """
+        interval = self.min_interval
+        if not changed and url in self._products:
+            interval = min(self.max_interval, self._products[url][0] * 2)
+        self._products[url] = (interval, now + interval)
+
+    def retain(self, urls: set) -> None:
+        """
+        Forgets every product that is not in `urls`, e.g. sold out ones.
+
+        Args:
+            urls (set): The product URLs to keep.
+
+        Returns:
+            None
+        """
+        for url in list(self._products):
+            if url not in urls:
+                del self._products[url]
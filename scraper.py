@@ -0,0 +1,883 @@
+"""
+Browserless scraping backend.
+
+Selenium is only needed to get through the login form and reCAPTCHA. Once the
+WordPress session cookie exists, the WooCommerce listing (`li.product`) and the
+variant rows (`product-form-row`) are plain server-rendered HTML, so they can be
+fetched with a pooled HTTP session and parsed locally with Beautiful Soup.
+"""
+
+# Standard Library Imports
+import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin, urlsplit
+
+# Third-Party Imports
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+# Local Imports
+from budget import BudgetExceededError, CycleBudget
+from metrics import timed
+from models import Price, Variant, parse_price
+from page_cache import DEFAULT_MAX_ENTRIES, CachedPage, PageCache
+from store_api import (
+    STORE_API_PAGE_SIZE,
+    STORE_API_PATH,
+    StoreApiTemporaryError,
+    StoreApiUnavailableError,
+    parse_store_variations,
+)
+
+logger = logging.getLogger(__name__)
+
+# WordPress prefixes the auth cookie with this name.
+# Reference: https://developer.wordpress.org/advanced-administration/wordpress/cookies/
+LOGGED_IN_COOKIE_PREFIX = "wordpress_logged_in_"
+# The classes WordPress puts on <body>, including `logged-in` for members
+BODY_CLASS = re.compile(r"<body[^>]*\sclass=[\"']([^\"']*)", re.IGNORECASE)
+
+
+class SessionExpiredError(Exception):
+    """Raised when a fetched page shows that the session cookie is no longer valid."""
+
+
+class LoginFailedError(Exception):
+    """Raised when logging in again after a logout mid-cycle fails."""
+
+
+class RateLimitedError(Exception):
+    """
+    Raised when the site answers HTTP 429 Too Many Requests.
+
+    `retry_after` is 0 when the site didn't say how long to wait, in which case
+    callers wait out their own error backoff.
+    """
+
+    def __init__(self, url: str, retry_after: float):
+        wait = f"retry after {retry_after:.0f}s" if retry_after else "no Retry-After"
+        super().__init__(f"HTTP 429 for {url}, {wait}")
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str, now: float = None) -> float:
+    """
+    Reads a Retry-After header, in either of the forms RFC 9110 allows.
+
+    Args:
+        value (str): The header: delay seconds or an HTTP date.
+        now (float): Epoch seconds to measure a date from; the current time
+            by default.
+
+    Returns:
+        float: The seconds to wait, or 0 if the header is missing, malformed
+            or already in the past.
+    """
+    value = (value or "").strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0
+    if when.tzinfo is None:
+        # HTTP dates are always GMT, even when written as "-0000"
+        when = when.replace(tzinfo=timezone.utc)
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+def is_logged_out_page(html: str) -> bool:
+    """
+    Checks whether a page was served to a logged-out visitor, without parsing it.
+
+    WordPress adds the `logged-in` class to `<body>` on every page it renders
+    for a logged-in user, so its absence is a reliable logout marker. Pages
+    without a `<body class>` (e.g. JSON or fragments) are never flagged.
+
+    Args:
+        html (str): The page HTML.
+
+    Returns:
+        bool: True if the page has body classes but not `logged-in`.
+    """
+    match = BODY_CLASS.search(html)
+    return match is not None and "logged-in" not in match.group(1).split()
+
+
+def _parse_products(soup: BeautifulSoup) -> list:
+    """
+    Reads the product records from a parsed listing page.
+
+    Category tiles are `li.product` too, so they are skipped here and picked up
+    by `parse_listing` instead. The `price` is the lowest price the listing
+    shows for the product (the bottom of a variable product's range), in
+    cents, or None if it shows none.
+
+    Args:
+        soup (BeautifulSoup): The parsed product listing page.
+
+    Returns:
+        list: A list of dicts with the `id`, `title`, `url`, `classes` and
+            `price` of each product.
+    """
+    products = []
+    for product in soup.select("li.product:not(.product-category)"):
+        link = product.select_one("a")
+        if link is None:
+            continue
+        classes = product.get("class", [])
+        amounts = product.select(".price .woocommerce-Price-amount")
+        prices = [parse_price(amount.get_text()).cents for amount in amounts]
+        products.append(
+            {
+                "id": post_id(classes),
+                "title": link.get("title", ""),
+                "url": link.get("href", ""),
+                "classes": classes,
+                "price": min(prices) if prices else None,
+            }
+        )
+    return products
+
+
+def parse_products(html: str) -> list:
+    """
+    Parses the product listing page into lightweight product records.
+
+    Args:
+        html (str): The HTML of the product listing page.
+
+    Returns:
+        list: A list of dicts with the `id`, `title`, `url`, `classes` and
+            `price` of each product.
+    """
+    return _parse_products(BeautifulSoup(html, "html.parser"))
+
+
+def _pagination_urls(soup: BeautifulSoup, url: str) -> list:
+    """
+    Works out the URLs of pages 2 to N from a listing page's pagination.
+
+    Long catalogues only link the first and last few pages ("1 2 3 … 40"), so
+    the missing ones are built from the link to the last page by swapping its
+    page number, which works for `/page/N/`, `?paged=N` and `?product-page=N`.
+
+    Args:
+        soup (BeautifulSoup): The parsed product listing page.
+        url (str): The URL of the page, to resolve relative links.
+
+    Returns:
+        list: The URLs of every page after the first, in order.
+    """
+    links = {}
+    for link in soup.select(".woocommerce-pagination a.page-numbers"):
+        text = link.get_text(strip=True)
+        if text.isdigit() and link.get("href"):
+            links[int(text)] = urljoin(url, link["href"])
+    if not links:
+        return []
+    last = max(links)
+    template = links[last]
+    position = template.rfind(str(last))
+    head, tail = template[:position], template[position + len(str(last)) :]
+    return [links.get(n, f"{head}{n}{tail}") for n in range(2, last + 1)]
+
+
+def parse_listing(html: str, url: str) -> dict:
+    """
+    Parses a listing page into its products and the listing pages it links to.
+
+    Args:
+        html (str): The HTML of the product listing page.
+        url (str): The URL of the page, to resolve relative links.
+
+    Returns:
+        dict: `products` as returned by `parse_products`, `pages` with the URLs
+            of the following pages and `categories` with the category tile URLs.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    categories = [
+        urljoin(url, link["href"])
+        for link in soup.select("li.product-category a[href]")
+    ]
+    return {
+        "products": _parse_products(soup),
+        "pages": _pagination_urls(soup, url),
+        "categories": list(dict.fromkeys(categories)),
+    }
+
+
+def post_id(classes: list):
+    """
+    Reads the WooCommerce post ID from a product's classes.
+
+    WooCommerce tags every `li.product` with its post ID (`post-123`), which
+    stays the same when a product is renamed or listed under several category
+    URLs.
+
+    Args:
+        classes (list): The classes of the `li.product` element.
+
+    Returns:
+        int: The post ID, or None if the product has no `post-` class.
+    """
+    for name in classes:
+        if name.startswith("post-") and name[5:].isdigit():
+            return int(name[5:])
+    return None
+
+
+def product_key(record: dict):
+    """
+    Identifies a product across listing pages.
+
+    Args:
+        record (dict): A product record as returned by `parse_products`.
+
+    Returns:
+        The post ID if known, otherwise the product URL.
+    """
+    if record.get("id") is not None:
+        return record["id"]
+    return record["url"]
+
+
+def parse_variants(html: str) -> list:
+    """
+    Parses a product page for its in-stock variants.
+
+    A variant is in stock when the `<p>` in its `product-form-row` has the
+    `in-stock` class. Its price is the `woocommerce-Price-amount` text plus the
+    `woocommerce-Price-decimal` text some themes split off, parsed to cents.
+    Pages without those rows are read from the `data-product_variations` JSON
+    of the standard WooCommerce variation form instead.
+
+    Args:
+        html (str): The HTML of the product page.
+
+    Returns:
+        list: A `Variant` (size and price) for each in-stock variant.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    rows = soup.select(".product-form-row")
+    if not rows:
+        return _parse_variation_form(soup)
+    in_stock_variants = []
+    for variant in rows:
+        stock_status = variant.find("p")
+        if stock_status is None or "in-stock" not in stock_status.get("class", []):
+            continue
+
+        size = variant.select_one(".pa-size dd")
+        whole_price = variant.select_one(".woocommerce-Price-amount")
+        decimal_price = variant.select_one(".woocommerce-Price-decimal")
+        if size is None or whole_price is None:
+            continue
+
+        price = whole_price.get_text(strip=True)
+        if decimal_price is not None:
+            price += decimal_price.get_text(strip=True)
+        symbol = variant.select_one(".woocommerce-Price-currencySymbol")
+        symbol = symbol.get_text(strip=True) if symbol is not None else ""
+        in_stock_variants.append(
+            Variant(
+                size.get_text(strip=True),
+                parse_price(price, _currency_code(whole_price), symbol),
+            )
+        )
+    return in_stock_variants
+
+
+def _parse_variation_form(soup: BeautifulSoup) -> list:
+    """
+    Reads the in-stock variants from the `data-product_variations` attribute
+    of a standard WooCommerce variation form.
+
+    Args:
+        soup (BeautifulSoup): The parsed product page.
+
+    Returns:
+        list: A `Variant` for each in-stock variation, empty if the form is
+            missing or loads its variations over AJAX.
+    """
+    form = soup.select_one("form.variations_form[data-product_variations]")
+    if form is None:
+        return []
+    try:
+        variations = json.loads(form["data-product_variations"])
+    except ValueError:
+        return []
+    if not isinstance(variations, list):
+        # WooCommerce writes `false` when there are too many to embed
+        return []
+    symbol = soup.select_one(".woocommerce-Price-currencySymbol")
+    symbol = symbol.get_text(strip=True) if symbol is not None else ""
+    in_stock_variants = []
+    for variation in variations:
+        if not variation.get("is_in_stock") or not variation.get(
+            "variation_is_active", True
+        ):
+            continue
+        size = " / ".join(str(v) for v in variation.get("attributes", {}).values())
+        cents = round(float(variation.get("display_price") or 0) * 100)
+        in_stock_variants.append(Variant(size, Price(cents, "", symbol)))
+    return in_stock_variants
+
+
+def _currency_code(amount) -> str:
+    """
+    Finds the ISO currency code of a price, from the `woocs_price_XXX` class
+    the WOOCS currency switcher wraps prices in.
+
+    Args:
+        amount (Tag): The `woocommerce-Price-amount` element.
+
+    Returns:
+        str: The currency code, or "" if the page doesn't say.
+    """
+    for element in [amount, *amount.parents]:
+        for name in element.get("class", []) or []:
+            if name.startswith("woocs_price_") and name[12:].isalpha():
+                return name[12:]
+    return ""
+
+
+def is_logged_out_listing(products: list) -> bool:
+    """
+    Checks whether a listing page was served to a logged-out visitor.
+
+    When the session is valid every `li.product` carries either `instock` or
+    `outofstock`; a logged-out visitor gets neither (or no products at all).
+
+    Args:
+        products (list): Product records as returned by `parse_products`.
+
+    Returns:
+        bool: True if the page looks like it was served to a logged-out visitor.
+    """
+    if not products:
+        return True
+    return not any(
+        "instock" in p["classes"] or "outofstock" in p["classes"] for p in products
+    )
+
+
+class RateLimiter:
+    """Caps the number of requests started per second against each host."""
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1 / requests_per_second if requests_per_second > 0 else 0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        """
+        Blocks until a request to the URL's host is allowed to start.
+
+        Args:
+            url (str): The URL about to be requested.
+
+        Returns:
+            None
+        """
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        # Reserve the next free slot for this host, then sleep outside the lock
+        # so other hosts (and later slots) are not held up
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class SessionGate:
+    """
+    Shared flag that stops an `HttpScraper`'s workers from sending requests
+    once one of them has seen a logout, until the session has been renewed.
+    """
+
+    def __init__(self):
+        self._open = threading.Event()
+        self._open.set()
+
+    def is_open(self) -> bool:
+        """
+        Checks if requests may be sent.
+
+        Args:
+            None
+
+        Returns:
+            bool: False while a logout is waiting for a new login.
+        """
+        return self._open.is_set()
+
+    def close(self) -> None:
+        """
+        Holds back further requests after a logout.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._open.clear()
+
+    def reopen(self) -> None:
+        """
+        Lets requests through again after logging back in.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._open.set()
+
+
+class HttpPool:
+    """
+    Connection pool, worker threads and rate limiter shared by every
+    `HttpScraper` in the process, so monitoring more sites doesn't multiply them.
+    """
+
+    def __init__(self, max_workers: int = 8, requests_per_second: float = 5):
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="http"
+        )
+        # One pooled connection per worker so concurrent fetches don't queue
+        self.adapter = HTTPAdapter(
+            pool_connections=self.max_workers, pool_maxsize=self.max_workers
+        )
+
+    def close(self) -> None:
+        """
+        Stops the worker threads and closes the pooled connections.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.adapter.close()
+
+
+class HttpScraper:
+    """
+    Fetches listing and variant pages over a pooled HTTP session that reuses
+    the cookies of a logged-in Selenium session.
+    """
+
+    def __init__(
+        self,
+        user_agent: str,
+        login_page: str,
+        pool: HttpPool,
+        site_name: str = "",
+        cache_size: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.login_page = login_page
+        self.site_name = site_name
+        self.pool = pool
+        self.rate_limiter = pool.rate_limiter
+        self.cache = PageCache(cache_size)
+        self.gate = SessionGate()
+        # Deadline of the current cycle; without one each request gets 10s
+        self.budget = CycleBudget()
+        # Each site gets its own cookie jar, but connections come from the pool
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": user_agent})
+        self.session.mount("https://", pool.adapter)
+        self.session.mount("http://", pool.adapter)
+
+    def load_cookies(self, cookies: list) -> None:
+        """
+        Copies cookies from a WebDriver session into the HTTP session.
+
+        Args:
+            cookies (list): Cookies as returned by `driver.get_cookies()`.
+
+        Returns:
+            None
+        """
+        self.session.cookies.clear()
+        self.gate.reopen()
+        for c in cookies:
+            self.session.cookies.set(
+                c["name"],
+                c["value"],
+                domain=c.get("domain"),
+                path=c.get("path", "/"),
+                expires=c.get("expiry"),
+            )
+
+    def export_cookies(self) -> list:
+        """
+        Lists the HTTP session's cookies in the form `load_cookies` takes.
+
+        Args:
+            None
+
+        Returns:
+            list: Dicts with the `name`, `value`, `domain` and `path` of each
+                cookie.
+        """
+        return [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+            for c in self.session.cookies
+        ]
+
+    def has_session_cookie(self) -> bool:
+        """
+        Checks if the WordPress session cookie has been loaded and not expired.
+
+        Args:
+            None
+
+        Returns:
+            bool: True if the session cookie is present, False otherwise.
+        """
+        return any(
+            c.name.startswith(LOGGED_IN_COOKIE_PREFIX) and not c.is_expired()
+            for c in self.session.cookies
+        )
+
+    def _get(self, url: str, headers: dict = None) -> requests.Response:
+        """
+        Sends a rate-limited GET request with the logged-in session.
+
+        Args:
+            url (str): The URL to fetch.
+            headers (dict): Extra request headers.
+
+        Returns:
+            requests.Response: The response (which may be a 304).
+
+        Raises:
+            SessionExpiredError: If the site redirected us to the login page or
+                served the page to a logged-out visitor.
+            RateLimitedError: If the site answered 429 Too Many Requests.
+            BudgetExceededError: If the cycle's budget is spent or the request
+                timed out.
+        """
+        if not self.gate.is_open():
+            # Another worker saw the logout; don't spend a request finding out
+            raise SessionExpiredError(f"Waiting for a new login to fetch {url}")
+        self.rate_limiter.wait(url)
+        timeout = self.budget.timeout()
+        if timeout <= 0:
+            raise BudgetExceededError(f"Cycle budget spent before fetching {url}")
+        try:
+            response = self.session.get(url, headers=headers, timeout=timeout)
+        except requests.Timeout as e:
+            raise BudgetExceededError(f"Timed out fetching {url}") from e
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            raise RateLimitedError(url, retry_after)
+        response.raise_for_status()
+        if self.login_page and response.url.rstrip("/") == self.login_page.rstrip("/"):
+            self.gate.close()
+            raise SessionExpiredError(f"Redirected to login page while fetching {url}")
+        is_html = "html" in response.headers.get("Content-Type", "")
+        is_page = is_html and response.status_code != 304
+        if is_page and is_logged_out_page(response.text):
+            self.gate.close()
+            raise SessionExpiredError(f"Served logged out while fetching {url}")
+        return response
+
+    def fetch(self, url: str) -> str:
+        """
+        Fetches a page with the logged-in session.
+
+        Args:
+            url (str): The URL to fetch.
+
+        Returns:
+            str: The page HTML.
+
+        Raises:
+            SessionExpiredError: If the site redirected us to the login page.
+        """
+        return self._get(url).text
+
+    def fetch_parsed(self, url: str, parse):
+        """
+        Fetches and parses a page, reusing the cached result when unchanged.
+
+        Sends the stored ETag / Last-Modified validators; a 304 or a body with
+        the same hash as last time returns the previously parsed result without
+        parsing the page again.
+
+        Args:
+            url (str): The URL to fetch.
+            parse (callable): Turns the page HTML into the result to cache.
+
+        Returns:
+            The parsed result.
+
+        Raises:
+            SessionExpiredError: If the site redirected us to the login page.
+        """
+        cached = self.cache.get(url)
+        response = self._get(url, self.cache.conditional_headers(url))
+
+        if response.status_code == 304 and cached is not None:
+            self.cache.record("not_modified")
+            return cached.parsed
+
+        digest = PageCache.digest(response.content)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if cached is not None and cached.digest == digest:
+            self.cache.record("hash_hits")
+            parsed = cached.parsed
+        else:
+            self.cache.record("misses")
+            parsed = parse(response.text)
+        self.cache.store(url, CachedPage(etag, last_modified, digest, parsed))
+        return parsed
+
+    @timed("http_listing")
+    def fetch_listing(self, url: str) -> dict:
+        """
+        Fetches and parses a product listing page.
+
+        Args:
+            url (str): The URL of the product listing page.
+
+        Returns:
+            dict: The products and linked listing pages, see `parse_listing`.
+
+        Raises:
+            SessionExpiredError: If the page was served to a logged-out visitor.
+        """
+        listing = self.fetch_parsed(url, lambda html: parse_listing(html, url))
+        # A page of category tiles has no products and no stock classes to check
+        if listing["categories"] and not listing["products"]:
+            return listing
+        if is_logged_out_listing(listing["products"]):
+            # Don't let the logged-out page satisfy the next conditional request
+            self.cache.discard(url)
+            raise SessionExpiredError("Product listing has no stock classes")
+        return listing
+
+    def get_product_listing(self, url: str) -> list:
+        """
+        Fetches and parses the products of one product listing page.
+
+        Args:
+            url (str): The URL of the product listing page.
+
+        Returns:
+            list: Product records as returned by `parse_products`.
+
+        Raises:
+            SessionExpiredError: If the page was served to a logged-out visitor.
+        """
+        return self.fetch_listing(url)["products"]
+
+    def iter_listings(self, urls: list, reauth=None):
+        """
+        Fetches several listing pages concurrently, yielding each as it is parsed.
+
+        Args:
+            urls (list): The URLs of the listing pages.
+            reauth (callable): Logs in again after a logout, see
+                `_iter_concurrently`.
+
+        Yields:
+            tuple: The URL and its parsed listing, in completion order.
+        """
+        yield from self._iter_concurrently(self.fetch_listing, urls, reauth)
+
+    @timed("http_variant_page")
+    def get_in_stock_variants(self, url: str) -> list:
+        """
+        Fetches and parses a product page for its in-stock variants.
+
+        Args:
+            url (str): The URL of the product page.
+
+        Returns:
+            list: A list of tuples containing the size and price of in-stock variants.
+        """
+        return self.fetch_parsed(url, parse_variants)
+
+    def _iter_concurrently(self, fetch, urls: list, reauth=None):
+        """
+        Runs `fetch` for every URL on the shared pool's worker threads.
+
+        At most `HttpPool.max_workers` requests are in flight at once, and the
+        per-host rate limiter still spaces them out.
+
+        When a worker sees a logout, the session gate stops the other workers
+        from sending requests, `reauth` logs in once, and every URL that wasn't
+        fetched is tried again; the ones already fetched are kept.
+
+        Pages that time out, fail with an HTTP or connection error, or are
+        still pending when the cycle's budget runs out, are left out of the
+        results so the caller can retry them next cycle; one broken page never
+        costs the pages already fetched.
+
+        Args:
+            fetch (callable): Fetches and parses one URL.
+            urls (list): The URLs to fetch.
+            reauth (callable): Logs in again and reloads the cookies. Without it
+                a logout is raised straight away.
+
+        Yields:
+            tuple: The URL and the result of `fetch`, in completion order.
+
+        Raises:
+            SessionExpiredError: If the session is lost again after `reauth`.
+        """
+        pending = list(urls)
+        renewed = False
+        while pending:
+            futures = {self.pool.executor.submit(fetch, url): url for url in pending}
+            expired = []
+            try:
+                for future in as_completed(futures, self.budget.remaining()):
+                    try:
+                        result = future.result()
+                    except BudgetExceededError:
+                        continue
+                    except SessionExpiredError:
+                        if reauth is None or renewed:
+                            raise
+                        expired.append(futures[future])
+                        continue
+                    except requests.RequestException as e:
+                        logger.warning(f"Skipping {futures[future]}: {e}")
+                        continue
+                    yield futures[future], result
+            except FuturesTimeoutError:
+                # Out of time; whatever is still loading is skipped
+                return
+            finally:
+                # Don't keep fetching for a consumer that stopped early
+                for future in futures:
+                    future.cancel()
+            if expired:
+                reauth()
+                renewed = True
+            pending = expired
+
+    def iter_in_stock_variants(self, urls: list, reauth=None):
+        """
+        Fetches the in-stock variants of several products concurrently, yielding
+        each product as soon as its page is parsed.
+
+        Pages are fetched by the shared pool's worker threads and requests are
+        spaced by the per-host rate limiter, so a cycle takes roughly as long as
+        the slowest page instead of the sum of all of them.
+
+        Args:
+            urls (list): The URLs of the product pages.
+            reauth (callable): Logs in again after a logout, see
+                `_iter_concurrently`.
+
+        Yields:
+            tuple: The URL and its list of (size, price) tuples, in completion order.
+        """
+        yield from self._iter_concurrently(self.get_in_stock_variants, urls, reauth)
+
+    @timed("store_api")
+    def fetch_store_variants(self, site_url: str) -> dict:
+        """
+        Fetches the in-stock variants of the whole catalogue from the Store API.
+
+        The first page says how many there are (`X-WP-TotalPages`); the rest
+        are then fetched concurrently. A product's variations can span pages,
+        so the catalogue is only returned if every page was fetched.
+
+        Args:
+            site_url (str): Any URL on the site.
+
+        Returns:
+            dict: Maps normalised product URLs (see `product_url_key`) to their
+                lists of in-stock `Variant`.
+
+        Raises:
+            StoreApiUnavailableError: If the site doesn't serve the Store API
+                (HTTP 404 or a response that isn't JSON).
+            StoreApiTemporaryError: If a page failed with a server error, a
+                rate limit or a connection error.
+            BudgetExceededError: If pages were left out for the cycle's budget.
+            SessionExpiredError: If the site redirected us to the login page.
+        """
+        api_url = urljoin(site_url, STORE_API_PATH)
+        query = f"?type=variation&per_page={STORE_API_PAGE_SIZE}&page="
+
+        def fetch_page(url: str) -> requests.Response:
+            try:
+                return self._get(url, {"Accept": "application/json"})
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code == 404:
+                    raise StoreApiUnavailableError(str(e)) from e
+                raise StoreApiTemporaryError(str(e)) from e
+            except (RateLimitedError, requests.RequestException) as e:
+                raise StoreApiTemporaryError(str(e)) from e
+
+        def parse(response: requests.Response, parents: dict) -> None:
+            try:
+                items = response.json()
+            except ValueError as e:
+                raise StoreApiUnavailableError("Store API did not return JSON") from e
+            parse_store_variations(items, parents)
+
+        parents = {}
+        first = fetch_page(f"{api_url}{query}1")
+        parse(first, parents)
+        total = int(first.headers.get("X-WP-TotalPages", "1") or 1)
+        urls = [f"{api_url}{query}{page}" for page in range(2, total + 1)]
+        fetched = 1
+        for _, response in self._iter_concurrently(fetch_page, urls):
+            parse(response, parents)
+            fetched += 1
+        if fetched < total:
+            raise BudgetExceededError(f"Fetched {fetched} of {total} Store API pages")
+        return parents
+
+    def get_in_stock_variants_many(self, urls: list) -> dict:
+        """
+        Fetches the in-stock variants of several products concurrently.
+
+        Args:
+            urls (list): The URLs of the product pages.
+
+        Returns:
+            dict: Maps each URL to its list of (size, price) tuples.
+        """
+        return dict(self.iter_in_stock_variants(urls))
+
+    def close(self) -> None:
+        """
+        Forgets the session cookies. The pooled connections belong to the
+        `HttpPool` and stay open for the other scrapers.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.session.cookies.clear()
@@ -0,0 +1,183 @@
+"""
+Persistent stock snapshot used to alert only on changes between cycles.
+
+Every in-stock variant seen in a cycle is stored in SQLite keyed by site, product
+URL and size. Each product of the next cycle is compared against that snapshot
+as soon as it is scraped, so only restocks, sellouts and price changes are
+reported, and the snapshot survives restarts.
+"""
+
+# Standard Library Imports
+import logging
+import sqlite3
+
+# Local Imports
+from models import Price
+
+logger = logging.getLogger(__name__)
+
+RESTOCKED = "restocked"
+SOLD_OUT = "sold_out"
+PRICE_CHANGED = "price_changed"
+
+
+class StockChange:
+    """Represents a change to a single product variant between two cycles."""
+
+    def __init__(
+        self,
+        kind: str,
+        title: str,
+        url: str,
+        size: str,
+        price: Price,
+        old_price: Price = None,
+    ):
+        self.kind = kind
+        self.title = title
+        self.url = url
+        self.size = size
+        self.price = price
+        self.old_price = old_price
+
+
+class StockState:
+    """Stores the last seen in-stock variants and diffs new scrapes against them."""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(variants)")]
+        if columns and "cents" not in columns:
+            # Snapshot from before multi-site support or numeric prices; it
+            # only costs one round of restock alerts to rebuild it
+            logger.info("Discarding stock snapshot in an old format")
+            self.conn.execute("DROP TABLE variants")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS variants (
+                site TEXT NOT NULL,
+                url TEXT NOT NULL,
+                size TEXT NOT NULL,
+                title TEXT NOT NULL,
+                cents INTEGER NOT NULL,
+                currency TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                PRIMARY KEY (site, url, size)
+            )
+            """)
+        self.conn.commit()
+
+    def update_product(self, site: str, product) -> list:
+        """
+        Compares one scraped product against the stored snapshot and replaces
+        its variants in the snapshot.
+
+        The write is left uncommitted so a cycle costs one transaction rather
+        than one per product; call `prune` or `commit` when the cycle ends.
+
+        Args:
+            site (str): The name of the site that was scraped.
+            product (Product): The product from the latest scrape.
+
+        Returns:
+            list: The `StockChange` objects since the previous snapshot.
+        """
+        rows = self.conn.execute(
+            "SELECT size, cents, currency, symbol FROM variants "
+            "WHERE site = ? AND url = ?",
+            (site, product.url),
+        )
+        previous = {size: Price(*price) for size, *price in rows}
+        current = dict(product.variants)
+
+        changes = []
+        for size, price in current.items():
+            if size not in previous:
+                changes.append(
+                    StockChange(RESTOCKED, product.title, product.url, size, price)
+                )
+            elif previous[size].cents != price.cents:
+                changes.append(
+                    StockChange(
+                        PRICE_CHANGED,
+                        product.title,
+                        product.url,
+                        size,
+                        price,
+                        previous[size],
+                    )
+                )
+        for size, price in previous.items():
+            if size not in current:
+                changes.append(
+                    StockChange(SOLD_OUT, product.title, product.url, size, price)
+                )
+
+        if changes:
+            self.conn.execute(
+                "DELETE FROM variants WHERE site = ? AND url = ?", (site, product.url)
+            )
+            self.conn.executemany(
+                "INSERT INTO variants (site, url, size, title, cents, currency, "
+                "symbol) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (site, product.url, size, product.title, *price)
+                    for size, price in current.items()
+                ],
+            )
+        return changes
+
+    def prune(self, site: str, urls: set) -> list:
+        """
+        Drops every product the last scrape did not see and commits the cycle.
+
+        A product that disappears from the listing (or gets excluded) is dropped
+        from the snapshot without an alert, but its variants are returned as
+        sold out so the stock history can close their in-stock runs.
+
+        Args:
+            site (str): The name of the site that was scraped.
+            urls (set): The URLs of every product in the scrape.
+
+        Returns:
+            list: A `SOLD_OUT` `StockChange` for every dropped variant.
+        """
+        rows = self.conn.execute(
+            "SELECT url, size, title, cents, currency, symbol FROM variants "
+            "WHERE site = ?",
+            (site,),
+        )
+        dropped = [
+            StockChange(SOLD_OUT, title, url, size, Price(*price))
+            for url, size, title, *price in rows
+            if url not in urls
+        ]
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM variants WHERE site = ? AND url = ?",
+                [(site, url) for url in {change.url for change in dropped}],
+            )
+        return dropped
+
+    def commit(self) -> None:
+        """
+        Commits the snapshot updates made so far.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.conn.commit()
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.conn.close()
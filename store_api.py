@@ -0,0 +1,109 @@
+"""
+WooCommerce Store API parsing.
+
+WooCommerce serves the whole catalogue as JSON from `/wp-json/wc/store/v1/products`.
+Asking for `type=variation` lists every variation with its parent product,
+attributes, price (in minor units) and stock, 100 per request, so the variants
+of a whole catalogue take a handful of requests instead of one page per product.
+"""
+
+# Standard Library Imports
+from urllib.parse import urlsplit
+
+# Local Imports
+from models import Price, Variant
+
+STORE_API_PATH = "/wp-json/wc/store/v1/products"
+# The most items the Store API returns per page
+STORE_API_PAGE_SIZE = 100
+
+
+class StoreApiUnavailableError(Exception):
+    """Raised when a site doesn't serve the Store API (disabled, blocked or old)."""
+
+
+class StoreApiTemporaryError(Exception):
+    """Raised when the Store API fails for now (server error or rate limit)."""
+
+
+def product_url_key(url: str) -> str:
+    """
+    Normalises a product URL so listing links and Store API permalinks match.
+
+    Variation permalinks carry the chosen attributes in the query string
+    (`/product/tea/?attribute_pa_size=20g`), so the query, fragment and
+    trailing slash are dropped.
+
+    Args:
+        url (str): A product or variation URL.
+
+    Returns:
+        str: The normalised URL.
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path.rstrip('/')}"
+
+
+def _variation_size(item: dict) -> str:
+    """
+    Reads a variation's attribute values (e.g. "20g"), joined with " / ".
+
+    Args:
+        item (dict): A Store API variation.
+
+    Returns:
+        str: The size label.
+    """
+    attributes = item.get("variation")
+    if isinstance(attributes, list):
+        return " / ".join(str(a.get("value", "")) for a in attributes)
+    # Older Store API versions format it as "Size: 20g, Colour: Red"
+    values = [part.split(": ", 1)[-1] for part in str(attributes or "").split(", ")]
+    return " / ".join(v for v in values if v) or item.get("name", "")
+
+
+def _variation_price(prices: dict) -> Price:
+    """
+    Converts a Store API `prices` object to a `Price` in cents.
+
+    Args:
+        prices (dict): The variation's `prices` object.
+
+    Returns:
+        Price: The current price.
+    """
+    minor_unit = int(prices.get("currency_minor_unit", 2))
+    cents = int(prices.get("price") or 0) * 100 // 10**minor_unit
+    return Price(
+        cents, prices.get("currency_code", ""), prices.get("currency_symbol", "")
+    )
+
+
+def parse_store_variations(items: list, parents: dict) -> None:
+    """
+    Adds the in-stock variants of a page of Store API variations to `parents`.
+
+    Every parent product with variations gets an entry, even when none of them
+    are in stock, so it is known to be covered by the Store API.
+
+    Args:
+        items (list): Variations from `/products?type=variation`.
+        parents (dict): Maps normalised parent URLs to lists of `Variant`;
+            updated in place.
+
+    Returns:
+        None
+
+    Raises:
+        StoreApiUnavailableError: If the response is not a list of products.
+    """
+    if not isinstance(items, list):
+        raise StoreApiUnavailableError("Unexpected Store API response")
+    for item in items:
+        permalink = item.get("permalink")
+        if not permalink:
+            continue
+        variants = parents.setdefault(product_url_key(permalink), [])
+        if item.get("is_in_stock") and item.get("is_purchasable", True):
+            price = _variation_price(item.get("prices") or {})
+            variants.append(Variant(_variation_size(item), price))
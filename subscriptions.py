@@ -0,0 +1,205 @@
+"""
+Per-chat watch lists.
+
+Each subscriber (a Telegram chat) watches some products, sizes and price
+ceilings, set in a TOML file pointed to by `SUBSCRIPTIONS`; see
+`subscriptions.toml.example`. Every site's `chat_ids` also get all its changes.
+
+`SubscriptionIndex` turns the watches into an inverted index from product and
+size to price-sorted chats, so each stock change is matched with a few lookups
+however many subscribers there are, and every chat gets one message with just
+the changes it cares about.
+"""
+
+# Standard Library Imports
+import tomllib
+from bisect import bisect_left
+
+# Local Imports
+from store_api import product_url_key
+
+# Index key matching any product or any size
+ANY = "*"
+
+
+def product_keys(title: str, url: str) -> tuple:
+    """
+    Lists the index keys a product can be watched by: its URL and its title.
+
+    Args:
+        title (str): The product title.
+        url (str): The product URL.
+
+    Returns:
+        tuple: The normalised URL and the case-folded title.
+    """
+    return product_url_key(url), title.strip().casefold()
+
+
+def _watch_key(product: str) -> str:
+    """
+    Normalises a watched product to the form `product_keys` produces.
+
+    Args:
+        product (str): A product URL or exact title.
+
+    Returns:
+        str: The index key.
+    """
+    if product.startswith(("http://", "https://")):
+        return product_url_key(product)
+    return product.strip().casefold()
+
+
+class Watch:
+    """One chat's interest in some products, sizes and a price ceiling."""
+
+    def __init__(
+        self,
+        chat_id: str,
+        products: list = (),
+        sizes: list = (),
+        max_price: float = None,
+        sites: list = (),
+    ):
+        """
+        Creates a watch.
+
+        Args:
+            chat_id (str): The Telegram chat to alert.
+            products (list): Product URLs or exact titles; empty for every product.
+            sizes (list): Variant sizes (e.g. "50g"); empty for every size.
+            max_price (float): Only alert on variants at or below this price.
+            sites (list): Site names the watch applies to; empty for every site.
+        """
+        self.chat_id = str(chat_id)
+        self.products = tuple(_watch_key(p) for p in products) or (ANY,)
+        self.sizes = tuple(s.strip().casefold() for s in sizes) or (ANY,)
+        self.max_cents = None if max_price is None else round(max_price * 100)
+        self.sites = tuple(sites)
+
+    def covers_site(self, site_name: str) -> bool:
+        """
+        Checks if the watch applies to a site.
+
+        Args:
+            site_name (str): The site's name.
+
+        Returns:
+            bool: True if the watch has no site list or lists this site.
+        """
+        return not self.sites or site_name in self.sites
+
+
+class SubscriptionIndex:
+    """
+    Inverted index from (product, size) to the chats watching it, by ceiling.
+
+    Each index entry holds its chats sorted by price ceiling, so the chats
+    whose ceiling a price is under are a suffix found by bisection.
+    """
+
+    def __init__(self, watches: list):
+        entries = {}
+        for watch in watches:
+            ceiling = float("inf") if watch.max_cents is None else watch.max_cents
+            for product in watch.products:
+                for size in watch.sizes:
+                    entries.setdefault((product, size), []).append(
+                        (ceiling, watch.chat_id)
+                    )
+        self._ceilings = {}
+        self._chats = {}
+        for key, entry in entries.items():
+            entry.sort()
+            self._ceilings[key] = [ceiling for ceiling, _ in entry]
+            self._chats[key] = [chat_id for _, chat_id in entry]
+        self.watch_count = len(watches)
+
+    def match(self, change) -> set:
+        """
+        Finds the chats interested in one stock change.
+
+        A price change counts if either the old or the new price is under a
+        chat's ceiling, so a chat also hears that a product went over it.
+
+        Args:
+            change (StockChange): The change to match.
+
+        Returns:
+            set: The IDs of the interested chats.
+        """
+        cents = change.price.cents
+        if change.old_price is not None:
+            cents = min(cents, change.old_price.cents)
+        chats = set()
+        for product in (*product_keys(change.title, change.url), ANY):
+            for size in (change.size.strip().casefold(), ANY):
+                ceilings = self._ceilings.get((product, size))
+                if ceilings:
+                    start = bisect_left(ceilings, cents)
+                    chats.update(self._chats[(product, size)][start:])
+        return chats
+
+    def route(self, changes: list) -> list:
+        """
+        Splits a batch of changes between the chats interested in them.
+
+        Chats interested in exactly the same changes are grouped, so each
+        distinct message is only formatted once.
+
+        Args:
+            changes (list): `StockChange` objects, in report order.
+
+        Returns:
+            list: (changes, chat IDs) pairs, one per distinct set of changes.
+        """
+        per_chat = {}
+        for i, change in enumerate(changes):
+            for chat_id in self.match(change):
+                per_chat.setdefault(chat_id, []).append(i)
+        groups = {}
+        for chat_id, indexes in per_chat.items():
+            groups.setdefault(tuple(indexes), []).append(chat_id)
+        return [
+            ([changes[i] for i in indexes], chat_ids)
+            for indexes, chat_ids in groups.items()
+        ]
+
+
+def load_subscriptions(path: str) -> list:
+    """
+    Loads the subscribers' watches from a TOML file.
+
+    Each `[[subscribers]]` table needs a `chat_id`. Its `products`, `sizes`,
+    `max_price` and `sites` form one watch; a subscriber with different
+    ceilings for different products lists them as `[[subscribers.watch]]`
+    tables with the same keys, which fall back to the subscriber's.
+
+    Args:
+        path (str): The path to the TOML file.
+
+    Returns:
+        list: A list of `Watch` objects.
+
+    Raises:
+        ValueError: If a subscriber has no `chat_id`.
+    """
+    with open(path, "rb") as f:
+        data = tomllib.load(f)
+
+    watches = []
+    for i, entry in enumerate(data.get("subscribers", [])):
+        if "chat_id" not in entry:
+            raise ValueError(f"Subscriber #{i + 1} in {path} has no chat_id.")
+        for rule in entry.get("watch") or [{}]:
+            watches.append(
+                Watch(
+                    entry["chat_id"],
+                    rule.get("products", entry.get("products", [])),
+                    rule.get("sizes", entry.get("sizes", [])),
+                    rule.get("max_price", entry.get("max_price")),
+                    rule.get("sites", entry.get("sites", [])),
+                )
+            )
+    return watches
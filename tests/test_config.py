@@ -0,0 +1,39 @@
+# Third-Party Imports
+import pytest
+
+# Local Imports
+from config import load_sites
+
+SITE = """
+[[sites]]
+name = "Shop"
+login_page = "https://shop.test/my-account/"
+email = "me@shop.test"
+password = "secret"
+product_pages = "https://shop.test/shop/"
+"""
+
+
+def write(tmp_path, text):
+    path = tmp_path / "sites.toml"
+    path.write_text(text)
+    return str(path)
+
+
+def test_loads_a_site(tmp_path):
+    (site,) = load_sites(write(tmp_path, SITE), "1")
+    assert site.product_pages == ["https://shop.test/shop/"]
+    assert site.chat_ids == ["1"]
+
+
+@pytest.mark.parametrize(
+    "filters, message",
+    [
+        ('include = ["(unclosed"]', "Invalid filter pattern"),
+        ("colour = 'red'", "Unknown filter settings: colour"),
+    ],
+)
+def test_bad_filters_fail_when_loading(tmp_path, filters, message):
+    path = write(tmp_path, f"{SITE}\n[sites.filters]\n{filters}\n")
+    with pytest.raises(ValueError, match=f"Shop: {message}"):
+        load_sites(path, "1")
@@ -0,0 +1,106 @@
+# Standard Library Imports
+import threading
+
+# Third-Party Imports
+import pytest
+from selenium.common.exceptions import JavascriptException
+
+# Local Imports
+import drivers
+from drivers import DriverPool, wait_for_selector
+
+
+class FakeDriver:
+    def quit(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fake_chromium(monkeypatch):
+    monkeypatch.setattr(drivers, "create_driver", lambda lean: FakeDriver())
+    monkeypatch.setattr(drivers, "is_driver_alive", lambda driver: True)
+
+
+def test_acquire_waits_for_a_release_at_the_limit():
+    pool = DriverPool(spares=0, max_drivers=1)
+    first = pool.acquire()
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (pool.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.2)
+    pool.release(first)
+    assert acquired.wait(2)
+    thread.join()
+    pool.close()
+
+
+def test_failed_launch_frees_its_slot(monkeypatch):
+    pool = DriverPool(spares=0, max_drivers=1)
+
+    def crash(lean):
+        raise RuntimeError("Chromium failed to start")
+
+    monkeypatch.setattr(drivers, "create_driver", crash)
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    monkeypatch.setattr(drivers, "create_driver", lambda lean: FakeDriver())
+    pool.release(pool.acquire())
+    pool.close()
+
+
+def test_closing_the_pool_stops_waiting():
+    pool = DriverPool(spares=0, max_drivers=1)
+    pool.acquire()
+    errors = []
+
+    def wait():
+        try:
+            pool.acquire()
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    pool.close()
+    thread.join(5)
+    assert len(errors) == 1
+
+
+def test_no_limit_by_default():
+    pool = DriverPool(spares=0)
+    held = [pool.acquire() for _ in range(5)]
+    for driver in held:
+        pool.release(driver)
+    pool.close()
+
+
+class ScriptDriver:
+    """Fails the wait script with each of `errors` in turn, then succeeds."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def execute_async_script(self, *args):
+        self.calls += 1
+        if self.errors:
+            raise JavascriptException(self.errors.pop(0))
+        return True
+
+
+def test_wait_restarts_after_navigation():
+    driver = ScriptDriver(
+        "javascript error: document unloaded while waiting for result"
+    )
+    assert wait_for_selector(driver, ".product-form-row", 5)
+    assert driver.calls == 2
+
+
+def test_wait_raises_errors_that_will_not_clear():
+    driver = ScriptDriver("SyntaxError: '!!' is not a valid selector")
+    with pytest.raises(JavascriptException):
+        wait_for_selector(driver, "!!", 5)
+    assert driver.calls == 1
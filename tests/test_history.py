@@ -0,0 +1,130 @@
+# Standard Library Imports
+import os
+
+# Local Imports
+from history import (
+    RECORD,
+    RECORDS_FILE,
+    VARIANTS_FILE,
+    HistoryReader,
+    HistoryStore,
+    in_stock_runs,
+)
+from models import Price
+from state import PRICE_CHANGED, RESTOCKED, SOLD_OUT, StockChange
+
+
+def change(kind, url="https://shop.test/a/", size="50g", cents=1000):
+    return StockChange(kind, "Sencha", url, size, Price(cents, "USD", "$"))
+
+
+def test_records_round_trip(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.record("Shop", [change(RESTOCKED)], timestamp=100)
+    store.record("Shop", [change(PRICE_CHANGED, cents=1200)], timestamp=200)
+    store.record("Shop", [change(SOLD_OUT, cents=1200)], timestamp=300)
+    store.close()
+
+    reader = HistoryReader(str(tmp_path))
+    assert list(reader.records()) == [
+        (100, 0, 1000, RESTOCKED),
+        (200, 0, 1200, PRICE_CHANGED),
+        (300, 0, 1200, SOLD_OUT),
+    ]
+    assert reader.price(0, 1200) == Price(1200, "USD", "$")
+    reader.close()
+
+
+def test_time_range_is_found_by_bisection(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    for seconds in range(0, 1000, 10):
+        store.record("Shop", [change(RESTOCKED)], timestamp=seconds)
+    store.close()
+
+    reader = HistoryReader(str(tmp_path))
+    times = [r[0] for r in reader.records(since=500, until=550)]
+    assert times == [500, 510, 520, 530, 540]
+    assert list(reader.records(since=2000)) == []
+    assert len(list(reader.records(until=5))) == 1
+    reader.close()
+
+
+def test_timestamps_never_go_back(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.record("Shop", [change(RESTOCKED)], timestamp=500)
+    store.record("Shop", [change(SOLD_OUT)], timestamp=400)
+    store.close()
+    # Reopening picks up the last time from the file
+    store = HistoryStore(str(tmp_path))
+    store.record("Shop", [change(RESTOCKED)], timestamp=300)
+    store.close()
+
+    reader = HistoryReader(str(tmp_path))
+    assert [r[0] for r in reader.records()] == [500, 500, 500]
+    reader.close()
+
+
+def test_torn_writes_are_trimmed(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.record("Shop", [change(RESTOCKED)], timestamp=100)
+    store.close()
+    # A crash mid-append leaves half a record and half a variant line
+    with open(tmp_path / RECORDS_FILE, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    with open(tmp_path / VARIANTS_FILE, "a") as f:
+        f.write('{"site": "Sh')
+
+    store = HistoryStore(str(tmp_path))
+    store.record("Shop", [change(SOLD_OUT, url="https://shop.test/b/")], 200)
+    store.close()
+
+    assert os.path.getsize(tmp_path / RECORDS_FILE) == 2 * RECORD.size
+    reader = HistoryReader(str(tmp_path))
+    assert [v["url"] for v in reader.variants] == [
+        "https://shop.test/a/",
+        "https://shop.test/b/",
+    ]
+    assert list(reader.records()) == [
+        (100, 0, 1000, RESTOCKED),
+        (200, 1, 1000, SOLD_OUT),
+    ]
+    reader.close()
+
+
+def test_select_by_site_and_product(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.record("Shop", [change(RESTOCKED, url="https://shop.test/a/")], 1)
+    store.record("Other", [change(RESTOCKED, url="https://other.test/a/")], 2)
+    store.close()
+
+    reader = HistoryReader(str(tmp_path))
+    assert reader.select(site="Other") == {1}
+    assert reader.select(product="SENCHA") == {0, 1}
+    assert reader.select(product="other.test") == {1}
+    reader.close()
+
+
+def test_in_stock_runs(tmp_path):
+    records = [
+        (10, 0, 100, RESTOCKED),
+        (20, 1, 100, RESTOCKED),
+        (30, 0, 100, SOLD_OUT),
+        (40, 0, 100, RESTOCKED),
+        (50, 1, 100, PRICE_CHANGED),
+    ]
+    assert sorted(in_stock_runs(None, records), key=str) == sorted(
+        [(0, 10, 30), (1, 20, None), (0, 40, None)], key=str
+    )
+
+
+def test_closing_stops_unfinished_reads(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    for seconds in range(10):
+        store.record("Shop", [change(RESTOCKED)], timestamp=seconds)
+    store.close()
+
+    reader = HistoryReader(str(tmp_path))
+    records = reader.records()
+    assert next(records) == (0, 0, 1000, RESTOCKED)
+    reader.close()
+    assert list(records) == []
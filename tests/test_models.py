@@ -0,0 +1,31 @@
+# Third-Party Imports
+import pytest
+
+# Local Imports
+from models import Price, parse_price
+
+
+@pytest.mark.parametrize(
+    "text, cents",
+    [
+        ("$12.50", 1250),
+        ("$1,234.50", 123450),
+        ("1.234,50 €", 123450),
+        ("12", 1200),
+        ("12,5", 1250),
+        ("£ 1 000", 100000),
+        ("1.234.567", 123456700),
+        ("", 0),
+    ],
+)
+def test_parse_price_formats(text, cents):
+    assert parse_price(text).cents == cents
+
+
+def test_parse_price_keeps_currency():
+    assert parse_price("€3,00", "EUR", "€") == Price(300, "EUR", "€")
+
+
+def test_price_str():
+    assert str(Price(123456, "USD", "$")) == "$1,234.56"
+    assert str(Price(5, "EUR")) == "0.05 EUR"
@@ -0,0 +1,88 @@
+# Standard Library Imports
+import asyncio
+from collections import deque
+
+# Third-Party Imports
+from telegram.error import BadRequest, Forbidden
+
+# Local Imports
+from notifier import NotificationQueue, message_length, split_message
+
+
+def test_short_message_is_one_chunk():
+    assert split_message("a\n\nb", limit=10) == ["a\n\nb"]
+
+
+def test_message_of_exactly_the_limit_is_not_split():
+    text = "x" * 10
+    assert split_message(text, limit=10) == [text]
+
+
+def test_splits_between_blocks():
+    text = "aaaa\n\nbbbb\n\ncccc"
+    assert split_message(text, limit=10) == ["aaaa\n\nbbbb", "cccc"]
+
+
+def test_splits_long_block_between_lines():
+    text = "aaaa\nbbbb\ncccc"
+    assert split_message(text, limit=9) == ["aaaa\nbbbb", "cccc"]
+
+
+def test_cuts_a_line_longer_than_the_limit():
+    chunks = split_message("x" * 25, limit=10)
+    assert chunks == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_chunks_keep_all_text():
+    text = "\n\n".join(f"product {i}\nsize 50g\n$1.00" for i in range(200))
+    chunks = split_message(text, limit=100)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert "\n\n".join(chunks) == text
+
+
+def test_emoji_count_as_two_units():
+    assert message_length("🍵") == 2
+    assert message_length("é") == 1
+
+
+def test_limit_is_measured_in_utf16_units():
+    text = "🍵" * 6
+    chunks = split_message(text, limit=5)
+    assert chunks == ["🍵🍵", "🍵🍵", "🍵🍵"]
+    assert all(message_length(chunk) <= 5 for chunk in chunks)
+
+
+def test_rejected_chunks_are_dropped_without_retrying():
+    sent = []
+
+    async def send(chat_id, text):
+        sent.append(text)
+        if text == "bad":
+            raise BadRequest("Message is too long")
+        if text == "blocked":
+            raise Forbidden("Bot was blocked by the user")
+
+    queue = NotificationQueue(send)
+    asyncio.run(queue._deliver("chat", deque(["bad", "blocked", "ok"])))
+    assert sent == ["bad", "blocked", "ok"]
+
+
+def test_unexpected_errors_do_not_stop_delivery():
+    sent = []
+
+    async def send(chat_id, text):
+        if text == "boom":
+            raise RuntimeError("HTTP client closed")
+        sent.append((chat_id, text))
+
+    async def deliver():
+        queue = NotificationQueue(send)
+        queue.start()
+        queue.put("a", "boom")
+        queue.put("b", "first")
+        await asyncio.sleep(0.05)
+        queue.put("a", "later")
+        await queue.close()
+
+    asyncio.run(deliver())
+    assert sent == [("b", "first"), ("a", "later")]
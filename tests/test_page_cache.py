@@ -0,0 +1,37 @@
+# Local Imports
+from page_cache import CachedPage, PageCache
+
+
+def page(digest):
+    return CachedPage(None, None, digest, [])
+
+
+def test_least_recently_used_page_is_evicted():
+    cache = PageCache(max_entries=2)
+    cache.store("a", page("1"))
+    cache.store("b", page("2"))
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a").digest == "1"
+    cache.store("c", page("3"))
+    assert cache.get("b") is None
+    assert cache.get("a").digest == "1"
+    assert cache.get("c").digest == "3"
+
+
+def test_storing_again_replaces_without_growing():
+    cache = PageCache(max_entries=2)
+    cache.store("a", page("1"))
+    cache.store("a", page("2"))
+    cache.store("b", page("3"))
+    assert cache.get("a").digest == "2"
+    assert cache.get("b").digest == "3"
+
+
+def test_conditional_headers():
+    cache = PageCache()
+    assert cache.conditional_headers("a") == {}
+    cache.store("a", CachedPage('"v1"', "Tue, 01 Oct 2026 00:00:00 GMT", "1", []))
+    assert cache.conditional_headers("a") == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Tue, 01 Oct 2026 00:00:00 GMT",
+    }
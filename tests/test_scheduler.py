@@ -0,0 +1,32 @@
+# Local Imports
+from scheduler import PollScheduler
+
+
+def test_backoff_doubles_up_to_the_max_interval():
+    scheduler = PollScheduler(60, 10, 600)
+    intervals = []
+    for _ in range(5):
+        scheduler.record_error()
+        intervals.append(scheduler.current_interval())
+    assert intervals == [120, 240, 480, 600, 600]
+
+
+def test_backoff_survives_a_long_outage():
+    scheduler = PollScheduler(60.0, 10.0, 600.0)
+    for _ in range(2000):
+        scheduler.record_error()
+    assert scheduler.current_interval() == 600
+    assert 0 <= scheduler.next_delay(0) <= 600 * 1.1
+
+
+def test_retry_after_is_honoured():
+    scheduler = PollScheduler(60, 10, 600)
+    scheduler.record_error(retry_after=900)
+    assert scheduler.current_interval() == 900
+
+
+def test_success_resets_the_backoff():
+    scheduler = PollScheduler(60, 10, 600)
+    scheduler.record_error()
+    scheduler.record_success(0, 0)
+    assert scheduler.current_interval() == 60
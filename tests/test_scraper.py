@@ -0,0 +1,156 @@
+# Third-Party Imports
+import pytest
+import requests
+
+# Local Imports
+from budget import BudgetExceededError
+from scraper import (
+    HttpPool,
+    HttpScraper,
+    RateLimitedError,
+    parse_listing,
+    parse_retry_after,
+)
+from store_api import StoreApiTemporaryError, StoreApiUnavailableError
+
+LISTING = """
+<ul>
+  <li class="product post-12 instock product_cat-tea">
+    <a href="https://shop.test/product/sencha/" title="Sencha">Sencha</a>
+    <span class="price"><span class="woocommerce-Price-amount">$8.00</span> –
+    <span class="woocommerce-Price-amount">$30.00</span></span>
+  </li>
+  <li class="product product-category"><a href="/category/tea/">Tea</a></li>
+</ul>
+<nav class="woocommerce-pagination">{links}</nav>
+"""
+
+
+def listing(*links) -> str:
+    anchors = "".join(
+        f'<a class="page-numbers" href="{href}">{text}</a>' for text, href in links
+    )
+    return LISTING.format(links=anchors)
+
+
+def test_parses_products_and_categories():
+    parsed = parse_listing(listing(), "https://shop.test/shop/")
+    assert parsed["products"] == [
+        {
+            "id": 12,
+            "title": "Sencha",
+            "url": "https://shop.test/product/sencha/",
+            "classes": ["product", "post-12", "instock", "product_cat-tea"],
+            "price": 800,
+        }
+    ]
+    assert parsed["categories"] == ["https://shop.test/category/tea/"]
+    assert parsed["pages"] == []
+
+
+def test_fills_in_elided_page_links():
+    html = listing(
+        ("2", "/shop/page/2/"), ("3", "/shop/page/3/"), ("40", "/shop/page/40/")
+    )
+    pages = parse_listing(html, "https://shop.test/shop/")["pages"]
+    assert len(pages) == 39
+    assert pages[0] == "https://shop.test/shop/page/2/"
+    assert pages[10] == "https://shop.test/shop/page/12/"
+    assert pages[-1] == "https://shop.test/shop/page/40/"
+
+
+def test_query_string_pagination():
+    html = listing(("2", "?paged=2"), ("5", "?paged=5"), ("→", "?paged=2"))
+    pages = parse_listing(html, "https://shop.test/shop/")["pages"]
+    assert pages == [f"https://shop.test/shop/?paged={n}" for n in range(2, 6)]
+
+
+def test_page_number_in_the_host_is_left_alone():
+    html = listing(("3", "https://shop3.test/?product-page=3"))
+    pages = parse_listing(html, "https://shop3.test/")["pages"]
+    assert pages == [
+        "https://shop3.test/?product-page=2",
+        "https://shop3.test/?product-page=3",
+    ]
+
+
+@pytest.fixture
+def scraper():
+    pool = HttpPool(max_workers=4, requests_per_second=0)
+    yield HttpScraper("test", "https://shop.test/login/", pool)
+    pool.close()
+
+
+def test_failed_pages_are_skipped(scraper):
+    def fetch(url):
+        if url.endswith("gone/"):
+            raise requests.HTTPError(f"404 Client Error for {url}")
+        if url.endswith("slow/"):
+            raise BudgetExceededError(url)
+        if url.endswith("down/"):
+            raise requests.ConnectionError(url)
+        return url.upper()
+
+    urls = [f"https://shop.test/{slug}/" for slug in ("a", "gone", "slow", "down", "b")]
+    results = dict(scraper._iter_concurrently(fetch, urls))
+    assert results == {
+        "https://shop.test/a/": "HTTPS://SHOP.TEST/A/",
+        "https://shop.test/b/": "HTTPS://SHOP.TEST/B/",
+    }
+
+
+def http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} Error", response=response)
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (http_error(404), StoreApiUnavailableError),
+        (http_error(503), StoreApiTemporaryError),
+        (http_error(500), StoreApiTemporaryError),
+        (RateLimitedError("https://shop.test/", 30), StoreApiTemporaryError),
+        (requests.ConnectionError("reset"), StoreApiTemporaryError),
+    ],
+)
+def test_only_a_missing_store_api_disables_it(scraper, monkeypatch, error, expected):
+    def get(url, headers=None):
+        raise error
+
+    monkeypatch.setattr(scraper, "_get", get)
+    with pytest.raises(expected):
+        scraper.fetch_store_variants("https://shop.test/shop/")
+
+
+def test_store_api_pages_left_out_are_not_a_catalogue(scraper, monkeypatch):
+    def get(url, headers=None):
+        if url.endswith("page=3"):
+            raise BudgetExceededError(url)
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["X-WP-TotalPages"] = "3"
+        response._content = b"[]"
+        return response
+
+    monkeypatch.setattr(scraper, "_get", get)
+    with pytest.raises(BudgetExceededError):
+        scraper.fetch_store_variants("https://shop.test/shop/")
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [
+        ("120", 120),
+        ("Wed, 21 Oct 2015 07:28:30 GMT", 30),
+        ("Wed, 21 Oct 2015 07:28:30 -0000", 30),
+        ("Wed, 21 Oct 2015 07:27:00 GMT", 0),
+        ("soon", 0),
+        ("", 0),
+        (None, 0),
+    ],
+)
+def test_parse_retry_after(value, seconds):
+    # 2015-10-21 07:28:00 UTC
+    assert parse_retry_after(value, now=1445412480) == seconds
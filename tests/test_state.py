@@ -0,0 +1,48 @@
+# Local Imports
+from history import HistoryReader, HistoryStore, in_stock_runs
+from models import Price, Product, StockStatus, Variant
+from state import RESTOCKED, SOLD_OUT, StockState
+
+
+def product(url, *sizes, title="Sencha"):
+    variants = [Variant(size, Price(1000, "USD", "$")) for size in sizes]
+    return Product(title, StockStatus.IN_STOCK, url, variants)
+
+
+def test_prune_returns_the_dropped_variants_as_sold_out(tmp_path):
+    state = StockState(str(tmp_path / "state.db"))
+    state.update_product("Shop", product("https://shop.test/a/", "50g", "100g"))
+    state.update_product("Shop", product("https://shop.test/b/", "50g"))
+    state.update_product("Other", product("https://shop.test/a/", "50g"))
+
+    dropped = state.prune("Shop", {"https://shop.test/b/"})
+    assert sorted((c.kind, c.url, c.size, c.title) for c in dropped) == [
+        (SOLD_OUT, "https://shop.test/a/", "100g", "Sencha"),
+        (SOLD_OUT, "https://shop.test/a/", "50g", "Sencha"),
+    ]
+    assert dropped[0].price == Price(1000, "USD", "$")
+    assert state.prune("Shop", {"https://shop.test/b/"}) == []
+    # Other sites keep their snapshot
+    assert state.prune("Other", {"https://shop.test/a/"}) == []
+    # Relisted products count as restocked again
+    changes = state.update_product("Shop", product("https://shop.test/a/", "50g"))
+    assert [c.kind for c in changes] == [RESTOCKED]
+    state.close()
+
+
+def test_delisted_products_close_their_in_stock_runs(tmp_path):
+    state = StockState(str(tmp_path / "state.db"))
+    store = HistoryStore(str(tmp_path / "history"))
+    store.record(
+        "Shop",
+        state.update_product("Shop", product("https://shop.test/a/", "50g")),
+        timestamp=100,
+    )
+    store.record("Shop", state.prune("Shop", set()), timestamp=400)
+    store.close()
+    state.close()
+
+    reader = HistoryReader(str(tmp_path / "history"))
+    runs = in_stock_runs(reader, reader.records())
+    assert [(run[1], run[2]) for run in runs] == [(100, 400)]
+    reader.close()
@@ -0,0 +1,70 @@
+# Local Imports
+from models import Price
+from state import PRICE_CHANGED, RESTOCKED, StockChange
+from subscriptions import SubscriptionIndex, Watch, load_subscriptions
+
+URL = "https://shop.test/product/sencha/"
+
+
+def change(size="50g", cents=1000, old_cents=None, kind=RESTOCKED, url=URL):
+    old = None if old_cents is None else Price(old_cents)
+    return StockChange(kind, "Sencha", url, size, Price(cents), old)
+
+
+def test_price_ceiling_is_inclusive():
+    index = SubscriptionIndex(
+        [Watch("under", max_price=9.99), Watch("at", max_price=10), Watch("any")]
+    )
+    assert index.match(change(cents=1000)) == {"at", "any"}
+    assert index.match(change(cents=999)) == {"under", "at", "any"}
+    assert index.match(change(cents=1001)) == {"any"}
+
+
+def test_price_change_matches_on_the_lower_price():
+    index = SubscriptionIndex([Watch("cheap", max_price=10)])
+    # Going over the ceiling is still news to the chat
+    assert index.match(change(cents=1500, old_cents=900, kind=PRICE_CHANGED)) == {
+        "cheap"
+    }
+    assert index.match(change(cents=1500, old_cents=1100, kind=PRICE_CHANGED)) == set()
+
+
+def test_products_and_sizes():
+    index = SubscriptionIndex(
+        [
+            Watch("by-url", products=[URL.rstrip("/")]),
+            Watch("by-title", products=["  SENCHA "], sizes=["50G"]),
+            Watch("other", products=["Matcha"]),
+        ]
+    )
+    assert index.match(change(size="50g")) == {"by-url", "by-title"}
+    assert index.match(change(size="100g")) == {"by-url"}
+
+
+def test_route_groups_chats_with_the_same_changes():
+    index = SubscriptionIndex([Watch("a"), Watch("b"), Watch("c", sizes=["100g"])])
+    small, large = change(size="50g"), change(size="100g")
+    routes = index.route([small, large])
+    grouped = {tuple(sorted(chats)): changes for changes, chats in routes}
+    assert grouped == {("a", "b"): [small, large], ("c",): [large]}
+
+
+def test_load_subscriptions(tmp_path):
+    path = tmp_path / "subscriptions.toml"
+    path.write_text("""
+[[subscribers]]
+chat_id = 1
+max_price = 20
+
+[[subscribers.watch]]
+products = ["Sencha"]
+
+[[subscribers.watch]]
+products = ["Matcha"]
+max_price = 50
+""")
+    watches = load_subscriptions(str(path))
+    assert [(w.chat_id, w.products, w.max_cents) for w in watches] == [
+        ("1", ("sencha",), 2000),
+        ("1", ("matcha",), 5000),
+    ]
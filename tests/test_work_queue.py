@@ -0,0 +1,157 @@
+# Third-Party Imports
+import pytest
+
+# Local Imports
+import work_queue
+from models import Price, Variant
+from work_queue import (
+    LISTING,
+    VARIANTS,
+    RedisWorkQueue,
+    SqliteWorkQueue,
+    decode_result,
+    encode_results,
+)
+
+
+class Clock:
+    """Stands in for `time.time` so leases expire on demand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(work_queue.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def queue(request, tmp_path, clock):
+    if request.param == "sqlite":
+        queue = SqliteWorkQueue(str(tmp_path / "queue.db"), lease_seconds=60)
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        queue = RedisWorkQueue(fakeredis.FakeRedis(), lease_seconds=60)
+    yield queue
+    queue.close()
+
+
+def test_units_are_claimed_in_order_once(queue):
+    ids = queue.submit("Shop", VARIANTS, [["a", "b"], ["c"]])
+    first = queue.claim("w1", ["Shop"])
+    second = queue.claim("w2", ["Shop"])
+    assert (first.id, first.urls, first.attempts) == (ids[0], ["a", "b"], 1)
+    assert (second.id, second.urls) == (ids[1], ["c"])
+    assert queue.claim("w3", ["Shop"]) is None
+
+
+def test_claims_only_the_workers_sites(queue):
+    queue.submit("Other", LISTING, [["a"]])
+    assert queue.claim("w1", ["Shop"]) is None
+    assert queue.claim("w1", ["Shop", "Other"]).site == "Other"
+
+
+def test_expired_lease_is_reclaimed(queue, clock):
+    (unit_id,) = queue.submit("Shop", VARIANTS, [["a"]])
+    queue.claim("dead", ["Shop"])
+    clock.now += 59
+    assert queue.claim("w2", ["Shop"]) is None
+    clock.now += 2
+    unit = queue.claim("w2", ["Shop"])
+    assert (unit.id, unit.attempts) == (unit_id, 2)
+
+
+def test_unit_fails_after_max_attempts(queue, clock):
+    (unit_id,) = queue.submit("Shop", VARIANTS, [["a"]])
+    for _ in range(queue.max_attempts):
+        assert queue.claim("dead", ["Shop"]) is not None
+        clock.now += 61
+    assert queue.claim("w", ["Shop"]) is None
+    assert queue.collect("Shop", {unit_id}) == ({}, {unit_id})
+
+
+def test_release_without_counting_the_attempt(queue):
+    (unit_id,) = queue.submit("Shop", VARIANTS, [["a"]])
+    for _ in range(queue.max_attempts + 2):
+        unit = queue.claim("w", ["Shop"])
+        queue.release(unit, "w")
+    assert queue.claim("w", ["Shop"]).attempts == 1
+
+
+def test_counted_releases_fail_the_unit(queue):
+    (unit_id,) = queue.submit("Shop", VARIANTS, [["a"]])
+    for _ in range(queue.max_attempts):
+        queue.release(queue.claim("w", ["Shop"]), "w", count_attempt=True)
+    assert queue.claim("w", ["Shop"]) is None
+    assert queue.collect("Shop", {unit_id}) == ({}, {unit_id})
+
+
+def test_release_by_another_worker_is_ignored(queue):
+    queue.submit("Shop", VARIANTS, [["a"]])
+    unit = queue.claim("w1", ["Shop"])
+    queue.release(unit, "w2")
+    assert queue.claim("w2", ["Shop"]) is None
+
+
+def test_first_report_wins(queue, clock):
+    (unit_id,) = queue.submit("Shop", VARIANTS, [["a"]])
+    slow = queue.claim("slow", ["Shop"])
+    clock.now += 61
+    fast = queue.claim("fast", ["Shop"])
+    assert queue.complete(fast, {"a": []})
+    assert not queue.complete(slow, {"a": [["50g", 1, "", ""]]})
+    assert queue.collect("Shop", {unit_id}) == ({unit_id: {"a": []}}, set())
+    # Collected units are gone
+    assert queue.collect("Shop", {unit_id}) == ({}, set())
+
+
+def test_cancelled_units_are_not_claimed_or_stored(queue):
+    (unit_id,) = queue.submit("Shop", VARIANTS, [["a"]])
+    unit = queue.claim("w", ["Shop"])
+    queue.cancel("Shop", {unit_id})
+    assert not queue.complete(unit, {"a": []})
+    queue.submit("Shop", VARIANTS, [["b"]])
+    queue.purge("Shop")
+    assert queue.claim("w", ["Shop"]) is None
+
+
+def test_session_versions(queue):
+    assert queue.session("Shop") == (0, None)
+    queue.publish_session("Shop", b"one")
+    queue.publish_session("Shop", b"two")
+    assert queue.session("Shop") == (2, b"two")
+
+
+def test_results_round_trip():
+    variants = [Variant("50g", Price(1250, "USD", "$"))]
+    encoded = encode_results(VARIANTS, {"a": variants})
+    assert decode_result(VARIANTS, encoded["a"]) == variants
+    listing = {"products": [], "pages": ["p2"], "categories": []}
+    assert decode_result(LISTING, encode_results(LISTING, {"a": listing})["a"]) == (
+        listing
+    )
+
+
+def test_sites_are_kept_apart(queue):
+    (shop_id,) = queue.submit("Shop", VARIANTS, [["a"]])
+    (other_id,) = queue.submit("Other", VARIANTS, [["b"]])
+    queue.complete(queue.claim("w", ["Shop"]), {"a": []})
+    queue.complete(queue.claim("w", ["Other"]), {"b": []})
+    queue.purge("Other")
+    assert queue.collect("Shop", {shop_id, other_id}) == ({shop_id: {"a": []}}, set())
+
+
+def test_redis_keys_of_a_site_share_a_cluster_slot():
+    pytest.importorskip("redis")
+    from redis.crc import key_slot
+
+    queue = RedisWorkQueue.__new__(RedisWorkQueue)
+    queue.prefix = "stock-checker"
+    slots = {key_slot(key.encode()) for key in queue._keys("My Shop")}
+    assert len(slots) == 1
@@ -0,0 +1,648 @@
+"""
+Leased work units for the coordinator/worker mode.
+
+The coordinator (the process that logs in and alerts) splits each cycle's
+listing and product page URLs into small units and submits them to a shared
+queue. Workers, on other cores or hosts, claim a unit, fetch its pages over
+HTTP with the coordinator's session cookies and report the results, which the
+coordinator streams into the cycle as they arrive. A cycle's pages are spread
+over every worker, so it takes about as long as its share of the slowest one.
+
+A claimed unit is leased for `lease_seconds`. If its worker dies or hangs, the
+lease runs out and the next `claim` hands the unit to someone else; the first
+result reported wins. A unit whose lease ran out `max_attempts` times is given
+up on, and its pages count as skipped for the cycle.
+
+The session cookies are shared through the queue too, encrypted with the
+site's cookie jar key, so workers need no browser and never log in. When a
+worker's pages come back logged out it hands the unit back and waits for the
+coordinator to publish a new session.
+
+Two backends share one interface:
+
+- `SqliteWorkQueue`: a SQLite file, for workers on the same host. Needs no
+  server and is the default.
+- `RedisWorkQueue`: a Redis server (`redis://host:6379/0`), for workers on
+  several hosts. Needs the `redis` package.
+"""
+
+# Standard Library Imports
+import json
+import sqlite3
+import time
+
+# Local Imports
+from models import Price, Variant
+
+LISTING = "listing"
+VARIANTS = "variants"
+
+
+class WorkUnit:
+    """A batch of page URLs of one site, leased to one worker at a time."""
+
+    __slots__ = ("id", "site", "kind", "urls", "attempts")
+
+    def __init__(self, id: int, site: str, kind: str, urls: list, attempts: int):
+        self.id = id
+        self.site = site
+        # LISTING for listing pages, VARIANTS for product pages
+        self.kind = kind
+        self.urls = urls
+        self.attempts = attempts
+
+
+def encode_results(kind: str, results: dict) -> dict:
+    """
+    Turns a unit's results into JSON-friendly values.
+
+    Args:
+        kind (str): The unit's kind.
+        results (dict): Maps each URL to its listing dict or list of `Variant`.
+
+    Returns:
+        dict: The URLs and their encoded results.
+    """
+    if kind == LISTING:
+        return results
+    return {
+        url: [[v.size, *v.price] for v in variants] for url, variants in results.items()
+    }
+
+
+def decode_result(kind: str, result):
+    """
+    Reverses `encode_results` for the result of one URL.
+
+    Args:
+        kind (str): The unit's kind.
+        result: The encoded result.
+
+    Returns:
+        The listing dict, or the list of `Variant`.
+    """
+    if kind == LISTING:
+        return result
+    return [Variant(size, Price(*price)) for size, *price in result]
+
+
+def process_unit(scraper, unit: WorkUnit, reauth=None) -> dict:
+    """
+    Fetches the pages of a unit concurrently.
+
+    Pages that time out are left out of the results, like in a local cycle.
+
+    Args:
+        scraper (HttpScraper): A scraper holding the site's session.
+        unit (WorkUnit): The unit to process.
+        reauth (callable): Logs in again after a logout, see
+            `HttpScraper.iter_listings`. Workers can't, so they leave it out.
+
+    Returns:
+        dict: The encoded results, see `encode_results`.
+
+    Raises:
+        SessionExpiredError: If the pages were served logged out.
+    """
+    if unit.kind == LISTING:
+        fetch = scraper.iter_listings
+    else:
+        fetch = scraper.iter_in_stock_variants
+    return encode_results(unit.kind, dict(fetch(unit.urls, reauth)))
+
+
+def _chunks(items: list, size: int = 500):
+    """Splits a list of IDs to stay under SQLite's bound parameter limit."""
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class SqliteWorkQueue:
+    """Work queue in a SQLite file shared by the processes of one host."""
+
+    def __init__(self, path: str, lease_seconds: float = 60, max_attempts: int = 3):
+        """
+        Opens the queue, creating the file if needed.
+
+        Args:
+            path (str): The path to the SQLite file.
+            lease_seconds (float): How long a claimed unit stays with its worker.
+            max_attempts (int): Leases a unit may run out of before it is given up.
+        """
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Autocommit, with explicit transactions where a read decides a write
+        self.conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS units (
+                id INTEGER PRIMARY KEY,
+                site TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                urls TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT
+            );
+            CREATE INDEX IF NOT EXISTS units_by_state ON units (site, state, id);
+            CREATE TABLE IF NOT EXISTS sessions (
+                site TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                token BLOB NOT NULL
+            );
+            """)
+
+    def submit(self, site: str, kind: str, batches: list) -> list:
+        """
+        Adds units to the queue.
+
+        Args:
+            site (str): The site the pages belong to.
+            kind (str): LISTING or VARIANTS.
+            batches (list): One list of URLs per unit.
+
+        Returns:
+            list: The IDs of the new units, in order.
+        """
+        ids = []
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for urls in batches:
+                cursor = self.conn.execute(
+                    "INSERT INTO units (site, kind, urls) VALUES (?, ?, ?)",
+                    (site, kind, json.dumps(urls)),
+                )
+                ids.append(cursor.lastrowid)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return ids
+
+    def claim(self, worker: str, sites: list) -> WorkUnit:
+        """
+        Leases the oldest unit that is waiting or whose lease has run out.
+
+        Args:
+            worker (str): The claiming worker's ID.
+            sites (list): The sites the worker can fetch.
+
+        Returns:
+            WorkUnit: The leased unit, or None if there is no work.
+        """
+        now = time.time()
+        marks = ", ".join("?" * len(sites))
+        # Taking the write lock up front stops two workers claiming one unit
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "UPDATE units SET state = 'failed' WHERE state = 'leased' "
+                "AND lease_until < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            row = self.conn.execute(
+                f"SELECT id, site, kind, urls, attempts FROM units "
+                f"WHERE site IN ({marks}) AND (state = 'pending' "
+                f"OR (state = 'leased' AND lease_until < ?)) ORDER BY id LIMIT 1",
+                (*sites, now),
+            ).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    "UPDATE units SET state = 'leased', worker = ?, "
+                    "lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                    (worker, now + self.lease_seconds, row[0]),
+                )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        unit_id, site, kind, urls, attempts = row
+        return WorkUnit(unit_id, site, kind, json.loads(urls), attempts + 1)
+
+    def complete(self, unit: WorkUnit, results: dict) -> bool:
+        """
+        Reports a unit's results. The first report wins, even from a worker
+        whose lease ran out; later ones, and reports for cancelled units, are
+        dropped.
+
+        Args:
+            unit (WorkUnit): The claimed unit.
+            results (dict): The encoded results, see `encode_results`.
+
+        Returns:
+            bool: True if the results were stored.
+        """
+        cursor = self.conn.execute(
+            "UPDATE units SET state = 'done', result = ? "
+            "WHERE id = ? AND state = 'leased'",
+            (json.dumps(results), unit.id),
+        )
+        return cursor.rowcount > 0
+
+    def release(self, unit: WorkUnit, worker: str, count_attempt: bool = False):
+        """
+        Hands a unit back without results, e.g. when its pages came back logged
+        out, so it can be claimed again straight away.
+
+        Args:
+            unit (WorkUnit): The claimed unit.
+            worker (str): The worker that claimed it.
+            count_attempt (bool): Count the lease towards `max_attempts`, for
+                units that failed rather than ones that couldn't be tried.
+
+        Returns:
+            None
+        """
+        self.conn.execute(
+            "UPDATE units SET worker = NULL, lease_until = NULL, "
+            "attempts = attempts - ?, state = CASE WHEN attempts - ? >= ? "
+            "THEN 'failed' ELSE 'pending' END "
+            "WHERE id = ? AND state = 'leased' AND worker = ?",
+            (
+                int(not count_attempt),
+                int(not count_attempt),
+                self.max_attempts,
+                unit.id,
+                worker,
+            ),
+        )
+
+    def collect(self, site: str, unit_ids: set) -> tuple:
+        """
+        Takes the finished units off the queue.
+
+        Args:
+            site (str): The site the units belong to.
+            unit_ids (set): The units to check.
+
+        Returns:
+            tuple: A dict mapping each done unit's ID to its encoded results,
+                and the set of IDs of units that were given up on.
+        """
+        done = {}
+        failed = set()
+        for chunk in _chunks(list(unit_ids)):
+            marks = ", ".join("?" * len(chunk))
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    f"SELECT id, state, result FROM units WHERE site = ? "
+                    f"AND id IN ({marks}) AND state IN ('done', 'failed')",
+                    (site, *chunk),
+                ).fetchall()
+                self.conn.executemany(
+                    "DELETE FROM units WHERE id = ?", [(row[0],) for row in rows]
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            for unit_id, state, result in rows:
+                if state == "done":
+                    done[unit_id] = json.loads(result)
+                else:
+                    failed.add(unit_id)
+        return done, failed
+
+    def cancel(self, site: str, unit_ids: set) -> None:
+        """
+        Drops units nobody needs any more, e.g. once the cycle is out of time.
+
+        Args:
+            site (str): The site the units belong to.
+            unit_ids (set): The units to drop.
+
+        Returns:
+            None
+        """
+        for chunk in _chunks(list(unit_ids)):
+            marks = ", ".join("?" * len(chunk))
+            self.conn.execute(
+                f"DELETE FROM units WHERE site = ? AND id IN ({marks})", (site, *chunk)
+            )
+
+    def purge(self, site: str) -> None:
+        """
+        Drops every unit of a site, left over from a coordinator that stopped.
+
+        Args:
+            site (str): The site name.
+
+        Returns:
+            None
+        """
+        self.conn.execute("DELETE FROM units WHERE site = ?", (site,))
+
+    def publish_session(self, site: str, token: bytes) -> None:
+        """
+        Shares a site's session cookies with the workers.
+
+        Args:
+            site (str): The site name.
+            token (bytes): The cookies, encrypted by `CookieJar.encrypt`.
+
+        Returns:
+            None
+        """
+        self.conn.execute(
+            "INSERT INTO sessions (site, version, token) VALUES (?, 1, ?) "
+            "ON CONFLICT (site) DO UPDATE SET version = version + 1, "
+            "token = excluded.token",
+            (site, token),
+        )
+
+    def session(self, site: str) -> tuple:
+        """
+        Reads the latest session a coordinator published for a site.
+
+        Args:
+            site (str): The site name.
+
+        Returns:
+            tuple: The session's version (0 if there is none yet) and its
+                encrypted cookies.
+        """
+        row = self.conn.execute(
+            "SELECT version, token FROM sessions WHERE site = ?", (site,)
+        ).fetchone()
+        return row or (0, None)
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.conn.close()
+
+
+# Every unit of a site lives in one hash, as "<id>:<field>" fields, next to the
+# site's list of waiting unit IDs and sorted set of leases scored by expiry. The
+# scripts only touch those three keys, declared in KEYS, and the keys share the
+# site's {hash tag}, so they stay in one slot on Redis Cluster too.
+
+# Moves expired leases back to the queue (or gives up on them), then leases the
+# next waiting unit. KEYS: pending list, lease set, units hash
+CLAIM_SCRIPT = """
+local now = tonumber(ARGV[1])
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)) do
+    redis.call('ZREM', KEYS[2], id)
+    if redis.call('HGET', KEYS[3], id .. ':state') == 'leased' then
+        local attempts = tonumber(redis.call('HGET', KEYS[3], id .. ':attempts'))
+        if attempts >= tonumber(ARGV[3]) then
+            redis.call('HSET', KEYS[3], id .. ':state', 'failed')
+        else
+            redis.call('HSET', KEYS[3], id .. ':state', 'pending')
+            redis.call('RPUSH', KEYS[1], id)
+        end
+    end
+end
+while true do
+    local id = redis.call('RPOP', KEYS[1])
+    if not id then
+        return false
+    end
+    -- Cancelled units leave their ID behind in the list
+    if redis.call('HGET', KEYS[3], id .. ':state') == 'pending' then
+        local attempts = redis.call('HINCRBY', KEYS[3], id .. ':attempts', 1)
+        redis.call('HSET', KEYS[3], id .. ':state', 'leased', id .. ':worker', ARGV[4])
+        redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), id)
+        return {
+            id,
+            redis.call('HGET', KEYS[3], id .. ':kind'),
+            redis.call('HGET', KEYS[3], id .. ':urls'),
+            attempts,
+        }
+    end
+end
+"""
+
+# Stores a unit's results unless it is already done or was cancelled; a unit
+# whose lease ran out is waiting again, and its late results still count.
+# KEYS: units hash, lease set
+COMPLETE_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], ARGV[1] .. ':state')
+if state ~= 'leased' and state ~= 'pending' then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1] .. ':state', 'done', ARGV[1] .. ':result', ARGV[2])
+redis.call('ZREM', KEYS[2], ARGV[1])
+return 1
+"""
+
+# Hands a leased unit back. KEYS: units hash, pending list, lease set
+RELEASE_SCRIPT = """
+local id = ARGV[1]
+if redis.call('HGET', KEYS[1], id .. ':state') ~= 'leased'
+        or redis.call('HGET', KEYS[1], id .. ':worker') ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[3], id)
+local attempts = tonumber(redis.call('HGET', KEYS[1], id .. ':attempts'))
+if ARGV[3] == '1' then
+    attempts = redis.call('HINCRBY', KEYS[1], id .. ':attempts', -1)
+end
+if attempts >= tonumber(ARGV[4]) then
+    redis.call('HSET', KEYS[1], id .. ':state', 'failed')
+else
+    redis.call('HSET', KEYS[1], id .. ':state', 'pending')
+    redis.call('RPUSH', KEYS[2], id)
+end
+return 1
+"""
+
+UNIT_FIELDS = ("kind", "urls", "state", "attempts", "worker", "result")
+
+
+class RedisWorkQueue:
+    """
+    Work queue on a Redis server, for workers on several hosts.
+
+    Claims, reports and releases are Lua scripts, so they are atomic. The
+    coordinator purges its site's units when it starts, so units a stopped
+    coordinator never collected don't pile up.
+    """
+
+    def __init__(
+        self,
+        client,
+        lease_seconds: float = 60,
+        max_attempts: int = 3,
+        prefix: str = "stock-checker",
+    ):
+        """
+        Sets up the queue on a connected client.
+
+        Args:
+            client (redis.Redis): The connection.
+            lease_seconds (float): How long a claimed unit stays with its worker.
+            max_attempts (int): Leases a unit may run out of before it is given up.
+            prefix (str): The prefix of every key the queue uses.
+        """
+        self.client = client
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.prefix = prefix
+        self._claim = client.register_script(CLAIM_SCRIPT)
+        self._complete = client.register_script(COMPLETE_SCRIPT)
+        self._release = client.register_script(RELEASE_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, lease_seconds: float = 60, max_attempts: int = 3):
+        """
+        Connects to a Redis server.
+
+        Args:
+            url (str): The Redis URL, e.g. "redis://localhost:6379/0".
+            lease_seconds (float): How long a claimed unit stays with its worker.
+            max_attempts (int): Leases a unit may run out of before it is given up.
+
+        Returns:
+            RedisWorkQueue: The queue.
+
+        Raises:
+            RuntimeError: If the `redis` package isn't installed.
+        """
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "A Redis WORK_QUEUE needs the redis package (pip install redis)"
+            ) from e
+        return cls(redis.Redis.from_url(url), lease_seconds, max_attempts)
+
+    def _keys(self, site: str) -> tuple:
+        """The site's pending list, lease set and units hash, in one slot."""
+        tag = f"{self.prefix}:{{{site}}}"
+        return f"{tag}:pending", f"{tag}:leases", f"{tag}:units"
+
+    def submit(self, site: str, kind: str, batches: list) -> list:
+        """See `SqliteWorkQueue.submit`."""
+        if not batches:
+            return []
+        pending, _, units = self._keys(site)
+        last = self.client.incrby(f"{self.prefix}:next", len(batches))
+        ids = list(range(last - len(batches) + 1, last + 1))
+        fields = {}
+        for unit_id, urls in zip(ids, batches):
+            fields[f"{unit_id}:kind"] = kind
+            fields[f"{unit_id}:urls"] = json.dumps(urls)
+            fields[f"{unit_id}:state"] = "pending"
+            fields[f"{unit_id}:attempts"] = 0
+        pipe = self.client.pipeline()
+        pipe.hset(units, mapping=fields)
+        # Claims pop from the right, so units are handed out in order
+        pipe.lpush(pending, *ids)
+        pipe.execute()
+        return ids
+
+    def claim(self, worker: str, sites: list) -> WorkUnit:
+        """See `SqliteWorkQueue.claim`."""
+        for site in sites:
+            claimed = self._claim(
+                keys=self._keys(site),
+                args=[time.time(), self.lease_seconds, self.max_attempts, worker],
+            )
+            if claimed:
+                unit_id, kind, urls, attempts = claimed
+                return WorkUnit(
+                    int(unit_id), site, kind.decode(), json.loads(urls), attempts
+                )
+        return None
+
+    def complete(self, unit: WorkUnit, results: dict) -> bool:
+        """See `SqliteWorkQueue.complete`."""
+        _, leases, units = self._keys(unit.site)
+        return bool(
+            self._complete(keys=[units, leases], args=[unit.id, json.dumps(results)])
+        )
+
+    def release(self, unit: WorkUnit, worker: str, count_attempt: bool = False):
+        """See `SqliteWorkQueue.release`."""
+        pending, leases, units = self._keys(unit.site)
+        self._release(
+            keys=[units, pending, leases],
+            args=[unit.id, worker, int(not count_attempt), self.max_attempts],
+        )
+
+    def _drop(self, site: str, unit_ids) -> None:
+        """Deletes the fields of some units; IDs left in the list are skipped."""
+        _, leases, units = self._keys(site)
+        fields = [f"{i}:{field}" for i in unit_ids for field in UNIT_FIELDS]
+        if fields:
+            pipe = self.client.pipeline()
+            pipe.hdel(units, *fields)
+            pipe.zrem(leases, *unit_ids)
+            pipe.execute()
+
+    def collect(self, site: str, unit_ids: set) -> tuple:
+        """See `SqliteWorkQueue.collect`."""
+        ids = list(unit_ids)
+        if not ids:
+            return {}, set()
+        fields = [f"{i}:{field}" for i in ids for field in ("state", "result")]
+        values = self.client.hmget(self._keys(site)[2], fields)
+        done = {}
+        failed = set()
+        for unit_id, state, result in zip(ids, values[::2], values[1::2]):
+            if state == b"done":
+                done[unit_id] = json.loads(result)
+            elif state == b"failed":
+                failed.add(unit_id)
+        self._drop(site, [*done, *failed])
+        return done, failed
+
+    def cancel(self, site: str, unit_ids: set) -> None:
+        """See `SqliteWorkQueue.cancel`."""
+        self._drop(site, list(unit_ids))
+
+    def purge(self, site: str) -> None:
+        """See `SqliteWorkQueue.purge`."""
+        self.client.delete(*self._keys(site))
+
+    def publish_session(self, site: str, token: bytes) -> None:
+        """See `SqliteWorkQueue.publish_session`."""
+        key = f"{self.prefix}:session:{{{site}}}"
+        pipe = self.client.pipeline()
+        pipe.hset(key, "token", token)
+        pipe.hincrby(key, "version", 1)
+        pipe.execute()
+
+    def session(self, site: str) -> tuple:
+        """See `SqliteWorkQueue.session`."""
+        version, token = self.client.hmget(
+            f"{self.prefix}:session:{{{site}}}", "version", "token"
+        )
+        return (int(version), token) if version else (0, None)
+
+    def close(self) -> None:
+        """See `SqliteWorkQueue.close`."""
+        self.client.close()
+
+
+def open_work_queue(url: str, lease_seconds: float = 60, max_attempts: int = 3):
+    """
+    Opens the queue a `WORK_QUEUE` setting points to.
+
+    Args:
+        url (str): A `redis://` or `rediss://` URL, or the path of a SQLite file.
+        lease_seconds (float): How long a claimed unit stays with its worker.
+        max_attempts (int): Leases a unit may run out of before it is given up.
+
+    Returns:
+        SqliteWorkQueue | RedisWorkQueue: The queue.
+    """
+    if url.startswith(("redis://", "rediss://")):
+        return RedisWorkQueue.from_url(url, lease_seconds, max_attempts)
+    return SqliteWorkQueue(url, lease_seconds, max_attempts)